@@ -0,0 +1,294 @@
+import datetime
+import importlib.util
+import json
+import os
+import pathlib
+import platform
+import sys
+import time
+import tracemalloc
+
+import pytest
+
+import zapmenot
+from zapmenot import model, source, shield, detector, material
+
+pytestmark = pytest.mark.performance
+
+# ===================================================
+# Summary:
+# Timing and scaling benchmarks.  Unlike the accuracy benchmarks
+# (test_benchmark-*.py), these cases measure how long ZapMeNot takes
+# to produce a result and how the run time scales with problem size.
+#
+# Each case records the wall time, the peak memory allocated by Python,
+# the number of rays traced and the rays traced per second.  The results
+# of every run are appended to a JSON history file.  If a baseline file
+# is present, a case fails when its wall time exceeds the baseline wall
+# time multiplied by a slowdown threshold.
+#
+# The following environment variables control the suite:
+#   ZAPMENOT_PERF_SCALE      'quick' (default) or 'full'.  The full sweep
+#                            runs 4^3 to 64^3 source points, 1 to 1000
+#                            shields, 1 to 1000 detectors, 1 to 100
+#                            photon energies and 1 to 16 dose map threads.
+#   ZAPMENOT_PERF_REPEAT     Number of timed repetitions (default 3).
+#                            The fastest repetition is recorded.
+#   ZAPMENOT_PERF_HISTORY    Path of the JSON history file
+#                            (default benchmarks/performance_history.json).
+#   ZAPMENOT_PERF_BASELINE   Path of the JSON baseline file
+#                            (default benchmarks/performance_baseline.json).
+#   ZAPMENOT_PERF_THRESHOLD  Allowed slowdown ratio relative to the
+#                            baseline (default 1.5).
+#   ZAPMENOT_PERF_UPDATE_BASELINE
+#                            If set to 1, the baseline file is rewritten
+#                            with the results of the current run.
+#
+# Example:
+#   pytest -s -m performance
+#   ZAPMENOT_PERF_SCALE=full ZAPMENOT_PERF_UPDATE_BASELINE=1 \
+#       pytest -s -m performance
+
+BENCHMARK_DIR = pathlib.Path(__file__).parent
+
+SWEEPS = {
+    'quick': {
+        'source_points': [4, 8, 16],
+        'shields': [1, 10, 100],
+        'detectors': [1, 10, 50],
+        'photons': [1, 10, 30],
+        'threads': [1, 2, 4],
+    },
+    'full': {
+        'source_points': [4, 8, 16, 32, 64],
+        'shields': [1, 10, 100, 1000],
+        'detectors': [1, 10, 100, 1000],
+        'photons': [1, 10, 30, 100],
+        'threads': [1, 2, 4, 8, 16],
+    },
+}
+
+SCALE = os.environ.get('ZAPMENOT_PERF_SCALE', 'quick')
+if SCALE not in SWEEPS:
+    raise ValueError(f"Invalid ZAPMENOT_PERF_SCALE: {SCALE}")
+REPEAT = int(os.environ.get('ZAPMENOT_PERF_REPEAT', '3'))
+HISTORY_FILE = pathlib.Path(os.environ.get(
+    'ZAPMENOT_PERF_HISTORY', BENCHMARK_DIR / 'performance_history.json'))
+BASELINE_FILE = pathlib.Path(os.environ.get(
+    'ZAPMENOT_PERF_BASELINE', BENCHMARK_DIR / 'performance_baseline.json'))
+THRESHOLD = float(os.environ.get('ZAPMENOT_PERF_THRESHOLD', '1.5'))
+UPDATE_BASELINE = os.environ.get('ZAPMENOT_PERF_UPDATE_BASELINE') == '1'
+# False on a free-threaded (no-GIL) interpreter
+GIL_ENABLED = getattr(sys, '_is_gil_enabled', lambda: True)()
+
+
+# ===================================================
+# measurement and bookkeeping
+
+
+def _measure(case_function):
+    """Runs a case once under tracemalloc to find the peak memory,
+    then REPEAT times without tracing to find the fastest wall time.
+    The case function returns the number of rays traced (or None).
+    """
+    tracemalloc.start()
+    try:
+        rays = case_function()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    wall_times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        case_function()
+        wall_times.append(time.perf_counter() - start)
+    wall_time = min(wall_times)
+    result = {'wall_time': wall_time,
+              'peak_memory': peak_memory,
+              'rays': rays,
+              'rays_per_second': None}
+    if rays is not None and wall_time > 0:
+        result['rays_per_second'] = rays / wall_time
+    return result
+
+
+@pytest.fixture(scope='module')
+def recorder():
+    """Collects the results of every case and appends them to the
+    history file when the module is complete."""
+    results = {}
+    baseline = {}
+    if BASELINE_FILE.exists():
+        with open(BASELINE_FILE) as stream:
+            baseline = json.load(stream)
+    yield results, baseline
+    if len(results) == 0:
+        return
+    history = []
+    if HISTORY_FILE.exists():
+        with open(HISTORY_FILE) as stream:
+            history = json.load(stream)
+    history.append({
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'zapmenot': zapmenot.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'gil_enabled': GIL_ENABLED,
+        'scale': SCALE,
+        'results': results})
+    with open(HISTORY_FILE, 'w') as stream:
+        json.dump(history, stream, indent=1)
+    if UPDATE_BASELINE:
+        baseline.update({name: value['wall_time']
+                         for name, value in results.items()})
+        with open(BASELINE_FILE, 'w') as stream:
+            json.dump(baseline, stream, indent=1, sort_keys=True)
+
+
+def _run_case(recorder, name, case_function):
+    results, baseline = recorder
+    result = _measure(case_function)
+    results[name] = result
+    print("")
+    print(f"{name}: {result['wall_time']:.4g} s, "
+          f"{result['peak_memory']/1e6:.4g} MB, "
+          f"{result['rays']} rays")
+    if name in baseline and not UPDATE_BASELINE:
+        limit = baseline[name] * THRESHOLD
+        assert result['wall_time'] <= limit, \
+            f"{name} took {result['wall_time']:.4g} s, " \
+            f"baseline limit is {limit:.4g} s"
+
+
+# ===================================================
+# reference problems
+#
+# The accuracy benchmarks are reused as timing cases.  The benchmark
+# files are not importable by name (they contain hyphens), so they
+# are loaded directly from their file paths.
+
+REFERENCE_FILES = sorted(BENCHMARK_DIR.glob('test_benchmark-*.py'))
+
+
+@pytest.mark.parametrize('path', REFERENCE_FILES,
+                         ids=[path.stem for path in REFERENCE_FILES])
+def test_reference_problem(recorder, path):
+    spec = importlib.util.spec_from_file_location(
+        path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    cases = [getattr(module, name) for name in dir(module)
+             if name.startswith('test_')]
+
+    def run_reference():
+        for case in cases:
+            case()
+        return None
+
+    _run_case(recorder, 'reference/' + path.stem, run_reference)
+
+
+# ===================================================
+# synthetic scaling sweeps
+
+
+def _build_model(points_per_dimension=4, shield_count=1, photon_count=1):
+    """Builds a concrete-shielded water box source with a variable
+    quadrature, number of shields, and number of photon energies.
+
+    Symmetry reduction is turned off, so every source point is traced
+    and the reported ray counts are those actually traced."""
+    my_model = model.Model()
+    my_model.use_symmetry = False
+    my_source = source.BoxSource('water', box_center=[0, 0, 0],
+                                 box_dimensions=[100, 100, 100])
+    my_source.points_per_dimension = [points_per_dimension] * 3
+    my_source.grouping = 'discrete'
+    for index in range(photon_count):
+        my_source.add_photon(0.1 + 2.9 * index / max(photon_count - 1, 1),
+                             1E10)
+    my_model.add_source(my_source)
+    # thin slabs filling the space between x = 60 and x = 260
+    thickness = 200 / shield_count
+    for index in range(shield_count):
+        my_model.add_shield(shield.SemiInfiniteXSlab(
+            'concrete', x_start=60 + index * thickness,
+            x_end=60 + (index + 0.5) * thickness))
+    my_model.set_filler_material('air')
+    my_model.set_buildup_factor_material(material.Material('concrete'))
+    my_model.add_detector(detector.Detector(300, 0, 0))
+    return my_model
+
+
+@pytest.mark.parametrize('count', SWEEPS[SCALE]['source_points'])
+def test_source_point_scaling(recorder, count):
+    my_model = _build_model(points_per_dimension=count)
+
+    def run_case():
+        my_model.calculate_exposure()
+        return count**3
+
+    _run_case(recorder, f'scaling/source_points/{count}^3', run_case)
+
+
+@pytest.mark.parametrize('count', SWEEPS[SCALE]['shields'])
+def test_shield_scaling(recorder, count):
+    my_model = _build_model(shield_count=count)
+
+    def run_case():
+        my_model.calculate_exposure()
+        return 4**3
+
+    _run_case(recorder, f'scaling/shields/{count}', run_case)
+
+
+@pytest.mark.parametrize('count', SWEEPS[SCALE]['detectors'])
+def test_detector_scaling(recorder, count):
+    my_model = _build_model()
+    locations = [(300, -500 + 1000 * index / max(count - 1, 1), 0)
+                 for index in range(count)]
+
+    def run_case():
+        for location in locations:
+            my_model.add_detector(detector.Detector(*location))
+            my_model.calculate_exposure()
+        return count * 4**3
+
+    _run_case(recorder, f'scaling/detectors/{count}', run_case)
+
+
+@pytest.mark.parametrize('count', SWEEPS[SCALE]['photons'])
+def test_spectrum_scaling(recorder, count):
+    my_model = _build_model(points_per_dimension=8, photon_count=count)
+
+    def run_case():
+        my_model.calculate_exposure()
+        return 8**3
+
+    _run_case(recorder, f'scaling/photons/{count}', run_case)
+
+
+@pytest.mark.parametrize('threads', SWEEPS[SCALE]['threads'])
+def test_thread_scaling(recorder, threads):
+    # the dose map threads share one model; with the GIL enabled only
+    # the NumPy work runs in parallel, so the scaling is only checked on
+    # a free-threaded interpreter with enough processors
+    my_model = _build_model(points_per_dimension=8)
+    locations = [(300, -500 + 1000 * index / 99, 0) for index in range(100)]
+
+    def run_case():
+        my_model.calculate_exposure_map(locations, threads=threads)
+        return len(locations) * 8**3
+
+    name = f'scaling/threads/{threads}'
+    _run_case(recorder, name, run_case)
+    results, _ = recorder
+    serial = results.get('scaling/threads/1')
+    if serial is None or threads == 1:
+        return
+    speedup = serial['wall_time'] / results[name]['wall_time']
+    results[name]['speedup'] = speedup
+    print(f"{name}: speedup {speedup:.3g}")
+    if not GIL_ENABLED and threads <= (os.cpu_count() or 1):
+        assert speedup >= 0.5 * threads
+
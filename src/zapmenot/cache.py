@@ -0,0 +1,256 @@
+import enum
+import functools
+import hashlib
+import json
+import numbers
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Union
+
+import numpy as np
+
+from . import __about__
+
+try:
+    from importlib import resources as impresources
+except ImportError:
+    # Try backported to PY<37 `importlib_resources`.
+    import importlib_resources as impresources
+''' '''
+'''
+ZapMeNot - a point kernel photon shielding library
+Copyright (C) 2019-2025  C. Alan Ford
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+# attributes that do not change the calculated results
+_EXCLUDED_ATTRIBUTES = frozenset(['collect_statistics', 'statistics',
+                                  'result_cache', '_meshes'])
+
+
+@functools.lru_cache(maxsize=None)
+def library_digest() -> str:
+    """Returns a digest of the packaged material and isotope libraries.
+
+    Returns
+    -------
+        Hexadecimal SHA-256 digest of the library files.
+    """
+    digest = hashlib.sha256()
+    for path in ('materialLibrary.yml', 'isotopeLibrary.yml'):
+        digest.update((impresources.files(__package__) / path).read_bytes())
+    return digest.hexdigest()
+
+
+def canonical(value: Any) -> Any:
+    """Converts a model, or any part of a model, to a canonical form made
+    of JSON types.
+
+    Numbers are converted to floats so that, for example, a density of 2
+    and a density of 2.0 give the same form.  Materials are represented by
+    their name and density, since the library data is covered by
+    :func:`library_digest`.  Other objects are represented by their class
+    name and attributes.
+
+    Parameters
+    ----------
+    value
+        The value to be converted.
+
+    Returns
+    -------
+        The canonical form.
+    """
+    # imported here because the material module is not needed to hash
+    # plain values
+    from . import material
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, numbers.Number):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return [canonical(item) for item in value.tolist()]
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, Mapping):
+        return {str(key): canonical(item) for key, item in value.items()}
+    if isinstance(value, material.Material):
+        return {'material': value.name, 'density': float(value.density)}
+    if hasattr(value, '__dict__'):
+        return {'class': type(value).__module__ + '.' +
+                type(value).__qualname__,
+                'state': {key: canonical(item)
+                          for key, item in vars(value).items()
+                          if key not in _EXCLUDED_ATTRIBUTES}}
+    raise TypeError(f"Cannot hash object of type {type(value).__name__}")
+
+
+def model_hash(model: Any, *extra: Any) -> str:
+    """Returns a stable hash of the full input state of a model.
+
+    The hash covers the source geometry, quadrature, isotopes, photons and
+    grouping, the shields with their materials and densities, the filler
+    and buildup factor materials, the detector, the calculation options,
+    the ZapMeNot version, and the material and isotope libraries.  It is
+    the same in every process and run.
+
+    Parameters
+    ----------
+    model
+        The :class:`zapmenot.model.Model` to be hashed.
+    extra
+        Further values that identify the calculation, such as requested
+        options or detector locations.
+
+    Returns
+    -------
+        Hexadecimal SHA-256 hash.
+    """
+    state = {'version': __about__.__version__,
+             'libraries': library_digest(),
+             'model': canonical(model),
+             'extra': canonical(list(extra))}
+    text = json.dumps(state, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """An on-disk store of calculation results, keyed by model hash.
+
+    The results are kept in a SQLite database that can be shared by
+    several processes.  When the total size of the stored results exceeds
+    the limit, the least recently used results are removed.
+
+    Parameters
+    ----------
+    path
+        The database file, which is created if required.
+    max_bytes
+        The largest total size of the stored results in bytes.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike],
+                 max_bytes: int = 2**30) -> None:
+        if not isinstance(max_bytes, numbers.Integral) or max_bytes <= 0:
+            raise ValueError(f"Invalid cache size: {max_bytes}")
+        self.path: str = os.fspath(path)
+        self.max_bytes: int = int(max_bytes)
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, '
+                'value BLOB NOT NULL, size INTEGER NOT NULL, '
+                'accessed REAL NOT NULL)')
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS accessed ON results (accessed)')
+        connection.close()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # the lock cannot be copied to another process
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Opens a connection to the database.  A connection is opened for
+        each operation, so the cache can be used from several threads."""
+        connection = sqlite3.connect(self.path, timeout=60)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns a stored result and marks it as recently used.
+
+        Parameters
+        ----------
+        key
+            The result key.
+
+        Returns
+        -------
+            The stored result, or None if there is none.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                connection.execute(
+                    'UPDATE results SET accessed = ? WHERE key = ?',
+                    (time.time(), key))
+        connection.close()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if row is None else bytes(row[0])
+
+    def put(self, key: str, value: bytes) -> None:
+        """Stores a result, removing the least recently used results if
+        the cache is full.
+
+        Parameters
+        ----------
+        key
+            The result key.
+        value
+            The result.
+        """
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                (key, sqlite3.Binary(value), len(value), time.time()))
+            total = connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            while total > self.max_bytes:
+                oldest = connection.execute(
+                    'SELECT key, size FROM results '
+                    'ORDER BY accessed, rowid LIMIT 1').fetchone()
+                connection.execute('DELETE FROM results WHERE key = ?',
+                                   (oldest[0],))
+                total -= oldest[1]
+        connection.close()
+
+    def __len__(self) -> int:
+        with self._connect() as connection:
+            count = connection.execute(
+                'SELECT COUNT(*) FROM results').fetchone()[0]
+        connection.close()
+        return count
+
+    @property
+    def size(self) -> int:
+        """The total size of the stored results in bytes."""
+        with self._connect() as connection:
+            total = connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        connection.close()
+        return total
+
+    def clear(self) -> None:
+        """Removes all stored results."""
+        with self._connect() as connection:
+            connection.execute('DELETE FROM results')
+        connection.close()
@@ -0,0 +1,200 @@
+import argparse
+import concurrent.futures
+import csv
+import math
+import sys
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from . import deck, material, isotope, __about__
+
+import importlib
+pyarrow_spec = importlib.util.find_spec("pyarrow")
+pyarrow_found = pyarrow_spec is not None
+if pyarrow_found:
+    import pyarrow
+    import pyarrow.parquet
+''' '''
+'''
+ZapMeNot - a point kernel photon shielding library
+Copyright (C) 2019-2025  C. Alan Ford
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+# columns of the results table
+COLUMNS = ('deck', 'detector', 'x', 'y', 'z', 'exposure', 'error')
+
+Row = Tuple[str, int, float, float, float, float, str]
+
+
+def _load_libraries() -> None:
+    """Reads the material and isotope libraries.  Run once in each worker
+    process, so the libraries are not read again for every deck."""
+    material.Material._library.get()
+    isotope.Isotope._library.get()
+
+
+def run_deck(path: str) -> List[Row]:
+    """Runs a deck, returning one row of results per detector location.
+
+    Any error in reading or running the deck is reported in the error
+    column of a single row rather than raised, so that one bad deck does
+    not stop a batch.
+
+    Parameters
+    ----------
+    path
+        The deck file.
+
+    Returns
+    -------
+        Rows of deck name, detector index, detector location, exposure in
+        mR/hr, and error message.
+    """
+    name = deck._deck_name(path)
+    try:
+        case = deck.load(path)
+        exposures = case.run()
+    except Exception as error:
+        return [(name, -1, math.nan, math.nan, math.nan, math.nan,
+                 f"{type(error).__name__}: {error}")]
+    return [(name, index, *map(float, location), float(exposure), '')
+            for index, (location, exposure)
+            in enumerate(zip(case.detectors, exposures))]
+
+
+def run_decks(paths: Sequence[str], jobs: int = 1) -> Iterator[List[Row]]:
+    """Runs a set of decks, yielding the rows of each deck in order as
+    soon as they are available.
+
+    Parameters
+    ----------
+    paths
+        The deck files.
+    jobs
+        The number of worker processes.
+
+    Raises
+    ------
+    ValueError
+        Invalid number of jobs
+    """
+    if not isinstance(jobs, int) or jobs < 1:
+        raise ValueError(f"Invalid number of jobs: {jobs}")
+    if jobs == 1 or len(paths) < 2:
+        _load_libraries()
+        for path in paths:
+            yield run_deck(path)
+        return
+    with concurrent.futures.ProcessPoolExecutor(
+            jobs, initializer=_load_libraries) as pool:
+        yield from pool.map(run_deck, paths)
+
+
+class _CsvWriter:
+    """Writes rows of results to a CSV file."""
+
+    def __init__(self, path: str) -> None:
+        if path == '-':
+            self._stream = sys.stdout
+        else:
+            self._stream = open(path, 'w', newline='')
+        self._writer = csv.writer(self._stream)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, rows: Iterable[Row]) -> None:
+        self._writer.writerows(rows)
+        self._stream.flush()
+
+    def close(self) -> None:
+        if self._stream is not sys.stdout:
+            self._stream.close()
+
+
+class _ParquetWriter:
+    """Writes rows of results to a Parquet file, one row group per deck."""
+
+    def __init__(self, path: str) -> None:
+        self._schema = pyarrow.schema(
+            [('deck', pyarrow.string()), ('detector', pyarrow.int64())] +
+            [(name, pyarrow.float64())
+             for name in ('x', 'y', 'z', 'exposure')] +
+            [('error', pyarrow.string())])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, rows: Iterable[Row]) -> None:
+        columns = list(zip(*rows))
+        self._writer.write_table(pyarrow.table(
+            [list(values) for values in columns], schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Runs the ``zapmenot`` command, which evaluates a batch of input
+    decks and writes the exposure at every detector location to a CSV
+    or Parquet file.
+
+    Parameters
+    ----------
+    argv
+        The command line arguments.  If None, the arguments of the
+        process are used.
+
+    Returns
+    -------
+        The exit status: 0 if every deck ran, otherwise 1.
+    """
+    parser = argparse.ArgumentParser(
+        prog='zapmenot',
+        description='Run ZapMeNot input decks and tabulate the exposure '
+                    '(mR/hr) at each detector location.')
+    parser.add_argument('paths', nargs='+',
+                        help='deck files, or directories of deck files')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes (default 1)')
+    parser.add_argument('-o', '--output', default='-',
+                        help='output file; a name ending in .parquet is '
+                             'written as Parquet, others as CSV '
+                             '(default: CSV to standard output)')
+    parser.add_argument('--version', action='version',
+                        version=f'%(prog)s {__about__.__version__}')
+    arguments = parser.parse_args(argv)
+    if arguments.jobs < 1:
+        parser.error(f"invalid number of jobs: {arguments.jobs}")
+    try:
+        paths = deck.find_decks(arguments.paths)
+    except ValueError as error:
+        parser.error(str(error))
+    parquet = arguments.output.lower().endswith('.parquet')
+    if parquet and not pyarrow_found:
+        parser.error("Parquet output requires the pyarrow package")
+    writer: Any = _ParquetWriter(arguments.output) if parquet \
+        else _CsvWriter(arguments.output)
+    failures = 0
+    try:
+        for rows in run_decks(paths, arguments.jobs):
+            writer.write(rows)
+            for row in rows:
+                if row[-1]:
+                    failures += 1
+                    print(f"{row[0]}: {row[-1]}", file=sys.stderr)
+    finally:
+        writer.close()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,396 @@
+import functools
+import inspect
+import json
+import numbers
+import os
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+import numpy as np
+import yaml
+
+from . import model, source, shield, detector, material
+
+# decks are untrusted input, so only plain YAML tags are accepted
+try:
+    from yaml import CSafeLoader as MyLoader
+except ImportError:
+    from yaml import SafeLoader as MyLoader
+''' '''
+'''
+ZapMeNot - a point kernel photon shielding library
+Copyright (C) 2019-2025  C. Alan Ford
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+# file extensions recognized as input decks
+DECK_SUFFIXES = ('.yml', '.yaml', '.json')
+
+_DECK_KEYS = frozenset(['title', 'source', 'shields', 'filler',
+                        'buildup_material', 'detector', 'detectors',
+                        'options'])
+# source settings that are not constructor arguments
+_SOURCE_KEYS = frozenset(['type', 'isotopes', 'photons',
+                          'points_per_dimension', 'grouping',
+                          'include_key_progeny'])
+# model attributes that can be set from the options block
+_OPTIONS = frozenset(['far_field_tolerance', 'use_symmetry',
+                      'analytic_line_source'])
+
+
+class Deck:
+    """A model read from an input deck, with the detector locations at
+    which it is to be evaluated.
+
+    Parameters
+    ----------
+    name
+        The name of the deck.
+    model
+        The model described by the deck.
+    detectors
+        Detector locations, indexed by location and coordinate.
+    title
+        An optional description of the deck.
+    """
+
+    def __init__(self, name: str, model: model.Model,
+                 detectors: np.ndarray, title: Optional[str] = None) -> None:
+        self.name: str = name
+        self.model: model.Model = model
+        self.detectors: np.ndarray = detectors
+        self.title: Optional[str] = title
+
+    def run(self, threads: Optional[int] = None) -> np.ndarray:
+        """Calculates the exposure at every detector location.
+
+        Parameters
+        ----------
+        threads
+            The number of threads used to evaluate the locations.
+
+        Returns
+        -------
+            The exposure in mR/hr at each detector location.
+        """
+        return self.model.calculate_exposure_map(self.detectors, threads)
+
+
+def read(path: Union[str, os.PathLike]) -> Dict[str, Any]:
+    """Parses an input deck file.
+
+    Files ending in ``.json`` are read as JSON; all others are read as
+    YAML.
+
+    Parameters
+    ----------
+    path
+        The deck file.
+
+    Raises
+    ------
+    ValueError
+        The deck is not a mapping, or holds a YAML tag other than the
+        standard ones
+
+    Returns
+    -------
+        The parsed deck.
+    """
+    with open(path, 'r') as stream:
+        if os.fspath(path).lower().endswith('.json'):
+            data = json.load(stream)
+        else:
+            try:
+                data = yaml.load(stream, Loader=MyLoader)
+            except yaml.constructor.ConstructorError as error:
+                raise ValueError(f"Deck {os.fspath(path)} is not plain "
+                                 f"YAML: {error.problem}") from error
+    if not isinstance(data, dict):
+        raise ValueError(f"Deck {os.fspath(path)} is not a mapping")
+    return data
+
+
+def load(path: Union[str, os.PathLike]) -> Deck:
+    """Reads an input deck file and builds its model.
+
+    Parameters
+    ----------
+    path
+        The deck file.
+
+    Returns
+    -------
+        The deck, named after the file.
+    """
+    return build(read(path), _deck_name(path))
+
+
+def _deck_name(path: Union[str, os.PathLike]) -> str:
+    """Returns the name of a deck, which is its file name without the
+    extension."""
+    return os.path.splitext(os.path.basename(os.fspath(path)))[0]
+
+
+def build(data: Mapping[str, Any], name: str = 'deck') -> Deck:
+    """Builds a model from a parsed input deck.
+
+    A deck is a mapping with the following entries.  Only ``source`` and
+    one of ``detector`` or ``detectors`` are required.
+
+    ``source``
+        A mapping with a ``type`` naming a class of :mod:`zapmenot.source`
+        and the arguments of its constructor.  It may also include
+        ``isotopes`` (a list of mappings with a ``name`` and either
+        ``curies`` or ``becquerels``), ``photons`` (a list of energy and
+        intensity pairs in MeV and photons/sec), ``points_per_dimension``,
+        ``grouping``, and ``include_key_progeny``.
+    ``shields``
+        A list of mappings, each with a ``type`` naming a class of
+        :mod:`zapmenot.shield` and the arguments of its constructor.  An
+        argument that is itself a shield, such as the sphere of a
+        ``Shell``, is given as a nested mapping.
+    ``filler``
+        A mapping with a ``material`` and an optional ``density``.
+    ``buildup_material``
+        The name of the buildup factor material.
+    ``detector``
+        A single detector location [x, y, z].
+    ``detectors``
+        A list of detector locations.
+    ``options``
+        Values of the model attributes ``far_field_tolerance``,
+        ``use_symmetry``, and ``analytic_line_source``.
+    ``title``
+        A description of the deck.
+
+    Parameters
+    ----------
+    data
+        The parsed deck.
+    name
+        The name of the deck, used in error messages.
+
+    Raises
+    ------
+    ValueError
+        The deck is invalid
+
+    Returns
+    -------
+        The deck.
+    """
+    unknown = set(data) - _DECK_KEYS
+    if unknown:
+        raise ValueError(f"Deck {name}: unknown entries {sorted(unknown)}")
+    if 'source' not in data:
+        raise ValueError(f"Deck {name}: missing source")
+    new_model = model.Model()
+    new_model.add_source(_build_source(data['source'], name))
+    for spec in data.get('shields') or []:
+        new_model.add_shield(_build_shield(spec, name))
+    filler = data.get('filler')
+    if filler is not None:
+        if not isinstance(filler, Mapping) or 'material' not in filler or \
+                set(filler) - {'material', 'density'}:
+            raise ValueError(f"Deck {name}: invalid filler {filler}")
+        new_model.set_filler_material(filler['material'],
+                                      filler.get('density'))
+    if data.get('buildup_material') is not None:
+        new_model.set_buildup_factor_material(
+            material.Material(data['buildup_material']))
+    options = data.get('options') or {}
+    unknown = set(options) - _OPTIONS
+    if unknown:
+        raise ValueError(f"Deck {name}: unknown options {sorted(unknown)}")
+    for key, value in options.items():
+        setattr(new_model, key, value)
+    locations = _detectors(data, name)
+    new_model.add_detector(detector.Detector(*locations[0]))
+    return Deck(name, new_model, locations, data.get('title'))
+
+
+def _detectors(data: Mapping[str, Any], name: str) -> np.ndarray:
+    """Returns the detector locations of a deck.
+
+    Parameters
+    ----------
+    data
+        The parsed deck.
+    name
+        The name of the deck, used in error messages.
+    """
+    if ('detector' in data) == ('detectors' in data):
+        raise ValueError(
+            f"Deck {name}: exactly one of detector or detectors is required")
+    if 'detector' in data:
+        locations = [data['detector']]
+    else:
+        locations = data['detectors']
+    try:
+        points = np.array(locations, dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError(f"Deck {name}: invalid detectors {locations}")
+    if points.ndim != 2 or points.shape[0] == 0 or points.shape[1] != 3:
+        raise ValueError(f"Deck {name}: invalid detectors {locations}")
+    return points
+
+
+@functools.lru_cache(maxsize=None)
+def _component_class(module_name: str, type_name: str) -> type:
+    """Returns a concrete source or shield class by name.
+
+    Parameters
+    ----------
+    module_name
+        Either 'source' or 'shield'.
+    type_name
+        The class name.
+    """
+    module, base = {'source': (source, source.Source),
+                    'shield': (shield, shield.Shield)}[module_name]
+    cls = getattr(module, type_name, None)
+    if not inspect.isclass(cls) or not issubclass(cls, base) or \
+            inspect.isabstract(cls) or \
+            (module_name == 'shield' and issubclass(cls, source.Source)):
+        raise ValueError(f"Invalid {module_name} type: {type_name}")
+    return cls
+
+
+def _construct(module_name: str, spec: Any, arguments: Mapping[str, Any],
+               name: str) -> Any:
+    """Creates a source or shield from its deck entry.
+
+    Parameters
+    ----------
+    module_name
+        Either 'source' or 'shield'.
+    spec
+        The deck entry.
+    arguments
+        The constructor arguments.
+    name
+        The name of the deck, used in error messages.
+    """
+    if not isinstance(spec, Mapping) or 'type' not in spec:
+        raise ValueError(f"Deck {name}: {module_name} requires a type")
+    cls = _component_class(module_name, spec['type'])
+    values = {key: _build_shield(value, name)
+              if isinstance(value, Mapping) else value
+              for key, value in arguments.items()}
+    try:
+        return cls(**values)
+    except TypeError as error:
+        raise ValueError(f"Deck {name}: {spec['type']}: {error}")
+
+
+def _build_shield(spec: Any, name: str) -> shield.Shield:
+    """Creates a shield from its deck entry.
+
+    Parameters
+    ----------
+    spec
+        The deck entry.
+    name
+        The name of the deck, used in error messages.
+    """
+    arguments = {key: value for key, value in spec.items()
+                 if key != 'type'} if isinstance(spec, Mapping) else {}
+    return _construct('shield', spec, arguments, name)
+
+
+def _build_source(spec: Any, name: str) -> source.Source:
+    """Creates a source from its deck entry.
+
+    Parameters
+    ----------
+    spec
+        The deck entry.
+    name
+        The name of the deck, used in error messages.
+    """
+    arguments = {key: value for key, value in spec.items()
+                 if key not in _SOURCE_KEYS} \
+        if isinstance(spec, Mapping) else {}
+    new_source = _construct('source', spec, arguments, name)
+    for key in ('points_per_dimension', 'grouping', 'include_key_progeny'):
+        if key in spec:
+            setattr(new_source, key, spec[key])
+    for entry in spec.get('isotopes') or []:
+        _add_isotope(new_source, entry, name)
+    for entry in spec.get('photons') or []:
+        if not isinstance(entry, (list, tuple)) or len(entry) != 2:
+            raise ValueError(f"Deck {name}: invalid photon {entry}")
+        new_source.add_photon(*entry)
+    return new_source
+
+
+def _add_isotope(new_source: source.Source, entry: Any, name: str) -> None:
+    """Adds an isotope from its deck entry to a source.
+
+    Parameters
+    ----------
+    new_source
+        The source.
+    entry
+        The deck entry, with a name and an activity in curies or
+        becquerels.
+    name
+        The name of the deck, used in error messages.
+    """
+    if not isinstance(entry, Mapping) or 'name' not in entry or \
+            len(set(entry) & {'curies', 'becquerels'}) != 1 or \
+            len(entry) != 2:
+        raise ValueError(f"Deck {name}: invalid isotope {entry}")
+    activity = entry.get('curies', entry.get('becquerels'))
+    if not isinstance(activity, numbers.Number) or \
+            isinstance(activity, bool):
+        raise ValueError(f"Deck {name}: invalid isotope {entry}")
+    if 'curies' in entry:
+        new_source.add_isotope_curies(entry['name'], activity)
+    else:
+        new_source.add_isotope_bq(entry['name'], activity)
+
+
+def find_decks(paths: List[Union[str, os.PathLike]]) -> List[str]:
+    """Lists the deck files given by a set of files and directories.
+
+    Parameters
+    ----------
+    paths
+        Deck files, or directories whose deck files (ending in ``.yml``,
+        ``.yaml`` or ``.json``) are to be listed.
+
+    Raises
+    ------
+    ValueError
+        A path does not exist
+
+    Returns
+    -------
+        The deck files, with the files of each directory sorted by name.
+    """
+    decks = []
+    for path in paths:
+        path = os.fspath(path)
+        if os.path.isdir(path):
+            decks.extend(os.path.join(path, entry)
+                         for entry in sorted(os.listdir(path))
+                         if entry.lower().endswith(DECK_SUFFIXES) and
+                         os.path.isfile(os.path.join(path, entry)))
+        elif os.path.isfile(path):
+            decks.append(path)
+        else:
+            raise ValueError(f"No such deck or directory: {path}")
+    return decks
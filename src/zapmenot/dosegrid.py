@@ -0,0 +1,455 @@
+import concurrent.futures
+import os
+from typing import Any, List, Optional, Sequence, Union
+
+import numpy as np
+
+from . import model
+
+import importlib
+pyvista_spec = importlib.util.find_spec("pyvista")
+pyvista_found = pyvista_spec is not None
+if pyvista_found:
+    import pyvista
+''' '''
+'''
+ZapMeNot - a point kernel photon shielding library
+Copyright (C) 2019-2025  C. Alan Ford
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+# name of the point data array holding the exposure
+SCALARS = 'exposure'
+
+
+def _require_pyvista() -> None:
+    """Raises an ImportError if pyvista is not installed."""
+    if not pyvista_found:
+        raise ImportError("pyvista is required for dose grids")
+
+
+def image_grid(bounds: Sequence[float],
+               dimensions: Sequence[int]) -> "pyvista.ImageData":
+    """Creates a regular grid of detector locations.
+
+    Parameters
+    ----------
+    bounds
+        The extent of the grid: xmin, xmax, ymin, ymax, zmin, zmax.
+    dimensions
+        The number of grid points in the X, Y, and Z directions.  A
+        dimension of one gives a grid that is flat in that direction,
+        located at the lower bound.
+
+    Raises
+    ------
+    ImportError
+        pyvista is not installed
+    ValueError
+        Invalid bounds or dimensions
+
+    Returns
+    -------
+        The grid.
+    """
+    _require_pyvista()
+    if len(bounds) != 6 or len(dimensions) != 3:
+        raise ValueError("Grid requires six bounds and three dimensions")
+    if not all(isinstance(count, (int, np.integer)) and count > 0
+               for count in dimensions):
+        raise ValueError(f"Invalid grid dimensions: {dimensions}")
+    lower = np.array(bounds[0::2], dtype=float)
+    upper = np.array(bounds[1::2], dtype=float)
+    if np.any(upper < lower):
+        raise ValueError(f"Invalid grid bounds: {bounds}")
+    counts = np.array(dimensions)
+    spacing = np.where(counts > 1, (upper - lower) /
+                       np.maximum(counts - 1, 1), 1.0)
+    return pyvista.ImageData(dimensions=tuple(int(count) for count in counts),
+                             spacing=tuple(spacing), origin=tuple(lower))
+
+
+def attach(grid: "pyvista.DataSet", exposures: Any) -> "pyvista.DataSet":
+    """Returns a copy of a grid with exposures attached as point data.
+
+    Parameters
+    ----------
+    grid
+        The grid, such as a pyvista ImageData or StructuredGrid.
+    exposures
+        The exposure in mR/hr at each grid point, in the order of the grid
+        points.  This can be a memory-mapped map written by
+        :meth:`zapmenot.model.Model.write_exposure_map`.
+
+    Raises
+    ------
+    ValueError
+        The number of exposures does not match the grid
+
+    Returns
+    -------
+        The grid, with the exposures in the point data array 'exposure'.
+    """
+    values = np.asarray(exposures, dtype=float)
+    if values.shape != (grid.n_points,):
+        raise ValueError(f"Expected {grid.n_points} exposures, "
+                         f"received {values.shape}")
+    dose_grid = grid.copy()
+    dose_grid.point_data[SCALARS] = values
+    dose_grid.set_active_scalars(SCALARS)
+    return dose_grid
+
+
+def calculate(dose_model: model.Model, grid: "pyvista.DataSet",
+              threads: Optional[int] = None) -> "pyvista.DataSet":
+    """Calculates the exposure at every point of a grid.
+
+    The exposures are found with
+    :meth:`zapmenot.model.Model.calculate_exposure_map`.
+
+    Parameters
+    ----------
+    dose_model
+        The model.
+    grid
+        The grid, such as a pyvista ImageData or StructuredGrid.
+    threads
+        The number of threads used to evaluate the grid points.
+
+    Returns
+    -------
+        A copy of the grid, with the exposure in mR/hr in the point data
+        array 'exposure'.
+    """
+    _require_pyvista()
+    return attach(grid, dose_model.calculate_exposure_map(
+        np.asarray(grid.points, dtype=float), threads))
+
+
+# VTK cell types of a refined cell with one, two and three dimensions
+_CELL_TYPES = {1: 3, 2: 9, 3: 12}
+# corners of a refined cell along its refined axes, in VTK order
+_CORNERS = {1: [(0,), (1,)],
+            2: [(0, 0), (1, 0), (1, 1), (0, 1)],
+            3: [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0),
+                (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)]}
+
+
+def adaptive_grid(dose_model: model.Model, bounds: Sequence[float],
+                  dimensions: Sequence[int], threshold: float = 0.25,
+                  levels: int = 3, threads: Optional[int] = None) \
+        -> "pyvista.UnstructuredGrid":
+    """Calculates a dose map on a grid that is refined where the exposure
+    changes rapidly.
+
+    The calculation starts on a coarse regular grid.  Each cell whose
+    corner exposures differ by more than the threshold (as a difference of
+    base 10 logarithms) is divided in half along each direction, up to the
+    given number of levels.  The new corners of each level are evaluated
+    together with :meth:`zapmenot.model.Model.calculate_exposure_map`.
+    Cells are refined only near shield faces, shadow edges and the source,
+    so the grid has far fewer points than a regular grid of the finest
+    spacing.  Neighboring cells of different levels share only the
+    corners they have in common.
+
+    Parameters
+    ----------
+    dose_model
+        The model.
+    bounds
+        The extent of the grid: xmin, xmax, ymin, ymax, zmin, zmax.
+    dimensions
+        The number of points of the coarse grid in the X, Y, and Z
+        directions.  A dimension of one gives a grid that is flat in that
+        direction, located at the lower bound.
+    threshold
+        The largest change of the base 10 logarithm of the exposure across
+        a cell that is not refined.
+    levels
+        The largest number of times a cell is divided.
+    threads
+        The number of threads used to evaluate the grid points.
+
+    Raises
+    ------
+    ImportError
+        pyvista is not installed
+    ValueError
+        Invalid bounds, dimensions, threshold or levels
+
+    Returns
+    -------
+        An unstructured grid of lines, quadrilaterals or hexahedra, with
+        the exposure in mR/hr in the point data array 'exposure' and the
+        refinement level of each cell in the cell data array 'level'.
+    """
+    coarse = image_grid(bounds, dimensions)
+    if not isinstance(levels, (int, np.integer)) or levels < 0:
+        raise ValueError(f"Invalid number of levels: {levels}")
+    if not threshold > 0:
+        raise ValueError(f"Invalid threshold: {threshold}")
+    counts = np.array(dimensions)
+    axes = np.flatnonzero(counts > 1)
+    if len(axes) == 0:
+        raise ValueError(f"Invalid grid dimensions: {dimensions}")
+    origin = np.array(coarse.origin, dtype=float)
+    # points lie on a lattice of the finest spacing, so that cells of
+    # different levels share their common corners
+    fine = 2**int(levels)
+    spacing = np.array(coarse.spacing, dtype=float) / fine
+    sizes = (counts - 1) * fine + 1
+    corners = np.array(_CORNERS[len(axes)])
+    offsets = np.zeros((len(corners), 3), dtype=np.int64)
+    offsets[:, axes] = corners
+    cells = np.stack(np.meshgrid(
+        *[np.arange(count - 1) * fine if count > 1 else np.zeros(1)
+          for count in counts], indexing='ij'),
+        axis=-1).reshape(-1, 3).astype(np.int64)
+    size = fine
+    # lattice indices of the evaluated points, in ascending order
+    keys = np.zeros(0, dtype=np.int64)
+    logs = np.zeros(0)
+    finished_cells = []
+    finished_levels = []
+    for level in range(int(levels) + 1):
+        cell_keys = np.ravel_multi_index(
+            tuple((cells[:, np.newaxis, :] +
+                   size * offsets).reshape(-1, 3).T),
+            tuple(sizes)).reshape(len(cells), -1)
+        new = np.setdiff1d(cell_keys, keys)
+        if len(new) > 0:
+            lattice = np.stack(np.unravel_index(new, tuple(sizes)), axis=-1)
+            exposures = dose_model.calculate_exposure_map(
+                origin + lattice * spacing, threads)
+            keys = np.concatenate([keys, new])
+            logs = np.concatenate(
+                [logs, np.log10(np.maximum(exposures, np.finfo(float).tiny))])
+            order = np.argsort(keys)
+            keys = keys[order]
+            logs = logs[order]
+        cell_logs = logs[np.searchsorted(keys, cell_keys)]
+        refine = np.ptp(cell_logs, axis=1) > threshold
+        if level == levels:
+            refine[:] = False
+        finished_cells.append(cell_keys[~refine])
+        finished_levels.append(np.full(np.count_nonzero(~refine), level))
+        size //= 2
+        cells = (cells[refine][:, np.newaxis, :] +
+                 size * offsets).reshape(-1, 3)
+        if len(cells) == 0:
+            break
+    cell_keys = np.concatenate(finished_cells)
+    connectivity = np.searchsorted(keys, cell_keys)
+    lattice = np.stack(np.unravel_index(keys, tuple(sizes)), axis=-1)
+    cell_array = np.hstack([np.full((len(connectivity), 1),
+                                    connectivity.shape[1]),
+                            connectivity]).ravel()
+    grid = pyvista.UnstructuredGrid(
+        cell_array, np.full(len(connectivity), _CELL_TYPES[len(axes)],
+                            dtype=np.uint8),
+        origin + lattice * spacing)
+    grid.point_data[SCALARS] = 10**logs
+    grid.cell_data['level'] = np.concatenate(finished_levels)
+    grid.set_active_scalars(SCALARS)
+    return grid
+
+
+def contours(dose_grid: "pyvista.DataSet",
+             levels: Sequence[float]) -> "pyvista.PolyData":
+    """Extracts isodose surfaces from a dose grid.
+
+    For a flat (two-dimensional) grid the surfaces are lines.
+
+    Parameters
+    ----------
+    dose_grid
+        A grid with exposures attached.
+    levels
+        The exposures in mR/hr of the isodose surfaces.
+
+    Raises
+    ------
+    ValueError
+        The grid has no exposures
+
+    Returns
+    -------
+        The isodose surfaces, with their exposure in the point data array
+        'exposure'.
+    """
+    if SCALARS not in dose_grid.point_data:
+        raise ValueError("Grid has no exposures")
+    return dose_grid.contour(np.asarray(levels, dtype=float).tolist(),
+                             scalars=SCALARS)
+
+
+def _grid_suffix(dose_grid: "pyvista.DataSet") -> str:
+    """Returns the VTK file extension for a grid."""
+    if isinstance(dose_grid, pyvista.ImageData):
+        return '.vti'
+    if isinstance(dose_grid, pyvista.StructuredGrid):
+        return '.vts'
+    if isinstance(dose_grid, pyvista.UnstructuredGrid):
+        return '.vtu'
+    return '.vtk'
+
+
+def render(dose_model: model.Model, path: Union[str, os.PathLike],
+           grid: Optional["pyvista.DataSet"] = None,
+           levels: Optional[Sequence[float]] = None,
+           save_grid: bool = False, threads: Optional[int] = None,
+           window_size: Sequence[int] = (1024, 768)) \
+        -> Optional["pyvista.DataSet"]:
+    """Renders a model and its dose map to an image without opening a
+    window.
+
+    The model geometry is drawn as by
+    :meth:`zapmenot.model.Model.display`.  If a grid is given, the
+    exposure is calculated on it.  The isodose surfaces of the requested
+    levels are then drawn; without levels, slices through the middle of
+    the grid are drawn.  Exposures are colored on a logarithmic scale.
+
+    Parameters
+    ----------
+    dose_model
+        The model.
+    path
+        The image file, normally a PNG file.
+    grid
+        The dose map grid.  If the grid already has exposures attached,
+        they are used as they are.
+    levels
+        The exposures in mR/hr of the isodose surfaces.
+    save_grid
+        If True, the dose grid is also written to a VTK file with the
+        same name as the image (.vti for ImageData, .vts for
+        StructuredGrid, .vtu for UnstructuredGrid, and .vtk otherwise).
+    threads
+        The number of threads used to evaluate the grid points.
+    window_size
+        The width and height of the image in pixels.
+
+    Raises
+    ------
+    ImportError
+        pyvista is not installed
+
+    Returns
+    -------
+        The dose grid, or None if no grid was given.
+    """
+    _require_pyvista()
+    dose_grid = None
+    if grid is not None:
+        dose_grid = grid if SCALARS in grid.point_data \
+            else calculate(dose_model, grid, threads)
+    plotter = dose_model._plotter(off_screen=True, window_size=window_size)
+    try:
+        if dose_grid is not None:
+            positive = dose_grid.point_data[SCALARS]
+            positive = positive[positive > 0]
+            options = {'scalars': SCALARS, 'cmap': 'jet',
+                       'scalar_bar_args': {'title': 'mR/hr'}}
+            if len(positive) > 0:
+                options.update(log_scale=True, clim=(float(positive.min()),
+                                                     float(positive.max())))
+            if levels is not None:
+                surfaces = contours(dose_grid, levels)
+                if surfaces.n_points > 0:
+                    plotter.add_mesh(surfaces, opacity=0.6, **options)
+            else:
+                plotter.add_mesh(dose_grid.slice_orthogonal(), **options)
+            plotter.add_mesh(dose_grid.outline(), color='black')
+            if save_grid:
+                dose_grid.save(os.path.splitext(os.fspath(path))[0] +
+                               _grid_suffix(dose_grid))
+        plotter.screenshot(os.fspath(path))
+    finally:
+        plotter.close()
+    return dose_grid
+
+
+def _start_worker() -> None:
+    """Prepares a worker process for rendering without a display."""
+    pyvista.OFF_SCREEN = True
+
+
+def _render_case(dose_model: model.Model, path: Union[str, os.PathLike],
+                 grid: Optional["pyvista.DataSet"],
+                 levels: Optional[Sequence[float]], save_grid: bool,
+                 window_size: Sequence[int]) -> str:
+    """Renders one case of a batch, returning an error message, or an
+    empty string if the case succeeded."""
+    try:
+        render(dose_model, path, grid, levels, save_grid,
+               window_size=window_size)
+    except Exception as error:
+        return f"{type(error).__name__}: {error}"
+    return ''
+
+
+def render_batch(models: Sequence[model.Model],
+                 paths: Sequence[Union[str, os.PathLike]],
+                 grid: Optional["pyvista.DataSet"] = None,
+                 levels: Optional[Sequence[float]] = None,
+                 save_grid: bool = False, processes: Optional[int] = None,
+                 window_size: Sequence[int] = (1024, 768)) -> List[str]:
+    """Renders a set of models and their dose maps to images.
+
+    Each case is rendered as by :func:`render`, on the same grid.  The
+    cases can be divided among several worker processes, which render
+    without a display.  A case that fails does not stop the others.
+
+    Parameters
+    ----------
+    models
+        The models.
+    paths
+        The image file of each model.
+    grid
+        The dose map grid.
+    levels
+        The exposures in mR/hr of the isodose surfaces.
+    save_grid
+        If True, each dose grid is also written to a VTK file.
+    processes
+        The number of worker processes.  If None, the cases are rendered
+        in the calling process.
+    window_size
+        The width and height of the images in pixels.
+
+    Raises
+    ------
+    ImportError
+        pyvista is not installed
+    ValueError
+        The numbers of models and paths differ
+
+    Returns
+    -------
+        The error message of each case, or an empty string for each case
+        that succeeded.
+    """
+    _require_pyvista()
+    if len(models) != len(paths):
+        raise ValueError("A path is required for each model")
+    count = len(models)
+    arguments = (models, paths, [grid] * count, [levels] * count,
+                 [save_grid] * count, [window_size] * count)
+    if processes is None or processes == 1 or count < 2:
+        return list(map(_render_case, *arguments))
+    with concurrent.futures.ProcessPoolExecutor(
+            processes, initializer=_start_worker) as pool:
+        return list(pool.map(_render_case, *arguments))
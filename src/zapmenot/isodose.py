@@ -0,0 +1,534 @@
+import concurrent.futures
+import math
+import numbers
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import model
+
+import importlib
+pyvista_spec = importlib.util.find_spec("pyvista")
+pyvista_found = pyvista_spec is not None
+if pyvista_found:
+    import pyvista
+''' '''
+'''
+ZapMeNot - a point kernel photon shielding library
+Copyright (C) 2019-2025  C. Alan Ford
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+# exposure rates in mR/hr bounding the radiation area, high radiation area
+# and locked high radiation area
+ZONE_LEVELS = (5.0, 100.0, 1000.0)
+
+
+def source_center(dose_model: model.Model) -> np.ndarray:
+    """Returns the weighted center of the source points of a model.
+
+    Parameters
+    ----------
+    dose_model
+        The model.
+
+    Raises
+    ------
+    ValueError
+        The model has no source
+
+    Returns
+    -------
+        The X, Y, and Z cartesian coordinates of the center.
+    """
+    if dose_model.source is None:
+        raise ValueError("Model is missing a source")
+    points = np.array(dose_model.source._get_source_points(), dtype=float)
+    weights = np.asarray(dose_model.source._get_source_point_weights(),
+                         dtype=float)
+    return np.average(points.reshape(-1, 3), axis=0, weights=weights)
+
+
+def crossings(dose_model: model.Model, levels: Sequence[float],
+              directions: Sequence[Sequence[float]], max_distance: float,
+              origin: Optional[Sequence[float]] = None, samples: int = 24,
+              tolerance: float = 1E-4,
+              threads: Optional[int] = None) -> np.ndarray:
+    """Finds the distances along rays at which the exposure falls to a set
+    of levels.
+
+    The exposure is first evaluated at distances spaced geometrically
+    along every ray, all together, to bracket each crossing.  Each
+    crossing is then refined with a secant iteration on the logarithm of
+    the exposure, safeguarded by bisection, as in
+    :meth:`zapmenot.model.Model.solve_distance`.  Every location is
+    evaluated as by :meth:`zapmenot.model.Model.calculate_exposure_map`,
+    including any far-field approximation, and the spectrum, cross
+    sections, and far-field bundle are found once.  The number of
+    evaluations is proportional to the number of rays, not to the volume
+    they cover.
+
+    If the exposure falls to a level more than once along a ray, the
+    crossing farthest from the origin is found.
+
+    Parameters
+    ----------
+    dose_model
+        The model.
+    levels
+        The exposures in mR/hr.
+    directions
+        The direction of each ray.
+    max_distance
+        The length of each ray in cm.
+    origin
+        The start of the rays.  Defaults to the center of the source.
+    samples
+        The number of locations along each ray used to bracket the
+        crossings.
+    tolerance
+        The tolerance on the natural logarithm of the exposure at each
+        crossing.
+    threads
+        The number of threads used to evaluate the exposure.
+
+    Raises
+    ------
+    ValueError
+        Invalid levels, directions, distance or samples
+
+    Returns
+    -------
+        The distance in cm from the origin of each crossing, indexed by
+        level and ray.  The distance is NaN if the exposure along the ray
+        does not reach the level, is still above the level at the end
+        of the ray, or the crossing cannot be refined.
+    """
+    if dose_model.source is None:
+        raise ValueError("Model is missing a source")
+    targets = np.asarray(levels, dtype=float).reshape(-1)
+    if targets.size == 0 or np.any(~(targets > 0)):
+        raise ValueError(f"Invalid isodose levels: {levels}")
+    units = np.asarray(directions, dtype=float).reshape(-1, 3)
+    lengths = np.linalg.norm(units, axis=1)
+    if np.any(lengths == 0):
+        raise ValueError("Invalid ray direction")
+    units = units / lengths[:, np.newaxis]
+    if not isinstance(max_distance, numbers.Number) or max_distance <= 0:
+        raise ValueError(f"Invalid distance: {max_distance}")
+    if not isinstance(samples, int) or samples < 2:
+        raise ValueError(f"Invalid number of samples: {samples}")
+    start = _origin(dose_model, origin)
+    # the first sample lies just off the origin, which may be a point
+    # source
+    distances = max_distance * np.geomspace(1E-3, 1, samples)
+    locations = (start + distances[np.newaxis, :, np.newaxis] *
+                 units[:, np.newaxis, :]).reshape(-1, 3)
+    # the brackets and the refinement share one evaluator, so every
+    # location is lumped or evaluated in full as in an exposure map
+    points, inverse = dose_model._map_targets(locations)
+    exposure = dose_model._location_evaluator(
+        dose_model._map_setup(points))
+    exposures = dose_model._evaluate_map(
+        lambda indices: np.sum(exposure(points[indices]), axis=1),
+        np.arange(len(points)), threads)[inverse]
+    exposures = exposures.reshape(len(units), samples)
+    with np.errstate(divide='ignore'):
+        logs = np.log(exposures)
+    answer = np.full((len(targets), len(units)), np.nan)
+    brackets = []
+    for level_index, target in enumerate(targets):
+        above = logs > math.log(target)
+        for ray_index in np.flatnonzero(np.any(above, axis=1) &
+                                        ~above[:, -1]):
+            # the last sample above the level
+            last = samples - 1 - np.argmax(above[ray_index, ::-1])
+            brackets.append((level_index, ray_index, last))
+
+    def refine(bracket):
+        level_index, ray_index, last = bracket
+        target = targets[level_index]
+        unit = units[ray_index]
+
+        def log_dose(distance):
+            dose = np.sum(exposure((start + distance * unit)[np.newaxis]))
+            if dose <= 0:
+                return -np.inf, None
+            return math.log(dose / target), None
+
+        ends = logs[ray_index, last:last + 2] - math.log(target)
+        try:
+            return model._find_root(log_dose, distances[last],
+                                    distances[last + 1], tolerance, 100,
+                                    values=(ends[0], ends[1]))
+        except ValueError:
+            # the crossing of this ray is left undefined
+            return np.nan
+
+    if threads is None or threads == 1 or len(brackets) < 2:
+        roots = list(map(refine, brackets))
+    else:
+        with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+            roots = list(pool.map(refine, brackets))
+    for (level_index, ray_index, _), root in zip(brackets, roots):
+        answer[level_index, ray_index] = root
+    return answer
+
+
+def _require_pyvista() -> None:
+    """Raises an ImportError if pyvista is not installed."""
+    if not pyvista_found:
+        raise ImportError("pyvista is required for isodose lines and "
+                          "surfaces")
+
+
+def _plane_axes(normal: Sequence[float]) -> np.ndarray:
+    """Returns two unit vectors spanning the plane normal to a vector.
+
+    Parameters
+    ----------
+    normal
+        The normal of the plane.
+    """
+    unit = np.asarray(normal, dtype=float)
+    if unit.shape != (3,) or np.linalg.norm(unit) == 0:
+        raise ValueError(f"Invalid plane normal: {normal}")
+    unit = unit / np.linalg.norm(unit)
+    # the first axis is the coordinate axis farthest from the normal,
+    # projected into the plane
+    first = np.eye(3)[np.argmin(np.abs(unit))]
+    first = first - np.dot(first, unit) * unit
+    first = first / np.linalg.norm(first)
+    return np.stack([first, np.cross(unit, first)])
+
+
+def _ring(normal: Sequence[float], resolution: int) -> np.ndarray:
+    """Returns directions spaced evenly in angle around a plane.
+
+    Parameters
+    ----------
+    normal
+        The normal of the plane.
+    resolution
+        The number of directions.
+    """
+    if not isinstance(resolution, int) or resolution < 3:
+        raise ValueError(f"Invalid resolution: {resolution}")
+    axes = _plane_axes(normal)
+    angles = np.linspace(0, 2 * np.pi, resolution, endpoint=False)
+    return np.cos(angles)[:, np.newaxis] * axes[0] + \
+        np.sin(angles)[:, np.newaxis] * axes[1]
+
+
+def _polylines(start: np.ndarray, units: np.ndarray, level: float,
+               distances: np.ndarray) -> "pyvista.PolyData":
+    """Joins the crossings of one level around a plane into polylines.
+
+    Parameters
+    ----------
+    start
+        The start of the rays.
+    units
+        The direction of each ray.
+    level
+        The exposure in mR/hr.
+    distances
+        The distance to the crossing along each ray, or NaN.
+    """
+    found = np.isfinite(distances)
+    points = start + distances[found, np.newaxis] * units[found]
+    # point index of each ray, or -1 if the ray has no crossing
+    index = np.full(len(units), -1)
+    index[found] = np.arange(len(points))
+    if np.all(found):
+        lines = [list(index) + [index[0]]]
+    else:
+        # each polyline starts after a ray with no crossing
+        lines = []
+        run: List[int] = []
+        first = int(np.argmin(found))
+        for step in range(1, len(units) + 1):
+            ray = (first + step) % len(units)
+            if found[ray]:
+                run.append(index[ray])
+                continue
+            if len(run) > 1:
+                lines.append(run)
+            run = []
+    result = pyvista.PolyData(points.reshape(-1, 3))
+    if lines:
+        result.lines = np.concatenate([[len(line)] + list(line)
+                                       for line in lines])
+    result.point_data['exposure'] = np.full(len(points), float(level))
+    return result
+
+
+def _sphere(resolution: int) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Returns directions on a latitude and longitude grid, with the
+    quadrilaterals and polar triangles that join them.
+
+    Parameters
+    ----------
+    resolution
+        The number of latitudes; twice as many longitudes are used.
+    """
+    if not isinstance(resolution, int) or resolution < 2:
+        raise ValueError(f"Invalid resolution: {resolution}")
+    # latitudes run between (but not to) the poles, whose directions are
+    # added at the end
+    polar = (np.arange(resolution) + 0.5) * np.pi / resolution
+    azimuth = np.arange(2 * resolution) * np.pi / resolution
+    theta, phi = np.meshgrid(polar, azimuth, indexing='ij')
+    units = np.column_stack([(np.sin(theta) * np.cos(phi)).ravel(),
+                             (np.sin(theta) * np.sin(phi)).ravel(),
+                             np.cos(theta).ravel()])
+    units = np.vstack([units, [[0, 0, 1], [0, 0, -1]]])
+    rows, columns = resolution, 2 * resolution
+    grid = np.arange(rows * columns).reshape(rows, columns)
+    following = np.roll(grid, -1, axis=1)
+    cells = [np.stack([grid[:-1], following[:-1], following[1:], grid[1:]],
+                      axis=-1).reshape(-1, 4),
+             np.column_stack([np.full(columns, rows * columns),
+                              following[0], grid[0]]),
+             np.column_stack([np.full(columns, rows * columns + 1),
+                              grid[-1], following[-1]])]
+    return units, cells
+
+
+def _surface(start: np.ndarray, units: np.ndarray,
+             cells: List[np.ndarray],
+             level: float, distances: np.ndarray) -> "pyvista.PolyData":
+    """Joins the crossings of one level around a sphere into a surface.
+
+    Parameters
+    ----------
+    start
+        The start of the rays.
+    units
+        The direction of each ray.
+    cells
+        The faces joining the rays.
+    level
+        The exposure in mR/hr.
+    distances
+        The distance to the crossing along each ray, or NaN.
+    """
+    found = np.isfinite(distances)
+    points = start + distances[found, np.newaxis] * units[found]
+    index = np.full(len(units), -1)
+    index[found] = np.arange(len(points))
+    faces = []
+    for group in cells:
+        kept = index[group]
+        # faces are left out where a ray has no crossing
+        kept = kept[np.all(kept >= 0, axis=1)]
+        faces.append(np.column_stack(
+            [np.full(len(kept), group.shape[1]), kept]).ravel())
+    result = pyvista.PolyData(points.reshape(-1, 3),
+                              faces=np.concatenate(faces).astype(int))
+    result.point_data['exposure'] = np.full(len(points), float(level))
+    return result
+
+
+def _origin(dose_model: model.Model,
+            origin: Optional[Sequence[float]]) -> np.ndarray:
+    """Returns the start of the rays, by default the source center."""
+    if origin is None:
+        return source_center(dose_model)
+    return np.asarray(origin, dtype=float)
+
+
+def isodose_lines(dose_model: model.Model, levels: Sequence[float],
+                  max_distance: float,
+                  normal: Sequence[float] = (0, 0, 1),
+                  origin: Optional[Sequence[float]] = None,
+                  resolution: int = 180, samples: int = 24,
+                  tolerance: float = 1E-4,
+                  threads: Optional[int] = None) -> "pyvista.PolyData":
+    """Finds isodose lines in a plane through the source.
+
+    The crossings are found by :func:`crossings` along rays spaced evenly
+    in angle around the origin.  Consecutive crossings of each level are
+    joined into closed polylines, which are broken where a ray has no
+    crossing.
+
+    Parameters
+    ----------
+    dose_model
+        The model.
+    levels
+        The exposures in mR/hr.
+    max_distance
+        The length of each ray in cm.
+    normal
+        The normal of the plane.
+    origin
+        A point in the plane from which the rays start.  Defaults to the
+        center of the source.
+    resolution
+        The number of rays.
+    samples
+        The number of locations along each ray used to bracket the
+        crossings.
+    tolerance
+        The tolerance on the natural logarithm of the exposure at each
+        crossing.
+    threads
+        The number of threads used to evaluate the exposure.
+
+    Raises
+    ------
+    ImportError
+        pyvista is not installed
+    ValueError
+        Invalid arguments
+
+    Returns
+    -------
+        The isodose lines, with their exposure in the point data array
+        'exposure'.
+    """
+    _require_pyvista()
+    start = _origin(dose_model, origin)
+    units = _ring(normal, resolution)
+    targets = np.asarray(levels, dtype=float).reshape(-1)
+    distances = crossings(dose_model, targets, units, max_distance, start,
+                          samples, tolerance, threads)
+    return pyvista.merge([_polylines(start, units, target, row)
+                          for target, row in zip(targets, distances)],
+                         merge_points=False)
+
+
+def isodose_surfaces(dose_model: model.Model, levels: Sequence[float],
+                     max_distance: float,
+                     origin: Optional[Sequence[float]] = None,
+                     resolution: int = 24, samples: int = 24,
+                     tolerance: float = 1E-4,
+                     threads: Optional[int] = None) -> "pyvista.PolyData":
+    """Finds isodose surfaces around the source.
+
+    The crossings are found by :func:`crossings` along rays on a latitude
+    and longitude grid of directions around the origin, and neighboring
+    crossings of each level are joined into quadrilaterals (and triangles
+    at the poles).  A face is left out where a ray has no crossing.
+
+    Parameters
+    ----------
+    dose_model
+        The model.
+    levels
+        The exposures in mR/hr.
+    max_distance
+        The length of each ray in cm.
+    origin
+        The start of the rays.  Defaults to the center of the source.
+    resolution
+        The number of latitudes; twice as many longitudes are used.
+    samples
+        The number of locations along each ray used to bracket the
+        crossings.
+    tolerance
+        The tolerance on the natural logarithm of the exposure at each
+        crossing.
+    threads
+        The number of threads used to evaluate the exposure.
+
+    Raises
+    ------
+    ImportError
+        pyvista is not installed
+    ValueError
+        Invalid arguments
+
+    Returns
+    -------
+        The isodose surfaces, with their exposure in the point data array
+        'exposure'.
+    """
+    _require_pyvista()
+    start = _origin(dose_model, origin)
+    units, cells = _sphere(resolution)
+    targets = np.asarray(levels, dtype=float).reshape(-1)
+    distances = crossings(dose_model, targets, units, max_distance, start,
+                          samples, tolerance, threads)
+    return pyvista.merge([_surface(start, units, cells, target, row)
+                          for target, row in zip(targets, distances)],
+                         merge_points=False)
+
+
+def radiation_zones(dose_model: model.Model, max_distance: float,
+                    levels: Sequence[float] = ZONE_LEVELS,
+                    normal: Optional[Sequence[float]] = None,
+                    origin: Optional[Sequence[float]] = None,
+                    resolution: Optional[int] = None, samples: int = 24,
+                    threads: Optional[int] = None) \
+        -> Dict[float, "pyvista.PolyData"]:
+    """Finds the boundaries of the radiation zones around a source.
+
+    Each boundary is the isodose line (in a plane) or surface at which the
+    exposure falls to a zone level.  By default the levels are 5, 100 and
+    1000 mR/hr, which bound the radiation area, high radiation area, and
+    locked high radiation area.  The boundaries of all of the levels are
+    found from a single set of rays.
+
+    Parameters
+    ----------
+    dose_model
+        The model.
+    max_distance
+        The largest distance from the origin searched, in cm.
+    levels
+        The exposures in mR/hr at the zone boundaries.
+    normal
+        If given, the boundaries are found as lines in the plane through
+        the origin with this normal; otherwise they are found as
+        surfaces.
+    origin
+        The start of the rays.  Defaults to the center of the source.
+    resolution
+        The number of rays around the plane (default 180), or the number
+        of latitudes of the surfaces (default 24).
+    samples
+        The number of locations along each ray used to bracket the
+        boundaries.
+    threads
+        The number of threads used to evaluate the exposure.
+
+    Raises
+    ------
+    ImportError
+        pyvista is not installed
+    ValueError
+        Invalid arguments
+
+    Returns
+    -------
+        The boundary of each zone, keyed by level.  A boundary is empty if
+        the exposure does not reach its level.
+    """
+    _require_pyvista()
+    start = _origin(dose_model, origin)
+    targets = np.asarray(levels, dtype=float).reshape(-1)
+    if normal is not None:
+        units = _ring(normal, resolution or 180)
+    else:
+        units, cells = _sphere(resolution or 24)
+    distances = crossings(dose_model, targets, units, max_distance, start,
+                          samples, threads=threads)
+    if normal is not None:
+        return {float(target): _polylines(start, units, target, row)
+                for target, row in zip(targets, distances)}
+    return {float(target): _surface(start, units, cells, target, row)
+            for target, row in zip(targets, distances)}
@@ -1,16 +1,7 @@
-import yaml
-from typing import Optional, List, Dict, TypedDict, ClassVar
-
-try:
-    from yaml import CLoader as MyLoader, CDumper as MyDumper
-except ImportError:
-    from yaml import FullLoader as MyLoader, SafeDumper as MyDumper
-
-try:
-    from importlib import resources as impresources
-except ImportError:
-    # Try backported to PY<37 `importlib_resources`.
-    import importlib_resources as impresources
+from typing import Optional, List, Dict, Mapping, Sequence, TypedDict, \
+    ClassVar
+
+from . import library
 ''' '''
 '''
 ZapMeNot - a point kernel photon shielding library
@@ -49,32 +40,25 @@ class Isotope:
                               'photon-energy-units': str,
                               'photon-intensity': List[List[float]],
                               }, total=True)
-    _library: ClassVar[Optional[Dict[str, Atom]]] = None
+    # the isotope library is shared by all threads and is read only
+    _library: ClassVar[library.SharedLibrary] = \
+        library.SharedLibrary('isotopeLibrary.yml')
 
     def __init__(self, name: str) -> None:
-        # initialize the class library if it has not already been done
-        if Isotope._library is None:
-            path = 'isotopeLibrary.yml'
-            try:
-                inp_file = (impresources.files(__package__) / path)
-                stream = inp_file.open("r")
-            except AttributeError:
-                # Python < PY3.9, fall back to method deprecated in PY3.11.
-                stream = impresources.open_text(__package__, path)
-            Isotope._library = yaml.load(stream, Loader=MyLoader)
-            stream.close()
+        # read the class library if it has not already been done
+        entries = Isotope._library.get()
 
         # check to see if the name is in the library
         if not isinstance(name, str):
             raise ValueError(f"Isotope name is not a string: {name}")
         name = name.lower().capitalize()
-        if name not in Isotope._library.keys():
+        if name not in entries.keys():
             raise ValueError("Isotope not found in the Isotope Library")
 
         # initialize the object
         self._name: str = name
         # verify a valid dictionary was returned, not a None
-        temp1 = Isotope._library.get(self._name)
+        temp1 = entries.get(self._name)
         if temp1:
             properties: Isotope.Atom = temp1
         # convert the half-life to units of seconds
@@ -82,19 +66,23 @@ class Isotope:
         half_life_units: str = properties["half-life-units"]
         self._half_life: float = Isotope._convert_half_life(
             half_life, half_life_units)
-        self._key_progeny: Optional[Dict[str, float]] = \
+        # the progeny and photons are read-only views of the library
+        self._key_progeny: Optional[Mapping[str, float]] = \
             properties.get("key_progeny")
 
-        # photon energies and intensities are stored as a list of tuples
-        # 2D list of photon energies and intensities
-        self._photons: Optional[List[List[float]]] = \
+        # photon energies and intensities are stored as a tuple of
+        # (energy, intensity) pairs
+        self._photons: Optional[Sequence[Sequence[float]]] = \
             properties.get("photon-intensity")
 
     @property
     def photons(self) -> Optional[List[List[float]]]:
         """A list of photon energies (in MeV)
-        and intensities per decay."""
-        return self._photons
+        and intensities per decay.  The list is a copy, so changing it
+        does not change the shared library."""
+        if self._photons is None:
+            return None
+        return [list(photon) for photon in self._photons]
 
     @property
     def name(self) -> str:
@@ -109,8 +97,11 @@ class Isotope:
     @property
     def key_progeny(self) -> Optional[Dict[str, float]]:
         """The list of progeny that can be in secular or
-        transient equilibrium."""
-        return self._key_progeny
+        transient equilibrium.  The dictionary is a copy, so changing it
+        does not change the shared library."""
+        if self._key_progeny is None:
+            return None
+        return dict(self._key_progeny)
 
     @staticmethod
     def _convert_half_life(value: float, units: str) -> float:
@@ -0,0 +1,107 @@
+import threading
+import types
+from typing import Any, Mapping, Optional
+
+import yaml
+
+try:
+    from yaml import CLoader as MyLoader
+except ImportError:
+    from yaml import FullLoader as MyLoader
+
+try:
+    from importlib import resources as impresources
+except ImportError:
+    # Try backported to PY<37 `importlib_resources`.
+    import importlib_resources as impresources
+''' '''
+'''
+ZapMeNot - a point kernel photon shielding library
+Copyright (C) 2019-2025  C. Alan Ford
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+
+def freeze(value: Any) -> Any:
+    """Returns an immutable copy of parsed YAML data.
+
+    Dictionaries become read-only mappings and lists become tuples, so
+    the data can be shared between threads without copying.
+
+    Parameters
+    ----------
+    value
+        The parsed data.
+    """
+    if isinstance(value, dict):
+        return types.MappingProxyType(
+            {key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class SharedLibrary:
+    """A data library that is read from a YAML file in the ZapMeNot
+    package the first time it is used.
+
+    The library is loaded by exactly one thread; other threads that ask
+    for it while it is loading wait for that load to finish rather than
+    reading the file again.  Once loaded, the library is immutable and is
+    returned without locking.
+
+    Parameters
+    ----------
+    path
+        The name of the YAML file within the package.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path: str = path
+        self._data: Optional[Mapping[str, Any]] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        """True if the library has been read."""
+        return self._data is not None
+
+    def get(self) -> Mapping[str, Any]:
+        """Returns the library, reading it if required.
+
+        Returns
+        -------
+            Read-only mapping of the library entries.
+        """
+        data = self._data
+        if data is None:
+            with self._lock:
+                # another thread may have loaded the library while this
+                # one was waiting for the lock
+                if self._data is None:
+                    self._data = freeze(self._read())
+                data = self._data
+        return data
+
+    def _read(self) -> Any:
+        """Parses the YAML file."""
+        try:
+            inp_file = (impresources.files(__package__) / self._path)
+            stream = inp_file.open("r")
+        except AttributeError:
+            # Python < PY3.9, fall back to method deprecated in PY3.11.
+            stream = impresources.open_text(__package__, self._path)
+        with stream:
+            return yaml.load(stream, Loader=MyLoader)
@@ -1,19 +1,10 @@
+import threading
 from scipy.interpolate import Akima1DInterpolator
 import numpy as np
 import numbers
-import yaml
 from typing import List, Optional, Union, Dict, ClassVar, TypedDict
 
-try:
-    from yaml import CLoader as MyLoader, CDumper as MyDumper
-except ImportError:
-    from yaml import FullLoader as MyLoader, SafeDumper as MyDumper
-
-try:
-    from importlib import resources as impresources
-except ImportError:
-    # Try backported to PY<37 `importlib_resources`.
-    import importlib_resources as impresources
+from . import library
 ''' '''
 '''
 ZapMeNot - a point kernel photon shielding library
@@ -59,85 +50,73 @@ class Material:
                               'mass-en-abs-coff-units': Optional[str],
                               'mass-en-abs-coff-energy': Optional[List[float]],
                               }, total=True)
-    _library: ClassVar[Optional[Dict[str, Material_Specification]]] = None
-
-    # _library: ClassVar[Optional[Dict[str, Any]]] = None
+    # the material library is shared by all threads and is read only
+    _library: ClassVar[library.SharedLibrary] = \
+        library.SharedLibrary('materialLibrary.yml')
+    # arrays and interpolators for each material, built on first use
+    _parsed: ClassVar[Dict[str, "_MaterialData"]] = {}
+    _parsed_lock: ClassVar[threading.Lock] = threading.Lock()
 
     def __init__(self, name: str) -> None:
         if name is None or not isinstance(name, str):
             raise ValueError(f"Material name is not a string: {name}")
-
-        # initialize the class library if it has not already been done
-        if Material._library is None:
-            path = 'materialLibrary.yml'
-            try:
-                inp_file = (impresources.files(__package__) / path)
-                stream = inp_file.open("r")
-            except AttributeError:
-                # Python < PY3.9, fall back to method deprecated in PY3.11.
-                stream = impresources.open_text(__package__, path)
-            Material._library = yaml.load(stream, Loader=MyLoader)
-            stream.close()
-
-        # check to see if the name is in the library
         name = name.lower()
-        if name not in Material._library.keys():
-            raise ValueError("Material not found in the Material Library")
+        data = Material._get_data(name)
 
-        # initialize the object
+        # initialize the object; the arrays and interpolators are shared
+        # between all objects of the same material and are not modified
         self._name: str = name
-        temp1 = Material._library.get(self._name)
-        if temp1:
-            properties: Material.Material_Specification = temp1
-        self._density: float = properties["density"]
-        self._atten_energy_bins: np.ndarray = np.array(
-            properties["mass-atten-coff-energy"])
-        self._mass_atten_coff: np.ndarray = \
-            np.array(properties["mass-atten-coff"])
+        self._density: float = data.density
+        self._atten_energy_bins: np.ndarray = data.atten_energy_bins
+        self._mass_atten_coff: np.ndarray = data.mass_atten_coff
         # the mass energy absorption coefficient is optional for a material
-        self._en_abs_energy_bins: np.ndarray = np.array(
-            properties.get("mass-en-abs-coff-energy"))
-        self._mass_en_abs_coff: np.ndarray = \
-            np.array(properties.get("mass-en-abs-coff"))
+        self._en_abs_energy_bins: np.ndarray = data.en_abs_energy_bins
+        self._mass_en_abs_coff: np.ndarray = data.mass_en_abs_coff
         # the buildup factor data is optional for a material
-        self._gp_energy_bins: np.ndarray = \
-            np.array(properties.get("gp-coff-energy"))
-        gp_data = properties.get("gp-coeff")
-        if gp_data is None:
-            self.gp_data_available: bool = False
-            # self._gp_b: Optional[np.ndarray] = None
-            # self._gp_c: Optional[np.ndarray] = None
-            # self._gp_a: Optional[np.ndarray] = None
-            # self._gp_X: Optional[np.ndarray] = None
-            # self._gp_d: Optional[np.ndarray] = None
-            # self._bi: Optional[Akima1DInterpolator] = None
-            # self._ci: Optional[Akima1DInterpolator] = None
-            # self._ai: Optional[Akima1DInterpolator] = None
-            # self._Xi: Optional[Akima1DInterpolator] = None
-            # self._di: Optional[Akima1DInterpolator] = None
-        else:
-            self.gp_data_available = True
-            gp_array = np.array(gp_data)
-            self._gp_b: np.ndarray = gp_array[:, 0]
-            self._gp_c: np.ndarray = gp_array[:, 1]
-            self._gp_a: np.ndarray = gp_array[:, 2]
-            self._gp_X: np.ndarray = gp_array[:, 3]
-            self._gp_d: np.ndarray = gp_array[:, 4]
-            # here we are building interpolators based on the Akima method.
-            # For more information on the use of Akima method on G-P coefficients,
-            # see https://www.nrc.gov/docs/ML1905/ML19059A414.pdf
-            # "QAD-CGGP2 and G33-GP2: Revised Version of QAD-CGGP and G33-GP"
-            logE = np.log(self._gp_energy_bins)
-            self._bi: Akima1DInterpolator = Akima1DInterpolator(logE,
-                                                                self._gp_b)
-            self._ci: Akima1DInterpolator = Akima1DInterpolator(logE,
-                                                                self._gp_c)
-            self._ai: Akima1DInterpolator = Akima1DInterpolator(logE,
-                                                                self._gp_a)
-            self._Xi: Akima1DInterpolator = Akima1DInterpolator(logE,
-                                                                self._gp_X)
-            self._di: Akima1DInterpolator = Akima1DInterpolator(logE,
-                                                                self._gp_d)
+        self._gp_energy_bins: np.ndarray = data.gp_energy_bins
+        self.gp_data_available: bool = data.gp_data_available
+        if data.gp_data_available:
+            self._gp_b: np.ndarray = data.gp_b
+            self._gp_c: np.ndarray = data.gp_c
+            self._gp_a: np.ndarray = data.gp_a
+            self._gp_X: np.ndarray = data.gp_X
+            self._gp_d: np.ndarray = data.gp_d
+            self._bi: Akima1DInterpolator = data.bi
+            self._ci: Akima1DInterpolator = data.ci
+            self._ai: Akima1DInterpolator = data.ai
+            self._Xi: Akima1DInterpolator = data.Xi
+            self._di: Akima1DInterpolator = data.di
+
+    @staticmethod
+    def _get_data(name: str) -> "_MaterialData":
+        """Returns the shared arrays and interpolators for a material.
+
+        The data for each material is built once.  Later requests are
+        served from a dictionary without locking.
+
+        Parameters
+        ----------
+        name
+            The lower case material name.
+
+        Raises
+        ------
+        ValueError
+            Material not found in the Material Library
+        """
+        data = Material._parsed.get(name)
+        if data is not None:
+            return data
+        # check to see if the name is in the library
+        entries = Material._library.get()
+        if name not in entries.keys():
+            raise ValueError("Material not found in the Material Library")
+        with Material._parsed_lock:
+            data = Material._parsed.get(name)
+            if data is None:
+                data = _MaterialData(entries[name])
+                Material._parsed[name] = data
+        return data
 
     @property
     def name(self) -> str:
@@ -295,6 +274,81 @@ class Material:
         bf = Material._GP(a, b, c, d, X, mfp)
         return bf
 
+    def get_buildup_derivative(self, energy: float,
+                               mfps: Union[float, np.ndarray]) \
+            -> Union[float, np.ndarray]:
+        """Calculates the derivative of the GP buildup factor with respect
+        to mean free path.
+
+        The derivative is analytic for mean free paths up to 40.  Beyond
+        40 mfp the buildup factor is extrapolated (see :meth:`_GP`) and the
+        derivative is found by central differences of the extrapolation.
+
+        Parameters
+        ----------
+        energy
+            The photon energy in MeV
+        mfps
+            One or more mean free path values through the material
+
+        Raises
+        ------
+        ValueError
+            Photon energy is out of range
+
+        Returns
+        -------
+            The derivative of the buildup factor, one for each specified mfp
+        """
+        if self.gp_data_available is False:
+            raise ValueError("Material has no buildup factor data available")
+        if not isinstance(energy, numbers.Number):
+            raise ValueError(f"Invalid energy: {energy}")
+        try:
+            mfp = np.array(mfps, dtype=float)
+        except Exception:
+            raise ValueError("mfps have invalid array structure")
+        if np.amin(mfp) < 0:
+            raise ValueError("negative mfp")
+        if (energy < self._gp_energy_bins[0]) or \
+                (energy > self._gp_energy_bins[-1]):
+            raise ValueError("Photon energy is out of range")
+        logE = np.log(energy)
+        b = self._bi(logE)
+        c = self._ci(logE)
+        a = self._ai(logE)
+        X = self._Xi(logE)
+        d = self._di(logE)
+
+        x = np.atleast_1d(mfp).ravel()
+        answers = np.full(x.size, b - 1.)  # slope of the buildup at 0 mfp
+        fitted = np.logical_and(x > 0, x <= 40)
+        xf = x[fitted]
+        K = (c * xf**a) + (d * (np.tanh(xf/X - 2) - np.tanh(-2))) / \
+            (1 - np.tanh(-2))
+        dK = (c * a * xf**(a - 1)) + \
+            (d / X / np.cosh(xf/X - 2)**2) / (1 - np.tanh(-2))
+        slope = np.full(xf.size, b - 1.)
+        curved = np.abs(K - 1) > 1E-8
+        Kc, dKc, xc = K[curved], dK[curved], xf[curved]
+        power = np.power(Kc, xc)
+        slope[curved] = (b - 1) * (
+            power * (np.log(Kc) + xc * dKc / Kc) / (Kc - 1) -
+            (power - 1) * dKc / (Kc - 1)**2)
+        answers[fitted] = slope
+        extrapolated = np.logical_and(x > 40, x < 80)
+        if np.any(extrapolated):
+            step = 1E-4 * x[extrapolated]
+            answers[extrapolated] = \
+                (Material._GP(a, b, c, d, X, x[extrapolated] + step) -
+                 Material._GP(a, b, c, d, X, x[extrapolated] - step)) / \
+                (2 * step)
+        # the buildup factor is held constant beyond 80 mfp
+        answers[x >= 80] = 0
+        if np.shape(mfp) == ():
+            return answers[0]
+        return answers.reshape(np.shape(mfp))
+
     @staticmethod
     def _GP(a: float, b: float, c: float, d: float, X: float,
             mfp: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
@@ -383,3 +437,58 @@ class Material:
             return answers[0]
         else:
             return answers
+
+
+class _MaterialData:
+    """Read-only arrays and interpolators for one material of the
+    material library.
+
+    Parameters
+    ----------
+    properties
+        The library entry for the material.
+    """
+
+    def __init__(self, properties: Material.Material_Specification) -> None:
+        self.density: float = properties["density"]
+        self.atten_energy_bins: np.ndarray = _read_only(
+            properties["mass-atten-coff-energy"])
+        self.mass_atten_coff: np.ndarray = _read_only(
+            properties["mass-atten-coff"])
+        self.en_abs_energy_bins: np.ndarray = _read_only(
+            properties.get("mass-en-abs-coff-energy"))
+        self.mass_en_abs_coff: np.ndarray = _read_only(
+            properties.get("mass-en-abs-coff"))
+        self.gp_energy_bins: np.ndarray = _read_only(
+            properties.get("gp-coff-energy"))
+        gp_data = properties.get("gp-coeff")
+        self.gp_data_available: bool = gp_data is not None
+        if gp_data is not None:
+            gp_array = _read_only(gp_data)
+            self.gp_b: np.ndarray = gp_array[:, 0]
+            self.gp_c: np.ndarray = gp_array[:, 1]
+            self.gp_a: np.ndarray = gp_array[:, 2]
+            self.gp_X: np.ndarray = gp_array[:, 3]
+            self.gp_d: np.ndarray = gp_array[:, 4]
+            # here we are building interpolators based on the Akima method.
+            # For more information on the use of Akima method on G-P
+            # coefficients, see https://www.nrc.gov/docs/ML1905/ML19059A414.pdf
+            # "QAD-CGGP2 and G33-GP2: Revised Version of QAD-CGGP and G33-GP"
+            logE = np.log(self.gp_energy_bins)
+            self.bi: Akima1DInterpolator = Akima1DInterpolator(logE,
+                                                               self.gp_b)
+            self.ci: Akima1DInterpolator = Akima1DInterpolator(logE,
+                                                               self.gp_c)
+            self.ai: Akima1DInterpolator = Akima1DInterpolator(logE,
+                                                               self.gp_a)
+            self.Xi: Akima1DInterpolator = Akima1DInterpolator(logE,
+                                                               self.gp_X)
+            self.di: Akima1DInterpolator = Akima1DInterpolator(logE,
+                                                               self.gp_d)
+
+
+def _read_only(values) -> np.ndarray:
+    """Returns a read-only array of library values."""
+    array = np.array(values)
+    array.flags.writeable = False
+    return array
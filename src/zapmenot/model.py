@@ -1,8 +1,16 @@
+import concurrent.futures
+import copy
+import hashlib
+import io
 import math
 import numpy as np
 import numbers
-from typing import Optional, List
-from . import ray, material, source, shield, detector
+import os
+import scipy.spatial
+from typing import Optional, List, Dict, Tuple, Sequence, Union, \
+    Callable, Iterator
+from . import material, source, shield, detector, profiling, results, \
+    sievert, cache
 
 import importlib
 pyvista_spec = importlib.util.find_spec("pyvista")
@@ -45,6 +53,24 @@ class Model:
     # This value is based on a value of energy deposition
     # per ion in air of 33.85 [ICRU Report 39, 1979].
     FLUX_TO_EXPOSURE_CONVERSION_FACTOR = 1.835E-8
+    # upper limit on the number of elements in the working arrays
+    # used when evaluating a batch of models
+    _BATCH_ELEMENTS = 2**22
+    # a detector is in the far field of a source if the source extent
+    # divided by the distance to the source center is below this ratio
+    _FAR_FIELD_RATIO = 0.25
+    # number of far-field locations used to verify the reduced quadrature
+    _FAR_FIELD_SAMPLES = 5
+    # number of far-field self-shielding groups per bundle order
+    _FAR_FIELD_GROUPS = 4
+    # source points closer than this fraction of the model size are
+    # taken to coincide when checking for mirror symmetry
+    _SYMMETRY_TOLERANCE = 1E-9
+    # shields displayed at the pyvista default resolution; larger models
+    # are displayed with fewer segments around curved surfaces
+    _DISPLAY_SHIELDS = 50
+    _DISPLAY_RESOLUTION = 48
+    _MIN_DISPLAY_RESOLUTION = 8
 
     def __init__(self) -> None:
         self.source: Optional[source.Source] = None
@@ -52,6 +78,20 @@ class Model:
         self.detector: Optional[detector.Detector] = None
         self.filler_material: Optional[material.Material] = None
         self.buildup_factor_material: Optional[material.Material] = None
+        # opt-in collection of per-phase timings and counters
+        self.collect_statistics: bool = False
+        self.statistics: Optional[profiling.RunStatistics] = None
+        # relative error allowed for the far-field approximation used by
+        # calculate_exposure_map; None disables the approximation
+        self.far_field_tolerance: Optional[float] = None
+        # evaluate line sources parallel to slab shields with the
+        # Sievert integral rather than the source quadrature
+        self.analytic_line_source: bool = True
+        # trace only the source points in the fundamental region of any
+        # mirror symmetry of the source, shields, and detector
+        self.use_symmetry: bool = True
+        # opt-in store of results from earlier calculations
+        self.result_cache: Optional[cache.ResultCache] = None
 
     def set_filler_material(self, filler_material: str,
                             density: Optional[float] = None) -> None:
@@ -144,16 +184,7 @@ class Model:
         -------
             The exposure in units of mR/hr.
         """
-        results_by_photon_energy = self.generate_summary()
-        if len(results_by_photon_energy) == 0:
-            return 0  # may occur if source has no photons
-        elif len(results_by_photon_energy) == 1:
-            return results_by_photon_energy[0][4]  # mR/hr
-        else:
-            # sum exposure over all photons
-            an_array = np.array(results_by_photon_energy)
-            integral_results = np.sum(an_array[:, 4])
-            return integral_results  # mR/hr
+        return self.calculate_results().total_exposure  # mR/hr
 
     def generate_summary(self) -> List[List[float]]:
         """Calculates the energy flux and exposure at the detector location.
@@ -168,113 +199,1993 @@ class Model:
             List, by photon energy, of photon energy, photon emission rate,
             uncollided energy flux, uncollided exposure, and total exposure
         """
+        return self.calculate_results().to_list()
+
+    def calculate_results(self, include_mfp: bool = False,
+                          include_points: bool = False) -> results.Results:
+        """Calculates the energy flux and exposure at the detector location.
+
+        The results are returned as NumPy arrays indexed by photon energy.
+        If :attr:`collect_statistics` is True, timings and counters for
+        the calculation are stored in :attr:`statistics`.  Otherwise, if
+        :attr:`result_cache` is set, results stored by an earlier
+        calculation of an identical model are returned without
+        recalculation.
+
+        A line source whose only shields are slabs parallel to the line is
+        evaluated exactly with the Sievert integral, unless
+        :attr:`analytic_line_source` is False or per-point results are
+        requested.
+
+        Parameters
+        ----------
+        include_mfp
+            If True, the results include the total mean free path for
+            each photon energy and source point, along with the shield
+            crossing distances and attenuation coefficients needed to
+            form the mean free path through each shield.
+        include_points
+            If True, the results include the source point locations and
+            weights along with the uncollided and total exposure from
+            each source point at each photon energy.  These can be used
+            to find the parts of the source that dominate the exposure.
+
+        Returns
+        -------
+            The photon energies, photon emission rates, uncollided energy
+            flux, uncollided exposure, and total exposure.
+        """
+        if self.source is None:
+            raise ValueError("Model is missing a source")
+        if self.detector is None:
+            raise ValueError("Model is missing a detector")
+        if self.result_cache is None or self.collect_statistics:
+            return self._calculate_results(include_mfp, include_points)
+        key = cache.model_hash(self, 'results', include_mfp, include_points)
+        stored = self.result_cache.get(key)
+        if stored is not None:
+            self.statistics = None
+            return results.Results.from_bytes(stored)
+        answer = self._calculate_results(include_mfp, include_points)
+        self.result_cache.put(key, answer.to_bytes())
+        return answer
+
+    def _calculate_results(self, include_mfp: bool,
+                           include_points: bool) -> results.Results:
+        """Calculates the energy flux and exposure at the detector location.
+
+        Parameters
+        ----------
+        include_mfp
+            If True, the results include mean free path details.
+        include_points
+            If True, the results include source point details.
+        """
+        stats = profiling.RunStatistics() if self.collect_statistics \
+            else None
+        if not (include_mfp or include_points):
+            geometry = self._sievert_geometry()
+            if geometry is not None:
+                return self._line_source_results(geometry, stats)
+        # per-point results are reported for every source point
+        trace = self._trace(self.detector.location, stats,
+                            quadrature=self._quadrature()
+                            if include_mfp or include_points else None)
+        energies, yields = self._spectrum(stats)
+        coefficients = self._cross_sections(energies, stats)
+
+        n_energies = len(energies)
+        n_points = len(trace.distances)
+        uncollided_flux = np.zeros(n_energies)
+        uncollided_exposure = np.zeros(n_energies)
+        exposure = np.zeros(n_energies)
+        point_mfp = None
+        attenuation_coefficients = None
+        point_uncollided_exposure = None
+        point_exposure = None
+        if include_mfp:
+            point_mfp = np.zeros((n_energies, n_points))
+            attenuation_coefficients = coefficients.mass_atten * \
+                coefficients.densities
+        if include_points:
+            point_uncollided_exposure = np.zeros((n_energies, n_points))
+            point_exposure = np.zeros((n_energies, n_points))
+
+        # iterate through the photon list
+        for energy_index in range(n_energies):
+            with profiling.phase(stats, 'kernel'):
+                # determine an array of mean free paths, one per source point
+                total_mfp = trace.crossings @ \
+                    (coefficients.densities *
+                     coefficients.mass_atten[energy_index])
+                # add the gaps if required
+                if coefficients.filler_mass_atten is not None:
+                    total_mfp = total_mfp + trace.gaps * \
+                        coefficients.filler_density * \
+                        coefficients.filler_mass_atten[energy_index]
+            flux_points, uncollided_points, collided_points = \
+                self._kernel(trace, energies[energy_index],
+                             yields[energy_index],
+                             coefficients.dose_coeffs[energy_index],
+                             total_mfp, stats)
+            uncollided_flux[energy_index] = np.sum(flux_points)
+            uncollided_exposure[energy_index] = np.sum(uncollided_points)
+            exposure[energy_index] = np.sum(collided_points)
+            if include_mfp:
+                point_mfp[energy_index] = total_mfp
+            if include_points:
+                point_uncollided_exposure[energy_index] = uncollided_points
+                point_exposure[energy_index] = collided_points
+
+        self.statistics = stats
+        return results.Results(
+            energies, yields, uncollided_flux, uncollided_exposure, exposure,
+            point_mfp=point_mfp,
+            crossing_distances=trace.crossings if include_mfp else None,
+            attenuation_coefficients=attenuation_coefficients,
+            source_points=np.array(trace.source_points, dtype=float)
+            if include_points else None,
+            source_point_weights=trace.weights if include_points else None,
+            point_uncollided_exposure=point_uncollided_exposure,
+            point_exposure=point_exposure)
+
+    def _sievert_geometry(self) -> Optional[Tuple[np.ndarray, float,
+                                                  np.ndarray]]:
+        """Checks whether the exposure can be found from the Sievert integral.
+
+        The Sievert integral applies to a line source when every shield is a
+        slab parallel to the line.  The mean free paths along a ray from any
+        point of the line are then those along the perpendicular from the
+        line to the detector multiplied by the secant of the angle between
+        the two rays.
+
+        Returns
+        -------
+            The foot of the perpendicular from the detector to the line,
+            the perpendicular distance, and the angles from the
+            perpendicular to the ends of the line, or None if the Sievert
+            integral does not apply.
+        """
+        line = self.source
+        if not self.analytic_line_source or \
+                not isinstance(line, source.LineSource):
+            return None
+        slabs = [item for item in self.shield_list if item is not line]
+        if not all(type(item) is shield.SemiInfiniteXSlab for item in slabs):
+            return None
+        if len(slabs) > 0 and abs(line._dir[0]) > 1E-12:
+            return None
+        location = np.asarray(self.detector.location, dtype=float)
+        along = np.dot(location - line.origin, line._dir)
+        foot = line.origin + along * line._dir
+        distance = float(np.linalg.norm(location - foot))
+        if distance <= 1E-9 * line._length:
+            # the detector is on the line
+            return None
+        angles = np.arctan((np.array([0, line._length]) - along) / distance)
+        return foot, distance, angles
+
+    def _line_source_results(self, geometry: Tuple[np.ndarray, float,
+                                                   np.ndarray],
+                             stats: Optional[profiling.RunStatistics]) \
+            -> results.Results:
+        """Evaluates a line source behind slab shields with the Sievert
+        integral.
+
+        Parameters
+        ----------
+        geometry
+            The foot of the perpendicular, perpendicular distance, and end
+            angles found by :meth:`_sievert_geometry`.
+        stats
+            Statistics to be updated, if any.
+
+        Returns
+        -------
+            The photon energies, photon emission rates, uncollided energy
+            flux, uncollided exposure, and total exposure.
+        """
+        foot, distance, angles = geometry
+        # a single ray along the perpendicular
+        trace = self._trace(self.detector.location, stats,
+                            quadrature=([tuple(foot)], np.ones(1)))
+        energies, yields = self._spectrum(stats)
+        coefficients = self._cross_sections(energies, stats)
+        n_energies = len(energies)
+        uncollided_flux = np.zeros(n_energies)
+        uncollided_exposure = np.zeros(n_energies)
+        exposure = np.zeros(n_energies)
+        for energy_index in range(n_energies):
+            photon_energy = float(energies[energy_index])
+            with profiling.phase(stats, 'kernel'):
+                normal_mfp = float(trace.crossings[0] @ (
+                    coefficients.densities *
+                    coefficients.mass_atten[energy_index]))
+                if coefficients.filler_mass_atten is not None:
+                    normal_mfp += float(trace.gaps[0]) * \
+                        coefficients.filler_density * \
+                        coefficients.filler_mass_atten[energy_index]
+                uncollided = np.diff(sievert.sievert(angles, normal_mfp))[0]
+            with profiling.phase(stats, 'buildup'):
+                if self.buildup_factor_material is not None:
+                    buildup_material = self.buildup_factor_material
+                    collided = np.diff(sievert.sievert(
+                        angles, normal_mfp,
+                        lambda mfps: buildup_material.get_buildup_factor(
+                            photon_energy, mfps)))[0]
+                else:
+                    collided = uncollided
+            # energy flux per unit Sievert integral from a uniform line
+            scale = yields[energy_index] * photon_energy / \
+                (4 * math.pi * distance * self.source._length)
+            to_exposure = Model.FLUX_TO_EXPOSURE_CONVERSION_FACTOR * \
+                coefficients.dose_coeffs[energy_index] * 1000 * 3600  # mR/hr
+            uncollided_flux[energy_index] = scale * uncollided
+            uncollided_exposure[energy_index] = \
+                scale * uncollided * to_exposure
+            exposure[energy_index] = scale * collided * to_exposure
+        self.statistics = stats
+        return results.Results(energies, yields, uncollided_flux,
+                               uncollided_exposure, exposure)
+
+    def calculate_exposure_map(self, locations: Sequence[Sequence[float]],
+                               threads: Optional[int] = None) -> np.ndarray:
+        """Calculates the exposure at a set of detector locations.
+
+        The spectrum and cross sections are looked up once for all
+        locations.  If :attr:`far_field_tolerance` is set and the source is
+        a volume source, locations far from the source (where the source
+        extent is small compared to the distance) are evaluated as a
+        lumped source.  The self-shielding of the source body is found from
+        the full source quadrature, but the rays through the other shields,
+        the distance, and the buildup factor are evaluated for a small
+        bundle of points.  The smallest bundle that agrees with the full
+        quadrature to within the tolerance at a sample of the far-field
+        locations is used; if none does, the full quadrature is used
+        everywhere.  A location is only lumped if the rays from the
+        outline of the source pass through the other shields alike, so
+        locations near the edge of a shield's shadow use the full
+        quadrature.
+
+        If the source and every shield are unchanged by rotation about a
+        common axis, locations on the same circle around the axis receive
+        the same exposure.  Each circle is then evaluated once, at a
+        location in a fixed direction from the axis, unless
+        :attr:`use_symmetry` is False.  The source quadrature is discrete
+        in angle, so the exposure at a location can differ from that of
+        :meth:`calculate_exposure` at the same location by the azimuthal
+        quadrature error, typically well under one percent; setting
+        :attr:`use_symmetry` to False gives the point-by-point results.
+        Because the direction is fixed, the map does not depend on how
+        the locations are grouped.  If :attr:`result_cache` is set, a
+        map stored by an earlier calculation with the same model and
+        locations is returned without recalculation.
+
+        The locations can be divided among a pool of threads.  The
+        calculation only reads the model, so the threads share the model,
+        its materials, and the cross sections without copying them.  The
+        model must not be changed while the map is being calculated.
+
+        Parameters
+        ----------
+        locations
+            The X, Y, and Z cartesian coordinates of each detector location.
+        threads
+            The number of threads used to evaluate the locations.  If None,
+            the locations are evaluated in the calling thread.
+
+        Returns
+        -------
+            The exposure in mR/hr, one per location.
+        """
+        points = self._map_locations(locations, threads)
+        if self.result_cache is not None:
+            key = self._map_key(points)
+            stored = self.result_cache.get(key)
+            if stored is not None:
+                return np.load(io.BytesIO(stored))
+            answer = self._symmetric_exposure_map(points, threads)
+            stream = io.BytesIO()
+            np.save(stream, answer)
+            self.result_cache.put(key, stream.getvalue())
+            return answer
+        return self._symmetric_exposure_map(points, threads)
+
+    def iter_exposure_map(self, locations: Sequence[Sequence[float]],
+                          chunk: int = 1024,
+                          progress: Optional[Callable[[int, int], None]]
+                          = None,
+                          checkpoint: Optional[Union[str, os.PathLike]]
+                          = None,
+                          threads: Optional[int] = None) \
+            -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Calculates the exposure at a set of detector locations, yielding
+        the results a block of locations at a time.
+
+        The locations are divided into consecutive blocks of ``chunk``
+        locations, and the indices and exposures of each block are yielded
+        as soon as the block is complete.  The calculation is the same as
+        :meth:`calculate_exposure_map`, and the spectrum, cross sections,
+        and far-field bundle are found once for all of the blocks.
+
+        If a checkpoint file is given, the exposures calculated so far are
+        written to it after each block.  If the file already exists, for
+        example after an interrupted run, the locations it holds are not
+        calculated again; their blocks are yielded from the file first.
+        The checkpoint records a hash of the model and the locations, and
+        a checkpoint written for a different calculation is rejected.
+
+        Parameters
+        ----------
+        locations
+            The X, Y, and Z cartesian coordinates of each detector location.
+        chunk
+            The number of locations in each block.
+        progress
+            A function called after each block with the number of locations
+            completed and the total number of locations.
+        checkpoint
+            The checkpoint file.  Each completed block is appended to it.
+        threads
+            The number of threads used to evaluate the locations of each
+            block.
+
+        Raises
+        ------
+        ValueError
+            Invalid block size
+        ValueError
+            Checkpoint does not match the model and locations
+
+        Returns
+        -------
+            An iterator of the location indices and the exposures in mR/hr
+            of each block.
+        """
+        points = self._map_locations(locations, threads)
+        if not isinstance(chunk, numbers.Integral) or chunk < 1:
+            raise ValueError(f"Invalid chunk size: {chunk}")
+        doses = np.full(len(points), np.nan)
+        key = None
+        if checkpoint is not None:
+            key = self._map_key(points)
+            if os.path.exists(checkpoint):
+                self._read_checkpoint(checkpoint, key, doses)
+        # the generator is separate so that arguments are checked when the
+        # method is called rather than when iteration starts
+        return self._iterate_map(points, int(chunk), progress, checkpoint,
+                                 key, doses, threads)
+
+    def write_exposure_map(self, locations: Sequence[Sequence[float]],
+                           path: Union[str, os.PathLike],
+                           by_energy: bool = False, chunk: int = 65536,
+                           processes: Optional[int] = None,
+                           threads: Optional[int] = None) -> np.memmap:
+        """Calculates the exposure at a set of detector locations and
+        writes it to a NumPy ``.npy`` file.
+
+        The file is created at its full size before the calculation, and
+        each block of ``chunk`` locations is written directly into it, so
+        the map never has to be held in memory.  The locations may
+        themselves be a memory-mapped array.  The blocks can be divided
+        among several processes, each of which writes its own blocks to
+        the file.  The model, spectrum, cross sections, and far-field
+        bundle are found once and sent to each process when it starts;
+        each block then carries only its locations.  The map is the same
+        as that of :meth:`calculate_exposure_map`, whatever the block
+        size.
+
+        Parameters
+        ----------
+        locations
+            The X, Y, and Z cartesian coordinates of each detector location.
+        path
+            The output file.
+        by_energy
+            If True, the file holds one layer per photon energy, in the
+            order of :attr:`zapmenot.results.Results.energies`, indexed by
+            energy and location.  Otherwise it holds the total exposure at
+            each location.
+        chunk
+            The number of locations in each block.
+        processes
+            The number of worker processes.  If None, the blocks are
+            evaluated in the calling process.
+        threads
+            The number of threads used to evaluate each block.
+
+        Raises
+        ------
+        ValueError
+            Invalid block size or number of processes
+
+        Returns
+        -------
+            The exposure in mR/hr, as a read-only array mapped to the file.
+        """
+        points = self._map_locations(locations, threads)
+        if not isinstance(chunk, numbers.Integral) or chunk < 1:
+            raise ValueError(f"Invalid chunk size: {chunk}")
+        if processes is not None and \
+                (not isinstance(processes, numbers.Integral) or
+                 processes < 1):
+            raise ValueError(f"Invalid number of processes: {processes}")
+        shape: Tuple[int, ...] = (len(points),)
+        if by_energy:
+            shape = (len(self._spectrum()[0]), len(points))
+        output = np.lib.format.open_memmap(path, mode='w+', dtype=float,
+                                           shape=shape)
+        del output
+        # the far-field bundle is chosen once for the whole map, so the
+        # result does not depend on how the map is divided into blocks
+        setup = self._map_setup(points)
+        starts = range(0, len(points), chunk)
+        if processes is None or processes == 1 or len(starts) < 2:
+            worker = (self, self._location_evaluator(setup))
+            for start in starts:
+                _write_map_block(path, start, points[start:start + chunk],
+                                 by_energy, threads, worker)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                    processes, initializer=_start_map_worker,
+                    initargs=(self, setup)) as pool:
+                # list() re-raises any exception from a worker
+                list(pool.map(
+                    _write_map_block, [path] * len(starts), starts,
+                    [points[start:start + chunk] for start in starts],
+                    [by_energy] * len(starts), [threads] * len(starts)))
+        return np.load(path, mmap_mode='r')
+
+    def _iterate_map(self, points: np.ndarray, chunk: int,
+                     progress: Optional[Callable[[int, int], None]],
+                     checkpoint: Optional[Union[str, os.PathLike]],
+                     key: Optional[str], doses: np.ndarray,
+                     threads: Optional[int]) \
+            -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yields the exposure map one block of locations at a time.
+
+        Parameters
+        ----------
+        points
+            Detector locations, indexed by location and coordinate.
+        chunk
+            The number of locations in each block.
+        progress
+            A function called with the number of locations completed and
+            the total number of locations.
+        checkpoint
+            The checkpoint file.
+        key
+            The hash of the model and locations.
+        doses
+            The exposures found so far, with NaN for the locations that
+            have not been calculated.
+        threads
+            The number of threads used to evaluate each block.
+        """
+        evaluate = None
+        for start in range(0, len(points), chunk):
+            indices = np.arange(start, min(start + chunk, len(points)))
+            missing = indices[np.isnan(doses[indices])]
+            if len(missing) > 0:
+                if evaluate is None:
+                    # set up only when there is something to calculate
+                    targets, inverse = self._map_targets(points)
+                    values = np.full(len(targets), np.nan)
+                    evaluate = self._map_evaluator(targets)
+                needed = np.unique(inverse[missing])
+                needed = needed[np.isnan(values[needed])]
+                values[needed] = self._evaluate_map(evaluate, needed,
+                                                    threads)
+                doses[missing] = values[inverse[missing]]
+                if checkpoint is not None:
+                    self._write_checkpoint(checkpoint, key, start,
+                                           doses[indices])
+            if progress is not None:
+                progress(int(indices[-1]) + 1, len(points))
+            yield indices, doses[indices].copy()
+
+    @staticmethod
+    def _write_checkpoint(checkpoint: Union[str, os.PathLike], key: str,
+                          start: int, values: np.ndarray) -> None:
+        """Appends a completed block to an exposure map checkpoint.
+
+        The checkpoint holds the hash of the model and locations followed
+        by the index range and exposures of each completed block, so only
+        the new block is written.
+
+        Parameters
+        ----------
+        checkpoint
+            The checkpoint file.
+        key
+            The hash of the model and locations.
+        start
+            The index of the first location of the block.
+        values
+            The exposures of the block.
+        """
+        with open(checkpoint, 'ab') as stream:
+            if stream.tell() == 0:
+                np.save(stream, np.array(key))
+            np.save(stream, np.array([start, start + len(values)]))
+            np.save(stream, values)
+
+    @staticmethod
+    def _read_checkpoint(checkpoint: Union[str, os.PathLike], key: str,
+                         doses: np.ndarray) -> None:
+        """Reads the blocks saved in an exposure map checkpoint.
+
+        A block left incomplete by an interruption is removed from the
+        file, so that later blocks follow the last complete one.
+
+        Parameters
+        ----------
+        checkpoint
+            The checkpoint file.
+        key
+            The hash of the model and locations.
+        doses
+            The exposures, updated with those of the saved blocks.
+
+        Raises
+        ------
+        ValueError
+            Checkpoint does not match the model and locations
+        """
+        mismatch = ValueError(f"Checkpoint {os.fspath(checkpoint)} does "
+                              "not match the model and locations")
+        with open(checkpoint, 'r+b') as stream:
+            # the header is the key exactly as written by _write_checkpoint
+            expected = io.BytesIO()
+            np.save(expected, np.array(key))
+            header = expected.getvalue()
+            head = stream.read(len(header))
+            if head != header:
+                if len(head) < len(header) and header.startswith(head):
+                    # interrupted before the first block was complete
+                    stream.seek(0)
+                    stream.truncate()
+                    return
+                raise mismatch
+            complete = stream.tell()
+            while True:
+                try:
+                    bounds = np.load(stream)
+                    values = np.load(stream)
+                except (ValueError, EOFError):
+                    break
+                first, last = int(bounds[0]), int(bounds[1])
+                if not 0 <= first <= last <= len(doses) or \
+                        values.shape != (last - first,):
+                    raise mismatch
+                doses[first:last] = values
+                complete = stream.tell()
+            stream.seek(complete)
+            stream.truncate()
+
+    def _map_locations(self, locations: Sequence[Sequence[float]],
+                       threads: Optional[int]) -> np.ndarray:
+        """Checks the arguments of a dose map calculation.
+
+        Parameters
+        ----------
+        locations
+            The X, Y, and Z cartesian coordinates of each detector location.
+        threads
+            The number of threads used to evaluate the locations.
+
+        Returns
+        -------
+            Detector locations, indexed by location and coordinate.
+        """
+        if self.source is None:
+            raise ValueError("Model is missing a source")
+        points = np.asarray(locations, dtype=float)
+        if points.ndim != 2 or points.shape[1] != 3:
+            raise ValueError("Invalid detector locations")
+        if threads is not None and (not isinstance(threads, numbers.Integral)
+                                    or threads < 1):
+            raise ValueError(f"Invalid number of threads: {threads}")
+        return points
+
+    def _map_key(self, points: np.ndarray) -> str:
+        """Returns a hash of the model and a set of detector locations.
+
+        Parameters
+        ----------
+        points
+            Detector locations, indexed by location and coordinate.
+        """
+        # the locations are identified by a digest of their values
+        return cache.model_hash(
+            self, 'map', hashlib.sha256(
+                np.ascontiguousarray(points).tobytes()).hexdigest())
+
+    def _map_targets(self, points: np.ndarray) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the locations that must be evaluated for a dose map.
+
+        If the model is symmetric about an axis, the locations are reduced
+        to one per ring around the axis.
+
+        Parameters
+        ----------
+        points
+            Detector locations, indexed by location and coordinate.
+
+        Returns
+        -------
+            The locations to be evaluated, and the index of the evaluated
+            location that gives the exposure at each original location.
+        """
+        axis = self._symmetry_axis() if self.use_symmetry else None
+        if axis is not None and len(points) > 1:
+            # evaluate each ring of locations around the axis once
+            rings, inverse = self._rings(points, axis)
+            if len(rings) < len(points):
+                return rings, inverse
+        return points, np.arange(len(points))
+
+    def _symmetric_exposure_map(self, points: np.ndarray,
+                                threads: Optional[int]) -> np.ndarray:
+        """Calculates the exposure at a set of detector locations, using
+        any symmetry of the model about an axis.
+
+        Parameters
+        ----------
+        points
+            Detector locations, indexed by location and coordinate.
+        threads
+            The number of threads used to evaluate the locations.
+        """
+        targets, inverse = self._map_targets(points)
+        return self._exposure_map(targets, threads)[inverse]
+
+    def _exposure_map(self, points: np.ndarray,
+                      threads: Optional[int] = None) -> np.ndarray:
+        """Calculates the exposure at a set of detector locations.
+
+        Parameters
+        ----------
+        points
+            Detector locations, indexed by location and coordinate.
+        threads
+            The number of threads used to evaluate the locations.
+
+        Returns
+        -------
+            The exposure in mR/hr, one per location.
+        """
+        return self._evaluate_map(self._map_evaluator(points),
+                                  np.arange(len(points)), threads)
+
+    @staticmethod
+    def _evaluate_map(evaluate: Callable[[np.ndarray], np.ndarray],
+                      indices: np.ndarray,
+                      threads: Optional[int]) -> np.ndarray:
+        """Evaluates a set of dose map locations, dividing them among a
+        pool of threads.
+
+        Parameters
+        ----------
+        evaluate
+            Function returning the exposure at the locations with the
+            given indices.
+        indices
+            The indices of the locations to be evaluated.
+        threads
+            The number of threads.
+
+        Returns
+        -------
+            The exposure in mR/hr at each of the locations.
+        """
+        if threads is None or threads == 1 or len(indices) < 2:
+            return evaluate(indices)
+        # several chunks per thread even out the load
+        chunks = np.array_split(indices, min(len(indices), 4 * threads))
+        with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+            return np.concatenate(list(executor.map(evaluate, chunks)))
+
+    def _map_evaluator(self, points: np.ndarray, by_energy: bool = False) \
+            -> Callable[[np.ndarray], np.ndarray]:
+        """Prepares the evaluation of a set of detector locations.
+
+        The spectrum, cross sections, and any far-field bundle are found
+        once for all of the locations.
+
+        Parameters
+        ----------
+        points
+            Detector locations, indexed by location and coordinate.
+        by_energy
+            If True, the exposure is returned for each photon energy.
+
+        Returns
+        -------
+            A function returning the exposure in mR/hr at the locations
+            with the given indices, indexed by location and, if
+            ``by_energy`` is True, photon energy.  The function only reads
+            the model, so it can be called from several threads.
+        """
+        exposure = self._location_evaluator(self._map_setup(points))
+
+        def evaluate(indices: np.ndarray) -> np.ndarray:
+            answer = exposure(points[indices])
+            return answer if by_energy else np.sum(answer, axis=1)
+
+        return evaluate
+
+    def _map_setup(self, points: np.ndarray) -> "_MapSetup":
+        """Finds the quantities shared by the locations of a dose map.
+
+        Parameters
+        ----------
+        points
+            Detector locations used to choose the far-field bundle,
+            indexed by location and coordinate.
+        """
+        energies, yields = self._spectrum()
+        coefficients = self._cross_sections(energies)
+        full = self._quadrature()
+        edges = None
+        bundle = None
+        if self.far_field_tolerance is not None:
+            far = self._far_field(points, full)
+            if np.any(far):
+                edges = self._source_edges(full)
+                bundle = self._far_field_bundle(
+                    points[far], full, energies, yields, coefficients, edges)
+        return _MapSetup(energies, yields, coefficients, full, edges, bundle)
+
+    def _location_evaluator(self, setup: "_MapSetup") \
+            -> Callable[[np.ndarray], np.ndarray]:
+        """Prepares the evaluation of detector locations as in a dose map.
+
+        The returned function may be called with any locations, which are
+        lumped or evaluated in full exactly as in the map for which the
+        setup was found.
+
+        Parameters
+        ----------
+        setup
+            The spectrum, cross sections, and far-field bundle of the map.
+
+        Returns
+        -------
+            A function returning the exposure in mR/hr for each photon
+            energy at a set of locations, indexed by location and energy.
+            The function only reads the model, so it can be called from
+            several threads.
+        """
+        energies, yields = setup.energies, setup.yields
+        coefficients, full = setup.coefficients, setup.quadrature
+        bundle = setup.bundle
+
+        def exposure(locations: np.ndarray) -> np.ndarray:
+            answer = np.zeros((len(locations), len(energies)))
+            far = np.zeros(len(locations), dtype=bool)
+            if bundle is not None:
+                far = self._far_field(locations, full)
+                far[far] = self._uniform_shadow(locations[far], setup.edges,
+                                                coefficients)
+            for position, location in enumerate(locations):
+                if far[position]:
+                    answer[position] = self._lumped_exposure(
+                        location, full, bundle[0], energies, yields,
+                        coefficients, bundle[1])
+                else:
+                    answer[position] = self._full_exposure(
+                        location, full, energies, yields, coefficients)
+            return answer
+
+        return exposure
+
+    def _symmetry_axis(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Finds an axis about which the source and shields are symmetric.
+
+        The candidate axes are the axes of the shields (including the
+        source).  If no shield has an axis, a line parallel to the Z axis
+        through the center of the source is tried, which suits models
+        built from spheres and point sources.
+
+        Returns
+        -------
+            A point on the axis and the unit vector along the axis, or None
+            if the model is not axisymmetric.
+        """
+        candidates = [item._axis() for item in self.shield_list]
+        candidates = [axis for axis in candidates if axis is not None]
+        if len(candidates) == 0:
+            points, weights = self._quadrature()
+            center = np.average(np.array(points, dtype=float).reshape(-1, 3),
+                                axis=0, weights=weights)
+            candidates = [(center, np.array([0.0, 0.0, 1.0]))]
+        for origin, axis in candidates:
+            origin = np.asarray(origin, dtype=float)
+            scale = max(1.0, float(np.amax(np.abs(origin))))
+            tolerance = Model._SYMMETRY_TOLERANCE * scale
+            if all(item._is_axisymmetric(origin, axis, tolerance)
+                   for item in self.shield_list):
+                return origin, axis
+        return None
+
+    @staticmethod
+    def _rings(points: np.ndarray,
+               axis: Tuple[np.ndarray, np.ndarray]) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """Reduces detector locations to one location per circle around
+        an axis.
+
+        Parameters
+        ----------
+        points
+            Detector locations, indexed by location and coordinate.
+        axis
+            A point on the axis and the unit vector along the axis.
+
+        Returns
+        -------
+            One location for each distinct radius and axial position, and
+            the index of the location that represents each input location.
+            The locations lie in a fixed direction from the axis, not at
+            any of the input locations.
+        """
+        origin, direction = axis
+        offsets = points - origin
+        heights = offsets @ direction
+        radii = np.linalg.norm(
+            offsets - heights[:, np.newaxis] * direction, axis=1)
+        # a fixed direction normal to the axis, preferring the X axis
+        reference = np.eye(3)[0] if abs(direction[0]) < 0.9 \
+            else np.eye(3)[1]
+        reference = reference - np.dot(reference, direction) * direction
+        reference = reference / np.linalg.norm(reference)
+        scale = max(1.0, float(np.amax(np.abs(offsets))))
+        keys = np.round(np.column_stack((radii, heights)) /
+                        (Model._SYMMETRY_TOLERANCE * scale))
+        _, first, inverse = np.unique(keys, axis=0, return_index=True,
+                                      return_inverse=True)
+        rings = origin + heights[first, np.newaxis] * direction + \
+            radii[first, np.newaxis] * reference
+        return rings, np.ravel(inverse)
+
+    def _full_exposure(self, location: np.ndarray,
+                       quadrature: Tuple[List, np.ndarray],
+                       energies: np.ndarray, yields: np.ndarray,
+                       coefficients: "_Coefficients") -> np.ndarray:
+        """Returns the exposure at a location for each photon energy
+        using a source quadrature.
+
+        Parameters
+        ----------
+        location
+            The detector location.
+        quadrature
+            The source points and weights.
+        energies
+            The photon energies in MeV.
+        yields
+            The photon emission rates in photons/sec.
+        coefficients
+            The material coefficients.
+        """
+        trace = self._trace(
+            location,
+            quadrature=self._symmetric_quadrature(location, quadrature))
+        exposure, _ = self._evaluate_batch(
+            trace, energies, yields, coefficients,
+            coefficients.densities[np.newaxis, :],
+            np.array([coefficients.filler_density]))
+        return exposure[0]
+
+    def _lumped_exposure(self, location: np.ndarray,
+                         quadrature: Tuple[List, np.ndarray],
+                         bundle: Tuple[List, np.ndarray],
+                         energies: np.ndarray, yields: np.ndarray,
+                         coefficients: "_Coefficients",
+                         groups: int) -> np.ndarray:
+        """Returns the far-field exposure at a location for each photon
+        energy.
+
+        The full source points are sorted by the distance their rays travel
+        within the source body and divided into groups of equal weight.
+        The attenuation within the source body, along with the variation
+        of the inverse square term across the source, is averaged over each
+        group and applied as an effective number of mean free paths to each
+        point of the bundle, which carries the rays through the other
+        shields.
+
+        Parameters
+        ----------
+        location
+            The detector location.
+        quadrature
+            The full source points and weights.
+        bundle
+            The bundle points and weights.
+        energies
+            The photon energies in MeV.
+        yields
+            The photon emission rates in photons/sec.
+        coefficients
+            The material coefficients.
+        groups
+            The number of self-shielding groups.
+        """
+        source_index = [id(item) for item in self.shield_list].index(
+            id(self.source))
+        source_points = np.array(quadrature[0], dtype=float)
+        # distance travelled within the source body by each full ray
+        chords = self.source._get_crossing_lengths(source_points, location)
+        # the least attenuated rays come from the near side of the source,
+        # so the inverse square variation is kept with the self-shielding
+        center = np.average(source_points, axis=0, weights=quadrature[1])
+        inverse_square = np.sum((location - center)**2) / \
+            np.sum((location - source_points)**2, axis=1)
+        order = np.argsort(chords)
+        members = [group for group in np.array_split(order, groups)
+                   if len(group) > 0]
+        group_weights = np.array([np.sum(quadrature[1][group])
+                                  for group in members])
+        trace = self._trace(location, quadrature=bundle)
+        crossings = trace.crossings.copy()
+        crossings[:, source_index] = 0
+        exposure = np.zeros(len(energies))
+        for energy_index in range(len(energies)):
+            attenuation = coefficients.densities * \
+                coefficients.mass_atten[energy_index]
+            transmission = quadrature[1] * \
+                np.exp(-attenuation[source_index] * chords)
+            group_transmission = np.array([np.sum(transmission[group])
+                                           for group in members])
+            kept = group_transmission > 0
+            self_mfp = -np.log(group_transmission[kept] /
+                               group_weights[kept])
+            # transmission-weighted inverse square correction
+            correction = np.array([
+                np.sum(transmission[group] * inverse_square[group])
+                for group in members])[kept] / group_transmission[kept]
+            external_mfp = crossings @ attenuation
+            if coefficients.filler_mass_atten is not None:
+                external_mfp = external_mfp + trace.gaps * \
+                    coefficients.filler_density * \
+                    coefficients.filler_mass_atten[energy_index]
+            # indexed by self-shielding group and bundle point
+            total_mfp = self_mfp[:, np.newaxis] + external_mfp
+            _, _, collided_points = self._kernel(
+                trace, energies[energy_index], yields[energy_index],
+                coefficients.dose_coeffs[energy_index], total_mfp)
+            exposure[energy_index] = np.sum(
+                (group_weights[kept] * correction)[:, np.newaxis] *
+                collided_points)
+        return exposure
+
+    def _far_field(self, locations: np.ndarray,
+                   quadrature: Tuple[List, np.ndarray]) -> np.ndarray:
+        """Identifies detector locations in the far field of the source.
+
+        Parameters
+        ----------
+        locations
+            Detector locations, indexed by location and coordinate.
+        quadrature
+            The full source points and weights.
+
+        Returns
+        -------
+            True for each location in the far field.
+        """
+        if not isinstance(self.source, shield.Shield) or \
+                len(self.source.points_per_dimension) != 3:
+            # only volume sources can be lumped
+            return np.zeros(len(locations), dtype=bool)
+        source_points = np.array(quadrature[0], dtype=float)
+        center = np.average(source_points, axis=0, weights=quadrature[1])
+        extent = 2 * np.amax(np.linalg.norm(source_points - center, axis=1))
+        distances = np.linalg.norm(locations - center, axis=1)
+        return extent < Model._FAR_FIELD_RATIO * distances
+
+    @staticmethod
+    def _source_edges(quadrature: Tuple[List, np.ndarray]) -> np.ndarray:
+        """Returns the source points on the outline of the source.
+
+        Parameters
+        ----------
+        quadrature
+            The full source points and weights.
+
+        Returns
+        -------
+            The source points at the vertices of their convex hull, or all
+            of the source points if they do not span a volume.
+        """
+        source_points = np.array(quadrature[0], dtype=float).reshape(-1, 3)
+        try:
+            hull = scipy.spatial.ConvexHull(source_points)
+        except (scipy.spatial.QhullError, ValueError):
+            return source_points
+        return source_points[hull.vertices]
+
+    def _uniform_shadow(self, locations: np.ndarray, edges: np.ndarray,
+                        coefficients: "_Coefficients") -> np.ndarray:
+        """Checks that the shields outside the source attenuate the rays
+        from every part of the source alike.
+
+        A location in the shadow of a shield edge sees part of the source
+        through the shield and part of it clear, which a bundle of points
+        cannot represent.  The rays from the outline of the source are
+        traced, and the location is accepted if their mean free paths
+        outside the source differ by no more than the far-field tolerance
+        at every photon energy.
+
+        Parameters
+        ----------
+        locations
+            Detector locations, indexed by location and coordinate.
+        edges
+            The source points on the outline of the source.
+        coefficients
+            The material coefficients.
+
+        Returns
+        -------
+            True for each location that may be lumped.
+        """
+        source_index = [id(item) for item in self.shield_list].index(
+            id(self.source))
+        attenuation = coefficients.densities * coefficients.mass_atten
+        answer = np.zeros(len(locations), dtype=bool)
+        for position, location in enumerate(locations):
+            trace = self._trace(location, quadrature=(
+                edges, np.full(len(edges), 1 / len(edges))))
+            crossings = trace.crossings.copy()
+            crossings[:, source_index] = 0
+            # indexed by ray and photon energy
+            mfp = crossings @ attenuation.T
+            if coefficients.filler_mass_atten is not None:
+                mfp = mfp + np.outer(trace.gaps,
+                                     coefficients.filler_density *
+                                     coefficients.filler_mass_atten)
+            spread = np.amax(np.ptp(mfp, axis=0))
+            answer[position] = spread <= self.far_field_tolerance
+        return answer
+
+    def _far_field_bundle(self, locations: np.ndarray,
+                          full: Tuple[List, np.ndarray],
+                          energies: np.ndarray, yields: np.ndarray,
+                          coefficients: "_Coefficients",
+                          edges: np.ndarray) -> Optional[Tuple]:
+        """Selects the bundle of points used for far-field locations.
+
+        Increasingly large bundles are compared with the full quadrature
+        at a sample of the far-field locations.  The sample starts with
+        the location nearest the source and adds the locations in the most
+        different directions, since the error depends on both.  Locations
+        near the edge of a shadow are never lumped, so they are left out
+        of the sample.  A bundle is accepted if the sampled errors are
+        within half of the tolerance.
+
+        Parameters
+        ----------
+        locations
+            The far-field detector locations.
+        full
+            The full source points and weights.
+        energies
+            The photon energies in MeV.
+        yields
+            The photon emission rates in photons/sec.
+        coefficients
+            The material coefficients.
+        edges
+            The source points on the outline of the source.
+
+        Returns
+        -------
+            The bundle points and weights and the number of self-shielding
+            groups, or None if no bundle meets the tolerance.
+        """
+        source_points = np.array(full[0], dtype=float)
+        center = np.average(source_points, axis=0, weights=full[1])
+        offsets = locations - center
+        directions = offsets / \
+            np.linalg.norm(offsets, axis=1)[:, np.newaxis]
+        chosen: List[int] = []
+        # the locations chosen or left out
+        used = np.zeros(len(locations), dtype=bool)
+        while len(chosen) < Model._FAR_FIELD_SAMPLES and not np.all(used):
+            if chosen:
+                # the location whose direction is farthest from those
+                # chosen
+                score = np.amax(directions @ directions[chosen].T, axis=1)
+            else:
+                score = np.linalg.norm(offsets, axis=1)
+            score[used] = np.inf
+            candidate = int(np.argmin(score))
+            used[candidate] = True
+            if self._uniform_shadow(locations[candidate:candidate + 1],
+                                    edges, coefficients)[0]:
+                chosen.append(candidate)
+        if not chosen:
+            return None
+        samples = locations[chosen]
+        references = [np.sum(self._full_exposure(location, full, energies,
+                                                 yields, coefficients))
+                      for location in samples]
+        full_size = self.source.points_per_dimension
+        for order in range(1, max(full_size)):
+            if order == 1:
+                # a single point at the source center; the single point
+                # quadrature of a curved source is off center
+                bundle = ([tuple(center)], np.ones(1))
+            else:
+                bundle_source = copy.copy(self.source)
+                bundle_source.points_per_dimension = \
+                    [min(order, size) for size in full_size]
+                bundle = (bundle_source._get_source_points(),
+                          np.asarray(
+                              bundle_source._get_source_point_weights(),
+                              dtype=float))
+            groups = Model._FAR_FIELD_GROUPS * order
+            if len(bundle[0]) * groups >= len(full[0]):
+                break
+            errors = [abs(np.sum(self._lumped_exposure(
+                location, full, bundle, energies, yields, coefficients,
+                groups)) - reference) / reference if reference > 0 else 0.0
+                      for location, reference in zip(samples, references)]
+            if max(errors) <= self.far_field_tolerance / 2:
+                return bundle, groups
+        return None
+
+    def calculate_gradient(self, detector_step: float = 1E-3) \
+            -> results.Gradient:
+        """Calculates the derivatives of the exposure with respect to the
+        model parameters.
+
+        Derivatives with respect to the shield densities, the filler
+        density, and the source activities are evaluated in closed form
+        from the point kernel, including the derivative of the GP buildup
+        factor, in the same pass over photon energies that calculates the
+        exposure.  Energy groups are held fixed when differentiating with
+        respect to activity.  Derivatives with respect to the detector
+        coordinates use the closed form of the kernel, with the derivatives
+        of the shield crossing lengths found by central differences of the
+        traced geometry.
+
+        Parameters
+        ----------
+        detector_step
+            The detector displacement in cm used to difference the shield
+            crossing lengths.
+
+        Returns
+        -------
+            The exposure and its derivatives.
+        """
+        if self.source is None:
+            raise ValueError("Model is missing a source")
+        if self.detector is None:
+            raise ValueError("Model is missing a detector")
+        if not isinstance(detector_step, numbers.Number) or \
+                detector_step <= 0:
+            raise ValueError(f"Invalid detector step: {detector_step}")
+        location = np.array(self.detector.location, dtype=float)
+        # the detector derivatives are not symmetric, so the rays from
+        # every source point are needed
+        full = self._quadrature()
+        trace = self._trace(location, quadrature=full)
+        energies, yields = self._spectrum()
+        coefficients = self._cross_sections(energies)
+        keys, contributions = self.source._get_photon_contributions()
+
+        # derivatives of the ray geometry with respect to detector location
+        crossing_slopes = np.zeros((3,) + trace.crossings.shape)
+        gap_slopes = np.zeros((3, len(trace.gaps)))
+        for axis in range(3):
+            step = np.zeros(3)
+            step[axis] = detector_step
+            plus = self._trace(location + step, quadrature=full)
+            minus = self._trace(location - step, quadrature=full)
+            crossing_slopes[axis] = \
+                (plus.crossings - minus.crossings) / (2*detector_step)
+            gap_slopes[axis] = (plus.gaps - minus.gaps) / (2*detector_step)
+        points = np.array(trace.source_points, dtype=float)
+        # derivative of 1/r**2, divided by 1/r**2
+        inverse_square_slopes = \
+            -2 * (location - points).T / np.power(trace.distances, 2)
+
+        exposure = 0.0
+        response = np.zeros(len(energies))
+        shield_slopes = np.zeros(len(self.shield_list))
+        filler_slope = 0.0
+        location_slopes = np.zeros(3)
+        for energy_index in range(len(energies)):
+            attenuation = coefficients.densities * \
+                coefficients.mass_atten[energy_index]
+            total_mfp = trace.crossings @ attenuation
+            filler_mu = 0.0
+            if coefficients.filler_mass_atten is not None:
+                filler_mu = coefficients.filler_density * \
+                    coefficients.filler_mass_atten[energy_index]
+                total_mfp = total_mfp + filler_mu * trace.gaps
+            # exposure per unit photon emission rate
+            _, uncollided_points, collided_points = self._kernel(
+                trace, energies[energy_index], 1.0,
+                coefficients.dose_coeffs[energy_index], total_mfp)
+            response[energy_index] = np.sum(collided_points)
+            uncollided_points = uncollided_points * yields[energy_index]
+            collided_points = collided_points * yields[energy_index]
+            exposure += np.sum(collided_points)
+            if self.buildup_factor_material is not None:
+                buildup_slope = self.buildup_factor_material.\
+                    get_buildup_derivative(float(energies[energy_index]),
+                                           total_mfp)
+            else:
+                buildup_slope = 0.0
+            # derivative of the exposure from each point with respect to mfp
+            mfp_slope = uncollided_points * buildup_slope - collided_points
+            shield_slopes += (mfp_slope @ trace.crossings) * \
+                coefficients.mass_atten[energy_index]
+            if coefficients.filler_mass_atten is not None:
+                filler_slope += (mfp_slope @ trace.gaps) * \
+                    coefficients.filler_mass_atten[energy_index]
+            location_slopes += \
+                (crossing_slopes @ attenuation + filler_mu * gap_slopes) @ \
+                mfp_slope + inverse_square_slopes @ collided_points
+        activities = dict(zip(keys, (contributions @ response).tolist()))
+        return results.Gradient(
+            float(exposure), shield_slopes,
+            float(filler_slope) if self.filler_material is not None
+            else None, activities, location_slopes)
+
+    def sweep(self, parameter: Union[shield.Shield, str],
+              values: Sequence[float]) -> np.ndarray:
+        r"""Calculates the exposure over a range of material densities.
+
+        The geometry is traced once.  All of the density values are then
+        evaluated together, so a sweep costs little more than a single
+        calculation.
+
+        Parameters
+        ----------
+        parameter
+            Either a shield (or source) in the model, in which case the
+            density of the shield material is varied, or the string
+            'filler', in which case the density of the filler material
+            is varied.
+        values
+            The densities to be evaluated in g/cm\ :sup:`3`.
+
+        Raises
+        ------
+        ValueError
+            The parameter is not a shield in the model or the filler
+
+        Returns
+        -------
+            The exposure in mR/hr, one value per density.
+        """
+        if self.source is None:
+            raise ValueError("Model is missing a source")
+        if self.detector is None:
+            raise ValueError("Model is missing a detector")
+        densities = np.asarray(values, dtype=float).reshape(-1)
+        if densities.size > 0 and np.amin(densities) < 0:
+            raise ValueError("Invalid density")
+        trace = self._trace(self.detector.location)
+        energies, yields = self._spectrum()
+        coefficients = self._cross_sections(energies)
+        shield_densities = np.tile(coefficients.densities,
+                                   (densities.size, 1))
+        filler_densities = np.full(densities.size,
+                                   coefficients.filler_density)
+        if isinstance(parameter, str) and parameter == 'filler':
+            if self.filler_material is None:
+                raise ValueError("Model has no filler material")
+            filler_densities = densities
+        elif isinstance(parameter, shield.Shield) and \
+                any(parameter is item for item in self.shield_list):
+            index = [id(item) for item in self.shield_list].index(
+                id(parameter))
+            shield_densities[:, index] = densities
+        else:
+            raise ValueError(f"Invalid sweep parameter: {parameter}")
+        exposure, _ = self._evaluate_batch(trace, energies, yields,
+                                           coefficients, shield_densities,
+                                           filler_densities)
+        return np.sum(exposure, axis=1)
+
+    def sweep_thickness(self, parameter: shield.Shield,
+                        values: Sequence[float]) -> np.ndarray:
+        """Calculates the exposure over a range of shield thicknesses.
+
+        The inner face of the shield is held fixed and the outer face is
+        placed at each thickness.  Shield crossing lengths are calculated
+        analytically for every thickness from a single trace of the
+        geometry, so the shield is never rebuilt.  Supported shields are
+        the SemiInfiniteXSlab (x_start is held fixed) and the
+        InfiniteAnnulus family (the inner radius is held fixed).
+
+        Parameters
+        ----------
+        parameter
+            A SemiInfiniteXSlab or InfiniteAnnulus shield in the model.
+        values
+            The shield thicknesses to be evaluated in cm.
+
+        Raises
+        ------
+        ValueError
+            The shield is not in the model or is not a supported type, a
+            thickness is negative, or a thickness causes the shield to
+            overlap another body
+
+        Returns
+        -------
+            The exposure in mR/hr, one value per thickness.
+        """
+        if self.source is None:
+            raise ValueError("Model is missing a source")
+        if self.detector is None:
+            raise ValueError("Model is missing a detector")
+        if not isinstance(parameter, (shield.SemiInfiniteXSlab,
+                                      shield.InfiniteAnnulus)) or \
+                not any(parameter is item for item in self.shield_list):
+            raise ValueError(f"Invalid sweep parameter: {parameter}")
+        thicknesses = np.asarray(values, dtype=float).reshape(-1)
+        if thicknesses.size > 0 and np.amin(thicknesses) < 0:
+            raise ValueError("Invalid thickness")
+        index = [id(item) for item in self.shield_list].index(id(parameter))
+        trace = self._trace(self.detector.location)
+        energies, yields = self._spectrum()
+        coefficients = self._cross_sections(energies)
+        shield_crossings = parameter._get_thickness_crossing_lengths(
+            np.array(trace.source_points, dtype=float),
+            np.array(self.detector.location, dtype=float), thicknesses)
+        # the filler gaps change by the change in the crossing length
+        gaps = trace.gaps + trace.crossings[:, index] - shield_crossings
+        if gaps.size > 0 and np.amin(gaps) < -1e-9*np.amax(trace.distances):
+            raise ValueError("Looks like shields and/or sources overlap")
+        shield_densities = np.tile(coefficients.densities,
+                                   (thicknesses.size, 1))
+        filler_densities = np.full(thicknesses.size,
+                                   coefficients.filler_density)
+        exposure, _ = self._evaluate_batch(
+            trace, energies, yields, coefficients, shield_densities,
+            filler_densities, shield_index=index,
+            shield_crossings=shield_crossings, gaps=np.clip(gaps, 0, None))
+        return np.sum(exposure, axis=1)
+
+    def solve_thickness(self, parameter: shield.Shield, target_dose: float,
+                        lower: float = 0.0, upper: Optional[float] = None,
+                        tolerance: float = 1E-6,
+                        max_iterations: int = 50) -> float:
+        """Finds the shield thickness that gives a target exposure.
+
+        The geometry is traced once and the exposure and its analytic
+        derivative with respect to thickness are evaluated from the
+        trace, so each iteration costs a fraction of a full calculation.
+        The thickness is found with a Newton iteration on the logarithm of
+        the exposure, safeguarded by bisection.  The inner face of the
+        shield is held fixed, as in :meth:`sweep_thickness`.  The shield
+        itself is not modified.
+
+        Parameters
+        ----------
+        parameter
+            A SemiInfiniteXSlab or InfiniteAnnulus shield in the model.
+        target_dose
+            The target exposure in mR/hr.
+        lower
+            The smallest thickness to be considered in cm.
+        upper
+            The largest thickness to be considered in cm.  If not given,
+            the search range is extended until the target is bracketed.
+        tolerance
+            The relative tolerance on the exposure.
+        max_iterations
+            The maximum number of iterations.
+
+        Raises
+        ------
+        ValueError
+            The shield is not supported, the target exposure is not
+            bracketed, or the iteration does not converge
+
+        Returns
+        -------
+            The shield thickness in cm.
+        """
+        if self.source is None:
+            raise ValueError("Model is missing a source")
+        if self.detector is None:
+            raise ValueError("Model is missing a detector")
+        if not isinstance(parameter, (shield.SemiInfiniteXSlab,
+                                      shield.InfiniteAnnulus)) or \
+                not any(parameter is item for item in self.shield_list):
+            raise ValueError(f"Invalid solve parameter: {parameter}")
+        if not isinstance(target_dose, numbers.Number) or target_dose <= 0:
+            raise ValueError(f"Invalid target dose: {target_dose}")
+        if lower < 0:
+            raise ValueError("Invalid thickness")
+        index = [id(item) for item in self.shield_list].index(id(parameter))
+        trace = self._trace(self.detector.location)
+        energies, yields = self._spectrum()
+        coefficients = self._cross_sections(energies)
+        starts = np.array(trace.source_points, dtype=float)
+        end = np.array(self.detector.location, dtype=float)
+
+        def log_dose(thickness):
+            lengths, slopes = parameter._get_thickness_crossing_lengths(
+                starts, end, [thickness], derivatives=True)
+            dose, derivative = self._thickness_response(
+                trace, energies, yields, coefficients, index,
+                lengths[0], slopes[0])
+            if dose <= 0:
+                return -np.inf, None
+            return math.log(dose/target_dose), derivative/dose
+
+        if upper is None:
+            if isinstance(parameter, shield.SemiInfiniteXSlab):
+                current = abs(parameter.x_end - parameter.x_start)
+            else:
+                current = parameter.outer_radius - parameter.inner_radius
+            upper = max(current, lower, 1.0)
+            while log_dose(upper)[0] > 0:
+                upper *= 2
+                if upper > 1E6:
+                    raise ValueError("Target dose is not bracketed")
+        return _find_root(log_dose, lower, upper, tolerance, max_iterations)
+
+    def solve_distance(self, target_dose: float,
+                       direction: Optional[Sequence[float]] = None,
+                       lower: float = 0.0, upper: Optional[float] = None,
+                       tolerance: float = 1E-6,
+                       max_iterations: int = 50) -> float:
+        """Finds the detector standoff distance that gives a target exposure.
+
+        The detector is moved along a line through its current location,
+        and the distance along the line at which the exposure equals the
+        target is found.  Shield crossing lengths change with the detector
+        location, so each iteration traces the geometry again; the spectrum
+        and cross sections are looked up once.  The distance is found with
+        a secant iteration on the logarithm of the exposure, safeguarded
+        by bisection.  The detector itself is not moved.
+
+        Parameters
+        ----------
+        target_dose
+            The target exposure in mR/hr.
+        direction
+            The direction in which the detector is moved.  Defaults to the
+            direction from the center of the source points to the detector.
+        lower
+            The smallest distance to be considered in cm.
+        upper
+            The largest distance to be considered in cm.  If not given,
+            the search range is extended until the target is bracketed.
+        tolerance
+            The relative tolerance on the exposure.
+        max_iterations
+            The maximum number of iterations.
+
+        Raises
+        ------
+        ValueError
+            The target exposure is not bracketed or the iteration does not
+            converge
+
+        Returns
+        -------
+            The distance in cm from the current detector location, along
+            the direction, at which the exposure equals the target.
+        """
+        if self.source is None:
+            raise ValueError("Model is missing a source")
+        if self.detector is None:
+            raise ValueError("Model is missing a detector")
+        if not isinstance(target_dose, numbers.Number) or target_dose <= 0:
+            raise ValueError(f"Invalid target dose: {target_dose}")
+        origin = np.array(self.detector.location, dtype=float)
+        energies, yields = self._spectrum()
+        coefficients = self._cross_sections(energies)
+        shield_densities = coefficients.densities[np.newaxis, :]
+        filler_densities = np.array([coefficients.filler_density])
+        if direction is None:
+            points = np.array(self.source._get_source_points(), dtype=float)
+            weights = np.asarray(self.source._get_source_point_weights(),
+                                 dtype=float)
+            direction = origin - np.average(points, axis=0, weights=weights)
+        unit = np.asarray(direction, dtype=float)
+        if unit.shape != (3,) or np.linalg.norm(unit) == 0:
+            raise ValueError(f"Invalid direction: {direction}")
+        unit = unit / np.linalg.norm(unit)
+
+        def log_dose(distance):
+            trace = self._trace(origin + distance*unit)
+            exposure, _ = self._evaluate_batch(
+                trace, energies, yields, coefficients, shield_densities,
+                filler_densities)
+            dose = np.sum(exposure)
+            if dose <= 0:
+                return -np.inf, None
+            return math.log(dose/target_dose), None
+
+        if upper is None:
+            upper = max(lower, 0.0) + 100.0
+            while log_dose(upper)[0] > 0:
+                upper = 2*upper
+                if upper > 1E9:
+                    raise ValueError("Target dose is not bracketed")
+        return _find_root(log_dose, lower, upper, tolerance, max_iterations)
+
+    def _trace(self, location: Sequence[float],
+               stats: Optional[profiling.RunStatistics] = None,
+               quadrature: Optional[Tuple[List, np.ndarray]] = None) \
+            -> "_Trace":
+        """Traces rays from each source point to a location.
+
+        Parameters
+        ----------
+        location
+            The X, Y, and Z cartesian coordinates of the ray end point.
+        stats
+            Statistics to be updated, if any.
+        quadrature
+            Source points and weights to be used in place of those of
+            the source.  If not given, the source quadrature is reduced
+            by any mirror symmetry of the model.
+
+        Returns
+        -------
+            The source points, weights, ray lengths, shield crossing
+            lengths and filler gap lengths.
+        """
         # build an array of shield crossing lengths.
         # The first index is the source point.
         # The second index is the shield (including the source body).
         # The total transit distance in the "filler" material (if any)
         # is determined by subtracting the sum of the shield crossing
         # lengths from the total ray length.
-        if self.source is None:
-            raise ValueError("Model is missing a source")
-        if self.detector is None:
-            raise ValueError("Model is missing a detector")
-        source_points = self.source._get_source_points()
-        source_point_weights = self.source._get_source_point_weights()
-        crossing_distances = np.zeros((len(source_points),
-                                       len(self.shield_list)))
-        total_distance = np.zeros((len(source_points)))
-        for index, nextPoint in enumerate(source_points):
-            vector = ray.FiniteLengthRay(nextPoint,
-                                         self.detector.location)
-            total_distance[index] = vector._length
-            # check to see if source point and detector are coincident
-            if total_distance[index] == 0.0:
-                raise ValueError("detector and source are coincident")
-            for index2, currentShield in enumerate(self.shield_list):
-                crossing_distances[index, index2] = \
-                    currentShield._get_crossing_length(vector)
+        with profiling.phase(stats, 'source_points'):
+            if quadrature is not None:
+                source_points, source_point_weights = quadrature
+            else:
+                source_points, source_point_weights = \
+                    self._symmetric_quadrature(location, self._quadrature())
+        with profiling.phase(stats, 'ray_construction'):
+            # all rays share the end point, so they are handled as arrays
+            # of start points rather than as individual ray objects
+            starts = np.array(source_points, dtype=float).reshape(-1, 3)
+            end = np.asarray(location, dtype=float)
+            if end.shape != (3,):
+                raise ValueError("Invalid ray end")
+            total_distance = np.linalg.norm(end - starts, axis=1)
+        # check to see if source point and detector are coincident
+        if np.any(total_distance == 0.0):
+            raise ValueError("detector and source are coincident")
+        with profiling.phase(stats, 'shield_intersection'):
+            crossing_distances = np.zeros((len(source_points),
+                                           len(self.shield_list)))
+            for index, currentShield in enumerate(self.shield_list):
+                crossing_distances[:, index] = \
+                    currentShield._get_crossing_lengths(starts, end)
         gaps = total_distance - np.sum(crossing_distances, axis=1)
-        if np.amin(gaps) < 0:
+        # allow for roundoff where a ray ends on a shield surface
+        if np.amin(gaps) < -1e-9*np.amax(total_distance):
             raise ValueError("Looks like shields and/or sources overlap")
+        gaps = np.clip(gaps, 0, None)
+        if stats is not None:
+            stats.rays = len(starts)
+            stats.intersection_tests = crossing_distances.size
+            stats.hits = int(np.count_nonzero(crossing_distances))
+            stats.array_sizes['source_points'] = (len(source_points), 3)
+            stats.array_sizes['crossing_distances'] = \
+                crossing_distances.shape
+        return _Trace(source_points, source_point_weights, total_distance,
+                      crossing_distances, gaps)
 
-        results_by_photon_energy = []
-        # get a list of photons (energy & intensity) from the source
-        spectrum = self.source.get_photon_source_list()
+    def _quadrature(self) -> Tuple[List, np.ndarray]:
+        """Returns the source points and weights."""
+        return (self.source._get_source_points(),
+                np.asarray(self.source._get_source_point_weights(),
+                           dtype=float))
 
-        air = material.Material('air')
+    def _symmetric_quadrature(self, location: Sequence[float],
+                              quadrature: Tuple[List, np.ndarray]) \
+            -> Tuple[List, np.ndarray]:
+        """Reduces a source quadrature using mirror symmetries of the model.
 
-        # iterate through the photon list
-        for photon in spectrum:
-            photon_energy = photon[0]
-            # photon source strength
-            photon_yield = photon[1]
+        A plane through the detector is a plane of symmetry if every shield
+        (including the source body) is unchanged by a reflection across it
+        and the reflection maps each source point onto a source point of
+        equal weight.  Rays from mirrored source points then have the same
+        crossing lengths, so only the points on one side of each plane are
+        kept and points off the plane carry the weight of their mirror
+        image.  Candidate planes are normal to the coordinate axes or
+        contain the axis of a shield.  Up to three mutually perpendicular
+        planes are used.
 
-            dose_coeff = air.get_mass_energy_abs_coeff(photon_energy)
+        Parameters
+        ----------
+        location
+            The detector location.
+        quadrature
+            The full source points and weights.
 
-            # determine the xsecs
-            xsecs = np.zeros((len(self.shield_list)))
-            for index, currentShield in enumerate(self.shield_list):
-                xsecs[index] = currentShield.material.density * \
-                    currentShield.material.get_mass_atten_coeff(photon_energy)
-            # determine an array of mean free paths, one per source point
-            total_mfp = crossing_distances * xsecs
-            total_mfp = np.sum(total_mfp, axis=1)
-            # add the gaps if required
+        Returns
+        -------
+            The source points and weights in the fundamental region, or
+            the full quadrature if the model has no symmetry.
+        """
+        if not self.use_symmetry:
+            return quadrature
+        points = np.array(quadrature[0], dtype=float).reshape(-1, 3)
+        weights = np.asarray(quadrature[1], dtype=float)
+        end = np.asarray(location, dtype=float)
+        if len(points) < 2 or end.shape != (3,):
+            return quadrature
+        scale = max(1.0, float(np.amax(np.abs(points))),
+                    float(np.amax(np.abs(end))))
+        tolerance = Model._SYMMETRY_TOLERANCE * scale
+        candidates = list(np.eye(3))
+        for item in self.shield_list:
+            normal = item._mirror_normal(end)
+            if normal is not None:
+                candidates.append(normal)
+        planes: List[np.ndarray] = []
+        tree = None
+        for normal in candidates:
+            # reflections across perpendicular planes commute
+            if any(abs(np.dot(normal, plane)) >
+                   shield.Shield._PARALLEL_TOLERANCE for plane in planes):
+                continue
+            if not all(item._is_mirror_symmetric(end, normal, tolerance)
+                       for item in self.shield_list):
+                continue
+            if tree is None:
+                tree = scipy.spatial.cKDTree(points)
+            offsets = (points - end) @ normal
+            reflected = points - 2 * offsets[:, np.newaxis] * normal
+            distance, index = tree.query(reflected,
+                                         distance_upper_bound=tolerance)
+            if np.any(np.isinf(distance)) or \
+                    not np.allclose(weights[index], weights, rtol=1E-9,
+                                    atol=0):
+                continue
+            planes.append(normal)
+        if len(planes) == 0:
+            return quadrature
+        keep = np.ones(len(points), dtype=bool)
+        multiplicity = np.ones(len(points))
+        for normal in planes:
+            offsets = (points - end) @ normal
+            keep &= offsets > -tolerance
+            multiplicity *= np.where(offsets > tolerance, 2, 1)
+        return points[keep], weights[keep] * multiplicity[keep]
+
+    def _spectrum(self, stats: Optional[profiling.RunStatistics] = None) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the photon energies and emission rates of the source.
+
+        Parameters
+        ----------
+        stats
+            Statistics to be updated, if any.
+        """
+        # get a list of photons (energy & intensity) from the source
+        with profiling.phase(stats, 'spectrum'):
+            spectrum = self.source.get_photon_source_list()
+        if stats is not None:
+            stats.array_sizes['spectrum'] = (len(spectrum), 2)
+        energies = np.array([photon[0] for photon in spectrum], dtype=float)
+        yields = np.array([photon[1] for photon in spectrum], dtype=float)
+        return energies, yields
+
+    def _cross_sections(self, energies: np.ndarray,
+                        stats: Optional[profiling.RunStatistics] = None) \
+            -> "_Coefficients":
+        """Looks up the material coefficients at each photon energy.
+
+        Parameters
+        ----------
+        energies
+            The photon energies in MeV.
+        stats
+            Statistics to be updated, if any.
+        """
+        with profiling.phase(stats, 'cross_sections'):
+            air = material.Material('air')
+            # mass attenuation coefficients, keyed by material name and
+            # photon energy, so that shields sharing a material share
+            # a single library lookup
+            xsec_cache: Dict[Tuple[str, float], float] = {}
+            mass_atten = np.zeros((len(energies), len(self.shield_list)))
+            dose_coeffs = np.zeros(len(energies))
+            for energy_index, photon_energy in enumerate(energies):
+                photon_energy = float(photon_energy)
+                dose_coeffs[energy_index] = \
+                    air.get_mass_energy_abs_coeff(photon_energy)
+                for index, currentShield in enumerate(self.shield_list):
+                    key = (currentShield.material.name, photon_energy)
+                    mass_atten_coeff = xsec_cache.get(key)
+                    if mass_atten_coeff is None:
+                        mass_atten_coeff = currentShield.material.\
+                            get_mass_atten_coeff(photon_energy)
+                        xsec_cache[key] = mass_atten_coeff
+                        if stats is not None:
+                            stats.cache_misses += 1
+                    elif stats is not None:
+                        stats.cache_hits += 1
+                    mass_atten[energy_index, index] = mass_atten_coeff
+            densities = np.array([currentShield.material.density
+                                  for currentShield in self.shield_list],
+                                 dtype=float)
+            filler_mass_atten = None
+            filler_density = 0.0
             if self.filler_material is not None:
-                gap_xsec = self.filler_material.density * \
-                    self.filler_material.get_mass_atten_coeff(photon_energy)
-                total_mfp = total_mfp + (gaps * gap_xsec)
-            uncollided_flux_factor = np.exp(-total_mfp)
+                filler_density = self.filler_material.density
+                filler_mass_atten = np.array(
+                    [self.filler_material.get_mass_atten_coeff(float(energy))
+                     for energy in energies], dtype=float)
+        return _Coefficients(mass_atten, densities, filler_mass_atten,
+                             filler_density, dose_coeffs)
+
+    def _kernel(self, trace: "_Trace", photon_energy: float,
+                photon_yield: float, dose_coeff: float,
+                total_mfp: np.ndarray,
+                stats: Optional[profiling.RunStatistics] = None) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Evaluates the point kernel for a single photon energy.
+
+        Parameters
+        ----------
+        trace
+            The traced geometry.
+        photon_energy
+            The photon energy in MeV.
+        photon_yield
+            The photon emission rate in photons/sec.
+        dose_coeff
+            The mass energy absorption coefficient of air.
+        total_mfp
+            Mean free paths, with the source point as the last index.
+            Leading indices (if any) are evaluated as a batch.
+        stats
+            Statistics to be updated, if any.
+
+        Returns
+        -------
+            The uncollided energy flux, uncollided exposure, and total
+            exposure from each source point.
+        """
+        with profiling.phase(stats, 'buildup'):
             if (self.buildup_factor_material is not None):
-                buildup_factor = \
+                buildup_factor = np.reshape(
                     self.buildup_factor_material.get_buildup_factor(
-                        photon_energy, total_mfp)
+                        float(photon_energy), np.ravel(total_mfp)),
+                    np.shape(total_mfp))
             else:
                 buildup_factor = 1.0
+        with profiling.phase(stats, 'kernel'):
             # Notes for the following code:
             # uncollided_point_energy_flux - an ARRAY of uncollided energy
             #    flux for a at the detector from a range of quadrature
             #    locations and a specific photon energy
-            # total_uncollided_energy_flux - an INTEGRAL of uncollided energy
-            #    flux for a at the detector and a specific photon energy
             #
-            uncollided_point_energy_flux = photon_yield * \
-                np.asarray(source_point_weights) \
-                * uncollided_flux_factor * photon_energy * \
-                (1/(4*math.pi*np.power(total_distance, 2)))
-            total_uncollided_energy_flux = np.sum(uncollided_point_energy_flux)
-
+            uncollided_point_energy_flux = photon_yield * trace.weights * \
+                np.exp(-total_mfp) * photon_energy * \
+                (1/(4*math.pi*np.power(trace.distances, 2)))
             uncollided_point_exposure = uncollided_point_energy_flux * \
                 Model.FLUX_TO_EXPOSURE_CONVERSION_FACTOR * dose_coeff * \
                 1000 * 3600  # mR/hr
-            total_uncollided_exposure = np.sum(uncollided_point_exposure)
-
             collided_point_exposure = uncollided_point_exposure * \
                 buildup_factor
-            total_collided_exposure = np.sum(collided_point_exposure)
+        return (uncollided_point_energy_flux, uncollided_point_exposure,
+                collided_point_exposure)
+
+    def _evaluate_batch(self, trace: "_Trace", energies: np.ndarray,
+                        yields: np.ndarray, coefficients: "_Coefficients",
+                        shield_densities: np.ndarray,
+                        filler_densities: np.ndarray,
+                        shield_index: Optional[int] = None,
+                        shield_crossings: Optional[np.ndarray] = None,
+                        gaps: Optional[np.ndarray] = None) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """Evaluates the exposure for a batch of material densities and,
+        optionally, crossing lengths through one of the shields.
+
+        Parameters
+        ----------
+        trace
+            The traced geometry.
+        energies
+            The photon energies in MeV.
+        yields
+            The photon emission rates in photons/sec.
+        coefficients
+            The material coefficients.
+        shield_densities
+            Shield densities, indexed by batch entry and shield.
+        filler_densities
+            Filler densities, one per batch entry.
+        shield_index
+            The shield whose crossing lengths vary with the batch entry.
+        shield_crossings
+            Crossing lengths through the varied shield, indexed by batch
+            entry and source point.
+        gaps
+            Filler gap lengths, indexed by batch entry and source point.
+            Required if shield_crossings is given.
+
+        Returns
+        -------
+            The total and uncollided exposure, indexed by batch entry and
+            photon energy.
+        """
+        n_batch = len(filler_densities)
+        n_points = len(trace.distances)
+        exposure = np.zeros((n_batch, len(energies)))
+        uncollided = np.zeros((n_batch, len(energies)))
+        # limit the size of the (batch, source point) working arrays
+        chunk = max(1, Model._BATCH_ELEMENTS // max(n_points, 1))
+        for first in range(0, n_batch, chunk):
+            rows = slice(first, min(first + chunk, n_batch))
+            for energy_index in range(len(energies)):
+                attenuation = shield_densities[rows] * \
+                    coefficients.mass_atten[energy_index]
+                if shield_crossings is None:
+                    total_mfp = attenuation @ trace.crossings.T
+                    row_gaps = trace.gaps[np.newaxis, :]
+                else:
+                    varied = attenuation[:, shield_index].copy()
+                    attenuation[:, shield_index] = 0
+                    total_mfp = attenuation @ trace.crossings.T + \
+                        varied[:, np.newaxis] * shield_crossings[rows]
+                    row_gaps = gaps[rows]
+                if coefficients.filler_mass_atten is not None:
+                    total_mfp += (filler_densities[rows] *
+                                  coefficients.filler_mass_atten[
+                                      energy_index])[:, np.newaxis] * \
+                        row_gaps
+                _, uncollided_points, collided_points = self._kernel(
+                    trace, energies[energy_index], yields[energy_index],
+                    coefficients.dose_coeffs[energy_index], total_mfp)
+                uncollided[rows, energy_index] = \
+                    np.sum(uncollided_points, axis=1)
+                exposure[rows, energy_index] = \
+                    np.sum(collided_points, axis=1)
+        return exposure, uncollided
+
+    def _thickness_response(self, trace: "_Trace", energies: np.ndarray,
+                            yields: np.ndarray,
+                            coefficients: "_Coefficients",
+                            shield_index: int, lengths: np.ndarray,
+                            slopes: np.ndarray) -> Tuple[float, float]:
+        """Evaluates the exposure and its derivative with respect to the
+        thickness of one shield.
 
-            results_by_photon_energy.append(
-                [photon_energy, photon_yield, total_uncollided_energy_flux,
-                 total_uncollided_exposure, total_collided_exposure])
+        Parameters
+        ----------
+        trace
+            The traced geometry.
+        energies
+            The photon energies in MeV.
+        yields
+            The photon emission rates in photons/sec.
+        coefficients
+            The material coefficients.
+        shield_index
+            The shield whose thickness is varied.
+        lengths
+            Crossing lengths through the varied shield, one per source point.
+        slopes
+            Derivatives of the crossing lengths with respect to thickness.
 
-        return results_by_photon_energy
+        Returns
+        -------
+            The exposure in mR/hr and its derivative in mR/hr/cm.
+        """
+        gaps = trace.gaps + trace.crossings[:, shield_index] - lengths
+        if np.amin(gaps) < -1e-9*np.amax(trace.distances):
+            raise ValueError("Looks like shields and/or sources overlap")
+        gaps = np.clip(gaps, 0, None)
+        dose = 0.0
+        derivative = 0.0
+        for energy_index in range(len(energies)):
+            attenuation = coefficients.densities * \
+                coefficients.mass_atten[energy_index]
+            shield_mu = attenuation[shield_index]
+            filler_mu = 0.0
+            total_mfp = trace.crossings @ attenuation + \
+                shield_mu * (lengths - trace.crossings[:, shield_index])
+            if coefficients.filler_mass_atten is not None:
+                filler_mu = coefficients.filler_density * \
+                    coefficients.filler_mass_atten[energy_index]
+                total_mfp = total_mfp + filler_mu * gaps
+            _, uncollided_points, collided_points = self._kernel(
+                trace, energies[energy_index], yields[energy_index],
+                coefficients.dose_coeffs[energy_index], total_mfp)
+            if self.buildup_factor_material is not None:
+                buildup_slope = self.buildup_factor_material.\
+                    get_buildup_derivative(float(energies[energy_index]),
+                                           total_mfp)
+            else:
+                buildup_slope = 0.0
+            # the filler gap shrinks as the shield crossing grows
+            mfp_slope = (shield_mu - filler_mu) * slopes
+            dose += np.sum(collided_points)
+            derivative += np.sum((uncollided_points * buildup_slope -
+                                  collided_points) * mfp_slope)
+        return float(dose), float(derivative)
 
-    def display(self) -> None:
+    def display(self, resolution: Optional[int] = None) -> None:
         """
         Produces a graphic display of the model.
+
+        Shield meshes are kept with each shield and reused by later
+        displays until the shield is changed.
+
+        Parameters
+        ----------
+        resolution
+            The number of segments used around curved surfaces.  If None,
+            the pyvista defaults are used for models with up to 50
+            shields, and a coarser resolution is used for larger models.
         """
         if pyvista_found:
-            # find the bounding box for all objects
-            bounds = self._findBoundingBox()
-            pl: pyvista.Plotter = pyvista.Plotter()
-            self._trimBlocks(pl, bounds)
-            self._addPoints(pl)
-            pl.show_bounds(grid='front', location='outer', all_edges=True)
-            if self.source is not None or self.detector is not None:
-                pl.add_legend(face=None, size=(0.1, 0.1))
-            pl.show()
-
-    def _trimBlocks(self, pl: pyvista.Plotter, bounds: List[float]) -> None:
+            self._plotter(resolution=resolution).show()
+
+    def _plotter(self, off_screen: bool = False,
+                 window_size: Optional[Sequence[int]] = None,
+                 resolution: Optional[int] = None) -> "pyvista.Plotter":
+        """Creates a Plotter instance showing the model geometry.
+
+        Parameters
+        ----------
+        off_screen
+            If True, the plotter renders without opening a window.
+        window_size
+            The width and height of the rendering in pixels.
+        resolution
+            The number of segments used around curved surfaces.
+        """
+        if resolution is None:
+            resolution = self._display_resolution()
+        elif not isinstance(resolution, numbers.Integral) or resolution < 3:
+            raise ValueError(f"Invalid resolution: {resolution}")
+        # find the bounding box for all objects
+        bounds = self._findBoundingBox()
+        pl: pyvista.Plotter = pyvista.Plotter(off_screen=off_screen,
+                                              window_size=window_size)
+        self._trimBlocks(pl, bounds, resolution)
+        self._addPoints(pl)
+        pl.show_bounds(grid='front', location='outer', all_edges=True)
+        if self.source is not None or self.detector is not None:
+            pl.add_legend(face=None, size=(0.1, 0.1))
+        return pl
+
+    def _display_resolution(self) -> Optional[int]:
+        """Returns the number of segments used around curved surfaces,
+        reduced for models with many shields so that the display stays
+        responsive.
+
+        Returns
+        -------
+            The resolution, or None to use the pyvista defaults.
+        """
+        count = len(self.shield_list)
+        if count <= Model._DISPLAY_SHIELDS:
+            return None
+        # the number of faces grows as the square of the resolution
+        return max(Model._MIN_DISPLAY_RESOLUTION,
+                   int(Model._DISPLAY_RESOLUTION *
+                       math.sqrt(Model._DISPLAY_SHIELDS / count)))
+
+    def _trimBlocks(self, pl: pyvista.Plotter, bounds: List[float],
+                    resolution: Optional[int] = None) -> None:
         """
         Adds shields to a Plotter instance after trimming any
         infinite shields to a predefined bounding box.
@@ -289,20 +2200,9 @@ class Model:
                 opacity = 0.5
             # first handle infinite shields
             if isinstance(currentShield, shield.SemiInfiniteShield):
-                clipped = currentShield.draw()
-                if isinstance(clipped, pyvista.PolyData):
-                    clipped = clipped.clip_closed_surface(
-                        normal='x', origin=[bounds[0], 0, 0])
-                    clipped = clipped.clip_closed_surface(    # type: ignore
-                        normal='y', origin=[0, bounds[2], 0])
-                    clipped = clipped.clip_closed_surface(    # type: ignore
-                        normal='z', origin=[0, 0, bounds[4]])
-                    clipped = clipped.clip_closed_surface(    # type: ignore
-                        normal='-x', origin=[bounds[1], 0, 0])
-                    clipped = clipped.clip_closed_surface(    # type: ignore
-                        normal='-y', origin=[0, bounds[3], 0])
-                    clipped = clipped.clip_closed_surface(    # type: ignore
-                        normal='-z', origin=[0, 0, bounds[5]])
+                clipped = currentShield._trimmed_mesh(bounds, resolution)
+                if isinstance(clipped, pyvista.PolyData) and \
+                        clipped.n_points > 0:
                     pl.add_mesh(clipped, color=SHIELD_COLOR, opacity=opacity)
             # now handle the sources and non-infinite shields
             else:
@@ -311,11 +2211,12 @@ class Model:
                         # point sources are handled later
                         pass
                     else:
-                        pl.add_mesh(currentShield.draw(),
-                                    SOURCE_COLOR, label='source', line_width=3)
+                        pl.add_mesh(currentShield._mesh(resolution),
+                                    color=SOURCE_COLOR, label='source',
+                                    line_width=3)
                 else:
-                    pl.add_mesh(currentShield.draw(), SHIELD_COLOR,
-                                opacity=opacity)
+                    pl.add_mesh(currentShield._mesh(resolution),
+                                color=SHIELD_COLOR, opacity=opacity)
         # now add the "bounds" as a transparent block to for a display size
         mesh = pyvista.Box(bounds)
         pl.add_mesh(mesh, opacity=0)
@@ -324,7 +2225,8 @@ class Model:
         """Calculates a bounding box is X, Y, Z geometry that
         includes the volumes of all shields, the source, and the detector
         """
-        blocks = pyvista.MultiBlock()
+        # extents of the shields, found without building meshes
+        extents = []
         for currentShield in self.shield_list:
             if isinstance(currentShield, shield.SemiInfiniteShield):
                 # for infinite shield bodies,
@@ -335,19 +2237,26 @@ class Model:
                                                        self.detector.y,
                                                        self.detector.z)
                     for point in points:
-                        # we are appending a degenerate line as a
-                        # representation of a point
-                        blocks.append(pyvista.Line(point, point))
+                        extents.append([point[0], point[0], point[1],
+                                        point[1], point[2], point[2]])
             else:
-                # add finite shields to the MultiBlock composite
-                blocks.append(currentShield.draw())
+                extent = currentShield._bounds()
+                if extent is None:
+                    extent = currentShield._mesh().bounds
+                extents.append(list(extent))
 
-        # include the detector geometry in the MultiBlock composite
+        # include the detector location
         if self.detector is not None:
-            blocks.append(self.detector.draw())
+            location = self.detector.location
+            extents.append([location[0], location[0], location[1],
+                            location[1], location[2], location[2]])
 
         # check for a zero width bounding box in any direction
-        xmin, xmax, ymin, ymax, zmin, zmax = blocks.bounds
+        if len(extents) == 0:
+            extents.append([0.0] * 6)
+        extents_array = np.array(extents, dtype=float)
+        xmin, ymin, zmin = np.amin(extents_array[:, 0::2], axis=0)
+        xmax, ymax, zmax = np.amax(extents_array[:, 1::2], axis=0)
         x_width = abs(xmax - xmin)
         y_width = abs(ymax - ymin)
         z_width = abs(zmax - zmin)
@@ -415,3 +2324,218 @@ class Model:
                 body, line_width=5, color=DETECTOR_COLOR,
                 label='detector')
         # pl.set_background(color='white')
+
+
+# the model and location evaluator of a dose map worker process
+_map_worker: Optional[Tuple[Model, Callable[[np.ndarray], np.ndarray]]] = \
+    None
+
+
+def _start_map_worker(worker_model: Model, setup: "_MapSetup") -> None:
+    """Prepares a worker process to evaluate blocks of a dose map.
+
+    Parameters
+    ----------
+    worker_model
+        The model.
+    setup
+        The spectrum, cross sections, and far-field bundle of the map.
+    """
+    global _map_worker
+    _map_worker = (worker_model, worker_model._location_evaluator(setup))
+
+
+def _write_map_block(path: Union[str, os.PathLike], start: int,
+                     points: np.ndarray, by_energy: bool,
+                     threads: Optional[int],
+                     worker: Optional[Tuple[Model, Callable[[np.ndarray],
+                                                             np.ndarray]]]
+                     = None) -> None:
+    """Evaluates a block of a dose map and writes it into the map file.
+
+    Parameters
+    ----------
+    path
+        The map file, which already has its full size.
+    start
+        The index of the first location of the block.
+    points
+        Detector locations of the block, indexed by location and
+        coordinate.
+    by_energy
+        If True, the map holds the exposure for each photon energy.
+    threads
+        The number of threads used to evaluate the block.
+    worker
+        The model and location evaluator.  Defaults to those of the
+        worker process.
+    """
+    block_model, exposure = worker if worker is not None else _map_worker
+    targets, inverse = block_model._map_targets(np.asarray(points))
+    values = block_model._evaluate_map(
+        lambda indices: exposure(targets[indices]),
+        np.arange(len(targets)), threads)[inverse]
+    output = np.load(path, mmap_mode='r+')
+    if by_energy:
+        output[:, start:start + len(points)] = values.T
+    else:
+        output[start:start + len(points)] = np.sum(values, axis=1)
+    output.flush()
+
+
+def _find_root(function, lower: float, upper: float, tolerance: float,
+               max_iterations: int,
+               values: Optional[Tuple[float, float]] = None) -> float:
+    """Finds a root of a function with a Newton iteration safeguarded
+    by bisection.
+
+    Parameters
+    ----------
+    function
+        Returns the function value and derivative at a point.  If the
+        derivative is None, a secant estimate is used instead.
+    lower
+        The lower end of the search interval.
+    upper
+        The upper end of the search interval.
+    tolerance
+        The convergence tolerance on the function value.
+    max_iterations
+        The maximum number of iterations.
+    values
+        The function values at the lower and upper ends of the interval,
+        if already known.
+
+    Raises
+    ------
+    ValueError
+        The root is not bracketed or the iteration does not converge
+
+    Returns
+    -------
+        The root.
+    """
+    if values is None:
+        f_lower, _ = function(lower)
+        f_upper, _ = function(upper)
+    else:
+        f_lower, f_upper = values
+    if abs(f_lower) <= tolerance:
+        return lower
+    if abs(f_upper) <= tolerance:
+        return upper
+    if np.sign(f_lower) == np.sign(f_upper):
+        raise ValueError("Target dose is not bracketed")
+    if np.isfinite(f_lower) and np.isfinite(f_upper):
+        # start from the linear interpolation between the bounds
+        x = lower - f_lower * (upper - lower) / (f_upper - f_lower)
+    else:
+        x = (lower + upper) / 2
+    previous = None
+    for _ in range(max_iterations):
+        f, slope = function(x)
+        if abs(f) <= tolerance:
+            return x
+        if np.sign(f) == np.sign(f_lower):
+            lower, f_lower = x, f
+        else:
+            upper, f_upper = x, f
+        if slope is None and previous is not None and \
+                np.isfinite(f) and previous[0] != x:
+            slope = (f - previous[1]) / (x - previous[0])
+        previous = (x, f)
+        step = None
+        if slope is not None and np.isfinite(f) and slope != 0:
+            step = x - f / slope
+        if step is None or not (lower < step < upper):
+            step = (lower + upper) / 2
+        if abs(step - x) <= 1E-12 * max(1.0, abs(x)):
+            return step
+        x = step
+    raise ValueError("Solution did not converge")
+
+
+class _Trace:
+    """The geometry of the rays from each source point to a detector.
+
+    Parameters
+    ----------
+    source_points
+        Source point locations in cartesian coordinates.
+    weights
+        Fraction of the source represented by each source point.
+    distances
+        Length of the ray from each source point.
+    crossings
+        Shield crossing lengths, indexed by source point and shield.
+    gaps
+        Length of each ray that lies in the filler material.
+    """
+    def __init__(self, source_points: List[Tuple[float, float, float]],
+                 weights: np.ndarray, distances: np.ndarray,
+                 crossings: np.ndarray, gaps: np.ndarray) -> None:
+        self.source_points = source_points
+        self.weights = weights
+        self.distances = distances
+        self.crossings = crossings
+        self.gaps = gaps
+
+
+class _MapSetup:
+    """The quantities shared by the locations of a dose map.
+
+    Parameters
+    ----------
+    energies
+        The photon energies in MeV.
+    yields
+        The photon emission rates in photons/sec.
+    coefficients
+        The material coefficients.
+    quadrature
+        The full source points and weights.
+    edges
+        The source points on the outline of the source, or None if no
+        location is in the far field.
+    bundle
+        The far-field bundle points and weights and the number of
+        self-shielding groups, or None if no location is lumped.
+    """
+    def __init__(self, energies: np.ndarray, yields: np.ndarray,
+                 coefficients: "_Coefficients",
+                 quadrature: Tuple[List, np.ndarray],
+                 edges: Optional[np.ndarray],
+                 bundle: Optional[Tuple]) -> None:
+        self.energies = energies
+        self.yields = yields
+        self.coefficients = coefficients
+        self.quadrature = quadrature
+        self.edges = edges
+        self.bundle = bundle
+
+
+class _Coefficients:
+    """Material coefficients at each photon energy.
+
+    Parameters
+    ----------
+    mass_atten
+        Mass attenuation coefficients, indexed by photon energy and shield.
+    densities
+        Shield densities.
+    filler_mass_atten
+        Filler mass attenuation coefficients, one per photon energy, or
+        None if the model has no filler.
+    filler_density
+        Filler density.
+    dose_coeffs
+        Mass energy absorption coefficients of air, one per photon energy.
+    """
+    def __init__(self, mass_atten: np.ndarray, densities: np.ndarray,
+                 filler_mass_atten: Optional[np.ndarray],
+                 filler_density: float, dose_coeffs: np.ndarray) -> None:
+        self.mass_atten = mass_atten
+        self.densities = densities
+        self.filler_mass_atten = filler_mass_atten
+        self.filler_density = filler_density
+        self.dose_coeffs = dose_coeffs
@@ -0,0 +1,131 @@
+import contextlib
+import time
+from typing import Dict, Iterator, Optional, Tuple
+''' '''
+'''
+ZapMeNot - a point kernel photon shielding library
+Copyright (C) 2019-2025  C. Alan Ford
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+
+class RunStatistics:
+    """Timings and counters collected during a single calculation.
+
+    Timings are recorded per calculation phase rather than per ray, so
+    the cost of collecting statistics is a few clock reads per
+    calculation.
+
+    Attributes
+    ----------
+    timings
+        Elapsed wall time in seconds for each calculation phase.
+    rays
+        Number of source-to-detector rays constructed.
+    intersection_tests
+        Number of ray/shield intersection tests performed.
+    hits
+        Number of ray/shield intersection tests with a non-zero
+        crossing length.
+    cache_hits
+        Number of cross section lookups served from the cross
+        section cache.
+    cache_misses
+        Number of cross section lookups that required interpolation
+        of the material library data.
+    array_sizes
+        Shapes of the principal arrays used in the calculation.
+    """
+
+    PHASES = ('source_points', 'ray_construction', 'shield_intersection',
+              'spectrum', 'cross_sections', 'buildup', 'kernel')
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, float] = {name: 0.0 for name in self.PHASES}
+        self.rays: int = 0
+        self.intersection_tests: int = 0
+        self.hits: int = 0
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+        self.array_sizes: Dict[str, Tuple[int, ...]] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Accumulates the wall time spent in a calculation phase.
+
+        Parameters
+        ----------
+        name
+            The calculation phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + \
+                time.perf_counter() - start
+
+    @property
+    def total_time(self) -> float:
+        """Sum of the wall time in seconds over all phases."""
+        return sum(self.timings.values())
+
+    def as_dict(self) -> dict:
+        """Returns the statistics as a dictionary.
+
+        Returns
+        -------
+            Dictionary of the timings, counters, and array sizes.
+        """
+        return {'timings': dict(self.timings),
+                'total_time': self.total_time,
+                'rays': self.rays,
+                'intersection_tests': self.intersection_tests,
+                'hits': self.hits,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'array_sizes': dict(self.array_sizes)}
+
+    def __repr__(self) -> str:
+        lines = ['RunStatistics']
+        for name, value in self.timings.items():
+            lines.append(f'  {name:<20} {value:12.6f} s')
+        lines.append(f'  {"total":<20} {self.total_time:12.6f} s')
+        lines.append(f'  rays: {self.rays}, '
+                     f'intersection tests: {self.intersection_tests}, '
+                     f'hits: {self.hits}')
+        lines.append(f'  cache hits: {self.cache_hits}, '
+                     f'cache misses: {self.cache_misses}')
+        for name, shape in self.array_sizes.items():
+            lines.append(f'  {name}: {shape}')
+        return '\n'.join(lines)
+
+
+def phase(statistics: Optional[RunStatistics],
+          name: str) -> contextlib.AbstractContextManager:
+    """Returns a context manager that times a calculation phase, or
+    a context manager that does nothing if statistics are not being
+    collected.
+
+    Parameters
+    ----------
+    statistics
+        The statistics being collected, if any.
+    name
+        The calculation phase.
+    """
+    if statistics is None:
+        return contextlib.nullcontext()
+    return statistics.phase(name)
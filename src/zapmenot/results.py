@@ -0,0 +1,363 @@
+import io
+import os
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+import importlib
+pandas_spec = importlib.util.find_spec("pandas")
+pandas_found = pandas_spec is not None
+if pandas_found:
+    import pandas
+pyvista_spec = importlib.util.find_spec("pyvista")
+pyvista_found = pyvista_spec is not None
+if pyvista_found:
+    import pyvista
+''' '''
+'''
+ZapMeNot - a point kernel photon shielding library
+Copyright (C) 2019-2025  C. Alan Ford
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+
+class Results:
+    r"""The results of a point-kernel calculation, by photon energy.
+
+    Each array attribute has one entry per photon energy.  The optional
+    mean free path and source point arrays are only available when
+    requested from :meth:`zapmenot.model.Model.calculate_results`.
+
+    Parameters
+    ----------
+    energies
+        Photon energies in MeV.
+    yields
+        Photon emission rates in photons/sec.
+    uncollided_flux
+        Uncollided energy flux in MeV/cm\ :sup:`2`/sec.
+    uncollided_exposure
+        Uncollided exposure in mR/hr.
+    exposure
+        Total (collided) exposure in mR/hr.
+    point_mfp
+        Total mean free paths, indexed by photon energy and source point.
+    crossing_distances
+        Shield crossing lengths in cm, indexed by source point and shield.
+    attenuation_coefficients
+        Linear attenuation coefficients in 1/cm, indexed by photon energy
+        and shield.
+    source_points
+        Source point locations in cartesian coordinates, indexed by
+        source point.
+    source_point_weights
+        Fraction of the source represented by each source point.
+    point_uncollided_exposure
+        Uncollided exposure in mR/hr, indexed by photon energy and
+        source point.
+    point_exposure
+        Total exposure in mR/hr, indexed by photon energy and source point.
+    """
+
+    COLUMNS = ['MeV', 'photons/sec', 'Uncollided MeV/cm2/sec',
+               'Uncollided mR/hr', 'Collided mR/hr']
+
+    def __init__(self, energies: np.ndarray, yields: np.ndarray,
+                 uncollided_flux: np.ndarray,
+                 uncollided_exposure: np.ndarray,
+                 exposure: np.ndarray,
+                 point_mfp: Optional[np.ndarray] = None,
+                 crossing_distances: Optional[np.ndarray] = None,
+                 attenuation_coefficients: Optional[np.ndarray] = None,
+                 source_points: Optional[np.ndarray] = None,
+                 source_point_weights: Optional[np.ndarray] = None,
+                 point_uncollided_exposure: Optional[np.ndarray] = None,
+                 point_exposure: Optional[np.ndarray] = None) -> None:
+        self.energies: np.ndarray = energies
+        self.yields: np.ndarray = yields
+        self.uncollided_flux: np.ndarray = uncollided_flux
+        self.uncollided_exposure: np.ndarray = uncollided_exposure
+        self.exposure: np.ndarray = exposure
+        self.point_mfp: Optional[np.ndarray] = point_mfp
+        self.crossing_distances: Optional[np.ndarray] = crossing_distances
+        self.attenuation_coefficients: Optional[np.ndarray] = \
+            attenuation_coefficients
+        self.source_points: Optional[np.ndarray] = source_points
+        self.source_point_weights: Optional[np.ndarray] = \
+            source_point_weights
+        self.point_uncollided_exposure: Optional[np.ndarray] = \
+            point_uncollided_exposure
+        self.point_exposure: Optional[np.ndarray] = point_exposure
+
+    def __len__(self) -> int:
+        return len(self.energies)
+
+    @property
+    def total_exposure(self) -> float:
+        """The total exposure, summed over all photon energies,
+        in mR/hr."""
+        return float(np.sum(self.exposure))
+
+    @property
+    def total_uncollided_exposure(self) -> float:
+        """The uncollided exposure, summed over all photon energies,
+        in mR/hr."""
+        return float(np.sum(self.uncollided_exposure))
+
+    @property
+    def shield_mfp(self) -> Optional[np.ndarray]:
+        """Mean free paths through each shield, indexed by photon energy,
+        source point, and shield.  The array is assembled on request from
+        the crossing distances and attenuation coefficients."""
+        if self.crossing_distances is None or \
+                self.attenuation_coefficients is None:
+            return None
+        return self.crossing_distances[np.newaxis, :, :] * \
+            self.attenuation_coefficients[:, np.newaxis, :]
+
+    def point_contributions(self) -> np.ndarray:
+        """Returns the exposure contributed by each source point.
+
+        Raises
+        ------
+        ValueError
+            Source point contributions were not calculated
+
+        Returns
+        -------
+            The exposure in mR/hr from each source point, summed over
+            photon energies.
+        """
+        if self.point_exposure is None:
+            raise ValueError("Source point contributions were not calculated")
+        return np.sum(self.point_exposure, axis=0)
+
+    @property
+    def effective_point_count(self) -> float:
+        r"""The number of source points that effectively contribute to the
+        exposure, (sum of contributions)\ :sup:`2` / sum of squared
+        contributions.  A value much smaller than the number of source
+        points indicates that the exposure is dominated by a small part
+        of the source and that the quadrature should be refined there."""
+        contributions = self.point_contributions()
+        squares = np.sum(contributions**2)
+        if squares == 0:
+            return 0.0
+        return float(np.sum(contributions)**2 / squares)
+
+    def shield_contributions(self) -> np.ndarray:
+        """Returns the exposure-weighted mean free path through each shield.
+
+        The mean free path through each shield is averaged over photon
+        energies and source points, weighted by the uncollided exposure
+        that reaches the detector.  Shields with the largest values
+        remove the most exposure.
+
+        Raises
+        ------
+        ValueError
+            Mean free paths or source point contributions were not
+            calculated
+
+        Returns
+        -------
+            The exposure-weighted mean free path, one per shield.
+        """
+        shield_mfp = self.shield_mfp
+        if shield_mfp is None or self.point_uncollided_exposure is None:
+            raise ValueError(
+                "Mean free paths and source point contributions are required")
+        total = np.sum(self.point_uncollided_exposure)
+        if total == 0:
+            return np.zeros(shield_mfp.shape[2])
+        return np.einsum('ep,eps->s', self.point_uncollided_exposure,
+                         shield_mfp) / total
+
+    def to_point_cloud(self) -> "pyvista.PolyData":
+        """Returns the source point contributions as a pyvista point cloud.
+
+        The point cloud includes the total and uncollided exposure from
+        each source point, summed over photon energies, along with the
+        quadrature weight of each point.  If mean free paths were
+        calculated, the exposure-weighted mean free path through each
+        shield is included as well.
+
+        Raises
+        ------
+        ImportError
+            pyvista is not installed
+        ValueError
+            Source point contributions were not calculated
+
+        Returns
+        -------
+            Point cloud located at the source points.
+        """
+        if not pyvista_found:
+            raise ImportError("pyvista is required to create a point cloud")
+        if self.point_exposure is None or self.source_points is None:
+            raise ValueError("Source point contributions were not calculated")
+        cloud = pyvista.PolyData(np.asarray(self.source_points, dtype=float))
+        cloud.point_data['exposure'] = self.point_contributions()
+        cloud.point_data['uncollided_exposure'] = \
+            np.sum(self.point_uncollided_exposure, axis=0)
+        cloud.point_data['weight'] = self.source_point_weights
+        shield_mfp = self.shield_mfp
+        if shield_mfp is not None:
+            energy_weights = self.point_uncollided_exposure
+            totals = np.sum(energy_weights, axis=0)
+            totals[totals == 0] = 1
+            for index in range(shield_mfp.shape[2]):
+                cloud.point_data[f'shield_{index}_mfp'] = \
+                    np.sum(energy_weights * shield_mfp[:, :, index],
+                           axis=0) / totals
+        return cloud
+
+    def to_list(self) -> List[List[float]]:
+        """Returns the results as a list of lists.
+
+        Returns
+        -------
+            List, by photon energy, of photon energy, photon emission rate,
+            uncollided energy flux, uncollided exposure, and total exposure.
+            This is the format returned by
+            :meth:`zapmenot.model.Model.generate_summary`.
+        """
+        return np.column_stack(
+            [self.energies, self.yields, self.uncollided_flux,
+             self.uncollided_exposure, self.exposure]).tolist()
+
+    def to_dataframe(self) -> "pandas.DataFrame":
+        """Returns the results as a pandas DataFrame.
+
+        The DataFrame columns share memory with the result arrays
+        where pandas permits.
+
+        Raises
+        ------
+        ImportError
+            pandas is not installed
+
+        Returns
+        -------
+            DataFrame with one row per photon energy.
+        """
+        if not pandas_found:
+            raise ImportError("pandas is required to create a DataFrame")
+        arrays = [self.energies, self.yields, self.uncollided_flux,
+                  self.uncollided_exposure, self.exposure]
+        return pandas.DataFrame(dict(zip(Results.COLUMNS, arrays)),
+                                copy=False)
+
+    def save(self, file: Union[str, os.PathLike, io.IOBase]) -> None:
+        """Saves the results to a NumPy .npz file.
+
+        Parameters
+        ----------
+        file
+            The file name, path, or binary file object.
+        """
+        arrays = {name: value for name, value in vars(self).items()
+                  if value is not None}
+        np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, file: Union[str, os.PathLike, io.IOBase]) -> "Results":
+        """Loads results from a NumPy .npz file written by :meth:`save`.
+
+        Parameters
+        ----------
+        file
+            The file name, path, or binary file object.
+
+        Returns
+        -------
+            The saved results.
+        """
+        with np.load(file) as data:
+            arrays = {name: data[name] for name in data.files}
+        return cls(**arrays)
+
+    def to_bytes(self) -> bytes:
+        """Returns the results in the NumPy .npz format used by
+        :meth:`save`.
+
+        Returns
+        -------
+            The saved results.
+        """
+        stream = io.BytesIO()
+        self.save(stream)
+        return stream.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Results":
+        """Loads results written by :meth:`to_bytes`.
+
+        Parameters
+        ----------
+        data
+            The saved results.
+
+        Returns
+        -------
+            The saved results.
+        """
+        return cls.load(io.BytesIO(data))
+
+
+class Gradient:
+    r"""Derivatives of the total exposure with respect to the model
+    parameters, as calculated by
+    :meth:`zapmenot.model.Model.calculate_gradient`.
+
+    Parameters
+    ----------
+    exposure
+        The total exposure in mR/hr.
+    shield_densities
+        Derivatives with respect to the density of each shield, in the
+        order of :attr:`zapmenot.model.Model.shield_list`, in mR/hr per
+        g/cm\ :sup:`3`.  A volume source is in the list at the position
+        at which it was added to the model.
+    filler_density
+        Derivative with respect to the filler density in mR/hr per
+        g/cm\ :sup:`3`, or None if the model has no filler material.
+    activities
+        Derivatives with respect to the activity of each isotope, keyed by
+        isotope name, in mR/hr per Bq, and with respect to the intensity
+        of each individually added photon, keyed by photon energy, in
+        mR/hr per photon/sec.
+    detector_location
+        Derivatives with respect to the X, Y, and Z coordinates of the
+        detector in mR/hr/cm.
+    """
+
+    def __init__(self, exposure: float, shield_densities: np.ndarray,
+                 filler_density: Optional[float],
+                 activities: Dict[Union[str, float], float],
+                 detector_location: np.ndarray) -> None:
+        self.exposure: float = exposure
+        self.shield_densities: np.ndarray = shield_densities
+        self.filler_density: Optional[float] = filler_density
+        self.activities: Dict[Union[str, float], float] = activities
+        self.detector_location: np.ndarray = detector_location
+
+    def __repr__(self) -> str:
+        return (f'Gradient(exposure={self.exposure!r}, '
+                f'shield_densities={self.shield_densities!r}, '
+                f'filler_density={self.filler_density!r}, '
+                f'activities={self.activities!r}, '
+                f'detector_location={self.detector_location!r})')
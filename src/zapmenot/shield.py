@@ -2,7 +2,7 @@ import abc
 import math
 import numbers
 import copy
-from typing import Optional, List, Tuple
+from typing import Any, Callable, Dict, Optional, List, Sequence, Tuple
 
 import numpy as np
 
@@ -39,6 +39,9 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 class Shield(abc.ABC):
     """Abtract class to model a photon shield.
     """
+    # tolerance on the dot product of unit vectors when checking whether
+    # a direction lies in or is normal to a plane of symmetry
+    _PARALLEL_TOLERANCE = 1E-9
 
     def __init__(self, material_name: Optional[str] = None,
                  density: Optional[float] = None) -> None:
@@ -78,6 +81,29 @@ class Shield(abc.ABC):
             raise ValueError("Invalid ray object")
         return 0.0
 
+    def _get_crossing_lengths(self, starts: np.ndarray,
+                              end: np.ndarray) -> np.ndarray:
+        """Calculates the intersection lengths of the shield and a set of
+        rays that share an end point
+
+        Shields that can intersect all of the rays at once override this
+        method.  The default tests each ray in turn.
+
+        Parameters
+        ----------
+        starts
+            Ray starting points, indexed by ray and coordinate.
+        end
+            The end point shared by all rays.
+
+        Returns
+        -------
+            Crossing lengths, one per ray.
+        """
+        return np.array([self._get_crossing_length(
+            ray.FiniteLengthRay(start, end)) for start in starts],
+            dtype=float)
+
     @abc.abstractmethod
     def get_crossing_mfp(self, a_ray: ray.FiniteLengthRay,
                          photon_energy: float) -> float:
@@ -97,16 +123,143 @@ class Shield(abc.ABC):
             raise ValueError("Invalid photon energy")
         return 0.0
 
+    def _is_mirror_symmetric(self, point: np.ndarray, normal: np.ndarray,
+                             tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a reflection across
+        a plane
+
+        Shields that do not override this method are never treated as
+        symmetric, so models containing them are evaluated in full.
+
+        Parameters
+        ----------
+        point
+            A point on the plane.
+        normal
+            Unit vector normal to the plane.
+        tolerance
+            Distance within which a point is taken to lie on the plane.
+        """
+        return False
+
+    def _mirror_normal(self, location: np.ndarray) -> Optional[np.ndarray]:
+        """Returns the normal of the plane containing the shield axis and
+        a location, or None if the shield has no axis
+
+        Parameters
+        ----------
+        location
+            The location, typically the detector.
+        """
+        return None
+
+    def _axis(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Returns a point on the shield axis and the unit vector along
+        the axis, or None if the shield has no axis"""
+        return None
+
+    def _is_axisymmetric(self, origin: np.ndarray, axis: np.ndarray,
+                         tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a rotation about
+        an axis
+
+        Shields that do not override this method are never treated as
+        symmetric.
+
+        Parameters
+        ----------
+        origin
+            A point on the axis.
+        axis
+            Unit vector along the axis.
+        tolerance
+            Distance within which a point is taken to lie on the axis.
+        """
+        return False
+
     @abc.abstractmethod
-    def draw(self) -> pyvista.PolyData | None:
+    def draw(self, resolution: Optional[int] = None) \
+            -> pyvista.PolyData | None:
         """Creates a display object
 
+        Parameters
+        ----------
+        resolution
+            The number of segments around curved surfaces.  If None, the
+            pyvista default for the shape is used.
+
         Returns
         -------
             A display object representing the shield.
         """
         pass
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        # any change to the shield invalidates its display meshes
+        self.__dict__.pop('_meshes', None)
+        super().__setattr__(name, value)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # display meshes are not copied with the shield
+        state = self.__dict__.copy()
+        state.pop('_meshes', None)
+        return state
+
+    def _cached(self, key: Tuple, create: Callable[[], Any],
+                state: Tuple = ()) -> Any:
+        """Returns a display mesh, creating it only if the shield or the
+        state it was created for has changed since it was last created.
+
+        Only the latest mesh is kept for each key.  The mesh is shared
+        between calls and must not be modified.
+
+        Parameters
+        ----------
+        key
+            Identifies the mesh among those of the shield.
+        create
+            Function that creates the mesh.
+        state
+            Values, such as display bounds, that determine the mesh.
+        """
+        meshes = self.__dict__.get('_meshes')
+        if meshes is None:
+            # stored directly so that the cache is not cleared
+            meshes = self.__dict__['_meshes'] = {}
+        state = state + (self._mesh_key(),)
+        entry = meshes.get(key)
+        if entry is None or entry[0] != state:
+            entry = meshes[key] = (state, create())
+        return entry[1]
+
+    def _mesh(self, resolution: Optional[int] = None) \
+            -> pyvista.PolyData | None:
+        """Returns the display mesh of the shield, reusing the mesh of an
+        earlier call if the shield has not changed.
+
+        Parameters
+        ----------
+        resolution
+            The number of segments around curved surfaces.
+        """
+        return self._cached(('draw', resolution),
+                            lambda: self.draw(resolution))
+
+    def _mesh_key(self) -> Tuple:
+        """Returns values, beyond the attributes of the shield itself, that
+        determine its display mesh."""
+        return ()
+
+    def _bounds(self) -> Optional[Tuple[float, ...]]:
+        """Returns the extent of the shield.
+
+        Returns
+        -------
+            xmin, xmax, ymin, ymax, zmin, zmax, or None if the extent is
+            not known without building the display mesh.
+        """
+        return None
+
     @staticmethod
     def _line_plane_collision(plane_normal: np.ndarray,
                               plane_point: np.ndarray,
@@ -141,6 +294,116 @@ class Shield(abc.ABC):
         t = w.dot(plane_normal)/ndotu
         return t
 
+    @staticmethod
+    def _ray_arrays(starts: np.ndarray, end: np.ndarray) \
+            -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the origins, unit directions, and lengths of a set of
+        rays that share an end point
+
+        Parameters
+        ----------
+        starts
+            Ray starting points, indexed by ray and coordinate.
+        end
+            The end point shared by all rays.
+        """
+        origins = np.asarray(starts, dtype=float).reshape(-1, 3)
+        delta = np.asarray(end, dtype=float) - origins
+        lengths = np.linalg.norm(delta, axis=1)
+        # direction doesn't matter if the length is zero
+        units = delta / np.where(lengths > 0, lengths, 1)[:, np.newaxis]
+        return origins, units, lengths
+
+    @staticmethod
+    def _on_plane(position: np.ndarray, point: np.ndarray,
+                  normal: np.ndarray, tolerance: float) -> bool:
+        """Returns true if a position lies on a plane
+
+        Parameters
+        ----------
+        position
+            The position to be checked.
+        point
+            A point on the plane.
+        normal
+            Unit vector normal to the plane.
+        tolerance
+            Distance within which the position is taken to lie on the plane.
+        """
+        return bool(abs(np.dot(np.asarray(position, dtype=float) - point,
+                               normal)) <= tolerance)
+
+    @staticmethod
+    def _on_axis(position: np.ndarray, origin: np.ndarray,
+                 axis: np.ndarray, tolerance: float) -> bool:
+        """Returns true if a position lies on an axis
+
+        Parameters
+        ----------
+        position
+            The position to be checked.
+        origin
+            A point on the axis.
+        axis
+            Unit vector along the axis.
+        tolerance
+            Distance within which the position is taken to lie on the axis.
+        """
+        offset = np.asarray(position, dtype=float) - origin
+        return bool(np.linalg.norm(offset - np.dot(offset, axis) * axis)
+                    <= tolerance)
+
+    @staticmethod
+    def _axis_plane_normal(origin: np.ndarray, axis: np.ndarray,
+                           location: np.ndarray) -> Optional[np.ndarray]:
+        """Returns the unit normal of the plane containing an axis and a
+        location, or None if the location is on the axis
+
+        Parameters
+        ----------
+        origin
+            A point on the axis.
+        axis
+            Unit vector along the axis.
+        location
+            The location.
+        """
+        normal = np.cross(axis, np.asarray(location, dtype=float) - origin)
+        size = np.linalg.norm(normal)
+        if size == 0:
+            return None
+        return normal / size
+
+    @staticmethod
+    def _sphere_chords(origins: np.ndarray, units: np.ndarray,
+                       lengths: np.ndarray, center: np.ndarray,
+                       radius: float) -> np.ndarray:
+        """Returns the lengths of a set of rays within a sphere
+
+        Parameters
+        ----------
+        origins
+            Ray origins, indexed by ray and coordinate.
+        units
+            Ray unit directions, indexed by ray and coordinate.
+        lengths
+            Ray lengths.
+        center
+            Vector location of the center of the sphere.
+        radius
+            Radius of the sphere.
+        """
+        offsets = origins - np.asarray(center, dtype=float)
+        b = 2 * np.sum(units * offsets, axis=1)
+        c = np.sum(offsets * offsets, axis=1) - radius**2
+        discriminant = b**2 - 4*c
+        crossing = discriminant > 0
+        root = np.sqrt(np.where(crossing, discriminant, 0))
+        t0 = (-b - root)/2
+        t1 = (-b + root)/2
+        chords = np.minimum(t1, lengths) - np.maximum(t0, 0)
+        return np.where(crossing, np.clip(chords, 0, None), 0)
+
     @staticmethod
     def _ray_sphere_intersection(ray: ray.FiniteLengthRay,
                                  sphere: "Sphere") -> float:
@@ -187,6 +450,41 @@ class SemiInfiniteShield(Shield):
         # so return two x values at the specified y and z
         pass
 
+    def _trimmed_mesh(self, bounds: Sequence[float],
+                      resolution: Optional[int] = None) \
+            -> pyvista.PolyData | None:
+        """Returns the display mesh of the shield trimmed to a bounding
+        box, reusing the mesh of an earlier call if the shield has not
+        changed.
+
+        Parameters
+        ----------
+        bounds
+            The bounding box: xmin, xmax, ymin, ymax, zmin, zmax.
+        resolution
+            The number of segments around curved surfaces.
+        """
+        # a moving display replaces the mesh rather than adding to it
+        return self._cached(('trim', resolution),
+                            lambda: self._draw_trimmed(bounds, resolution),
+                            tuple(float(value) for value in bounds))
+
+    def _draw_trimmed(self, bounds: Sequence[float],
+                      resolution: Optional[int]) -> pyvista.PolyData | None:
+        """Creates a display object trimmed to a bounding box.
+
+        Parameters
+        ----------
+        bounds
+            The bounding box: xmin, xmax, ymin, ymax, zmin, zmax.
+        resolution
+            The number of segments around curved surfaces.
+        """
+        mesh = self.draw(resolution)
+        if mesh is None:
+            return None
+        return _clip_to_bounds(mesh, bounds)
+
 
 class SemiInfiniteXSlab(SemiInfiniteShield):
     """A semi-infinite slab shield perpendicular to the X axis.
@@ -264,6 +562,34 @@ class SemiInfiniteXSlab(SemiInfiniteShield):
         # we are left with a full crossing
         return t1 - t0
 
+    def _get_crossing_lengths(self, starts: np.ndarray,
+                              end: np.ndarray) -> np.ndarray:
+        """Calculates the intersection lengths of the shield and a set of
+        rays that share an end point
+
+        Parameters
+        ----------
+        starts
+            Ray starting points, indexed by ray and coordinate.
+        end
+            The end point shared by all rays.
+
+        Returns
+        -------
+            Crossing lengths, one per ray.
+        """
+        origins, units, lengths = self._ray_arrays(starts, end)
+        end = np.asarray(end, dtype=float)
+        ray_low = np.minimum(origins[:, 0], end[0])
+        ray_high = np.maximum(origins[:, 0], end[0])
+        overlap = np.clip(
+            np.minimum(ray_high, max(self.x_start, self.x_end)) -
+            np.maximum(ray_low, min(self.x_start, self.x_end)), 0, None)
+        # rays parallel to the slab faces do not cross the slab
+        cosine = np.abs(units[:, 0])
+        return np.where(cosine >= 1e-6,
+                        overlap / np.where(cosine >= 1e-6, cosine, 1), 0)
+
     def get_crossing_mfp(self, ray: ray.FiniteLengthRay,
                          photon_energy: float) -> float:
         """Calculates the mfp equivalent if a ray intersects the shield
@@ -281,9 +607,104 @@ class SemiInfiniteXSlab(SemiInfiniteShield):
         distance = self._get_crossing_length(ray)
         return self.material.get_mfp(photon_energy, distance)
 
-    def draw(self) -> pyvista.PolyData | None:
+    def _get_thickness_crossing_lengths(self, starts: np.ndarray,
+                                        end: np.ndarray,
+                                        thicknesses: np.ndarray,
+                                        derivatives: bool = False) \
+            -> np.ndarray | Tuple[np.ndarray, np.ndarray]:
+        """Calculates ray crossing lengths for a range of slab thicknesses
+
+        The inner edge of the slab (x_start) is held fixed while the
+        outer edge is placed at each thickness from the inner edge.  The
+        crossing length of a ray is the overlap of the ray and the slab
+        along the X axis divided by the cosine of the angle between the
+        ray and the X axis, so a single set of rays serves every thickness.
+
+        Parameters
+        ----------
+        starts
+            Ray starting points, indexed by ray and coordinate.
+        end
+            The end point shared by all rays.
+        thicknesses
+            The slab thicknesses.
+        derivatives
+            If True, the derivatives of the crossing lengths with respect
+            to thickness are also returned.
+
+        Returns
+        -------
+            Crossing lengths, indexed by thickness and ray, and optionally
+            their derivatives with respect to thickness.
+        """
+        starts = np.asarray(starts, dtype=float)
+        end = np.asarray(end, dtype=float)
+        thicknesses = np.asarray(thicknesses, dtype=float)
+        delta = end - starts
+        lengths = np.linalg.norm(delta, axis=1)
+        ray_low = np.minimum(starts[:, 0], end[0])
+        ray_high = np.maximum(starts[:, 0], end[0])
+        direction = 1.0 if self.x_end >= self.x_start else -1.0
+        faces = (self.x_start + direction*thicknesses)[:, np.newaxis]
+        slab_low = np.minimum(self.x_start, faces)
+        slab_high = np.maximum(self.x_start, faces)
+        overlap = np.clip(np.minimum(ray_high, slab_high) -
+                          np.maximum(ray_low, slab_low), 0, None)
+        # rays parallel to the slab faces do not cross the slab
+        # (consistent with _get_crossing_length)
+        cosine = np.abs(delta[:, 0]) / np.where(lengths > 0, lengths, 1)
+        secant = np.where(cosine >= 1e-6,
+                          1/np.where(cosine >= 1e-6, cosine, 1), 0)
+        if not derivatives:
+            return overlap * secant
+        # the crossing length grows with thickness only while the
+        # outer face lies within the X range of the ray
+        moving = (faces > ray_low) & (faces < ray_high)
+        return overlap * secant, moving * secant
+
+    def _is_mirror_symmetric(self, point: np.ndarray, normal: np.ndarray,
+                             tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a reflection across
+        a plane
+
+        Parameters
+        ----------
+        point
+            A point on the plane.
+        normal
+            Unit vector normal to the plane.
+        tolerance
+            Distance within which a point is taken to lie on the plane.
+        """
+        # any plane parallel to the X axis
+        return abs(normal[0]) < Shield._PARALLEL_TOLERANCE
+
+    def _is_axisymmetric(self, origin: np.ndarray, axis: np.ndarray,
+                         tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a rotation about
+        an axis
+
+        Parameters
+        ----------
+        origin
+            A point on the axis.
+        axis
+            Unit vector along the axis.
+        tolerance
+            Distance within which a point is taken to lie on the axis.
+        """
+        # any axis parallel to the X axis
+        return abs(axis[0]) > 1 - Shield._PARALLEL_TOLERANCE
+
+    def draw(self, resolution: Optional[int] = None) \
+            -> pyvista.PolyData | None:
         """Creates a display object
 
+        Parameters
+        ----------
+        resolution
+            The number of segments around curved surfaces.
+
         Returns
         -------
             A display object representing the shield.
@@ -293,6 +714,27 @@ class SemiInfiniteXSlab(SemiInfiniteShield):
                                        -1000, 1000))
         return None
 
+    def _draw_trimmed(self, bounds: Sequence[float],
+                      resolution: Optional[int]) -> pyvista.PolyData | None:
+        """Creates a display object trimmed to a bounding box.
+
+        Parameters
+        ----------
+        bounds
+            The bounding box: xmin, xmax, ymin, ymax, zmin, zmax.
+        resolution
+            The number of segments around curved surfaces.
+        """
+        if pyvista_found:
+            # the slab is a box, so no clipping is needed
+            low = max(min(self.x_start, self.x_end), bounds[0])
+            high = min(max(self.x_start, self.x_end), bounds[1])
+            if low >= high:
+                # the slab lies outside the bounds
+                return None
+            return pyvista.Box(bounds=(low, high, *bounds[2:]))
+        return None
+
     def _projection(self, x: float, y: float,
                     z: float) -> List[Tuple[float, float, float]]:
         # project a point onto the surface of the infinite shield
@@ -366,6 +808,12 @@ class Sphere(Shield):
     def _get_crossing_length(self, ray: ray.FiniteLengthRay) -> float:
         return self._ray_sphere_intersection(ray, self)
 
+    def _get_crossing_lengths(self, starts: np.ndarray,
+                              end: np.ndarray) -> np.ndarray:
+        origins, units, lengths = self._ray_arrays(starts, end)
+        return self._sphere_chords(origins, units, lengths, self.center,
+                                   self.radius)
+
     def _contains(self, point: np.ndarray) -> bool:
         """Determines if the shield contains a point
 
@@ -383,18 +831,73 @@ class Sphere(Shield):
             return False
         return True
 
-    def draw(self) -> pyvista.PolyData | None:
+    def _is_mirror_symmetric(self, point: np.ndarray, normal: np.ndarray,
+                             tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a reflection across
+        a plane
+
+        Parameters
+        ----------
+        point
+            A point on the plane.
+        normal
+            Unit vector normal to the plane.
+        tolerance
+            Distance within which a point is taken to lie on the plane.
+        """
+        return Shield._on_plane(np.asarray(self.center), point, normal,
+                                tolerance)
+
+    def _is_axisymmetric(self, origin: np.ndarray, axis: np.ndarray,
+                         tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a rotation about
+        an axis
+
+        Parameters
+        ----------
+        origin
+            A point on the axis.
+        axis
+            Unit vector along the axis.
+        tolerance
+            Distance within which a point is taken to lie on the axis.
+        """
+        return Shield._on_axis(np.asarray(self.center), origin, axis,
+                               tolerance)
+
+    def draw(self, resolution: Optional[int] = None) \
+            -> pyvista.PolyData | None:
         """Creates a display object
 
+        Parameters
+        ----------
+        resolution
+            The number of segments around curved surfaces.
+
         Returns
         -------
             A display object representing the shield.
         """
         if pyvista_found:
+            if resolution is None:
+                return pyvista.Sphere(radius=float(self.radius),
+                                      center=self.center)
             return pyvista.Sphere(radius=float(self.radius),
-                                  center=self.center)
+                                  center=self.center,
+                                  theta_resolution=resolution,
+                                  phi_resolution=resolution)
         return None
 
+    def _bounds(self) -> Optional[Tuple[float, ...]]:
+        """Returns the extent of the shield.
+
+        Returns
+        -------
+            xmin, xmax, ymin, ymax, zmin, zmax.
+        """
+        return tuple(float(self.center[axis] + sign * self.radius)
+                     for axis in range(3) for sign in (-1, 1))
+
 # -----------------------------------------------------------
 
 
@@ -476,6 +979,18 @@ class Shell(Shield):
             crossing_length = 0
         return crossing_length
 
+    def _get_crossing_lengths(self, starts: np.ndarray,
+                              end: np.ndarray) -> np.ndarray:
+        origins, units, lengths = self._ray_arrays(starts, end)
+        crossing_lengths = \
+            self._sphere_chords(origins, units, lengths,
+                                self.outer_sphere.center,
+                                self.outer_sphere.radius) - \
+            self._sphere_chords(origins, units, lengths,
+                                self.inner_sphere.center,
+                                self.inner_sphere.radius)
+        return np.clip(crossing_lengths, 0, None)
+
     def _contains(self, point: np.ndarray) -> bool:
         '''
         Returns true if the point is contained within the shell,
@@ -487,22 +1002,81 @@ class Shell(Shield):
         else:
             return False
 
-    def draw(self) -> pyvista.PolyData | None:
+    def _is_mirror_symmetric(self, point: np.ndarray, normal: np.ndarray,
+                             tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a reflection across
+        a plane
+
+        Parameters
+        ----------
+        point
+            A point on the plane.
+        normal
+            Unit vector normal to the plane.
+        tolerance
+            Distance within which a point is taken to lie on the plane.
+        """
+        return Shield._on_plane(np.asarray(self.inner_sphere.center),
+                                point, normal, tolerance) and \
+            Shield._on_plane(np.asarray(self.outer_sphere.center),
+                             point, normal, tolerance)
+
+    def _is_axisymmetric(self, origin: np.ndarray, axis: np.ndarray,
+                         tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a rotation about
+        an axis
+
+        Parameters
+        ----------
+        origin
+            A point on the axis.
+        axis
+            Unit vector along the axis.
+        tolerance
+            Distance within which a point is taken to lie on the axis.
+        """
+        return Shield._on_axis(np.asarray(self.inner_sphere.center), origin,
+                               axis, tolerance) and \
+            Shield._on_axis(np.asarray(self.outer_sphere.center), origin,
+                            axis, tolerance)
+
+    def draw(self, resolution: Optional[int] = None) \
+            -> pyvista.PolyData | None:
         """Creates a display object
 
+        Parameters
+        ----------
+        resolution
+            The number of segments around curved surfaces.
+
         Returns
         -------
             A display object representing the shield.
         """
         if pyvista_found:
-            sphere_a = pyvista.Sphere(radius=float(self.outer_sphere.radius),
-                                      center=self.outer_sphere.center)
-            sphere_b = pyvista.Sphere(radius=float(self.inner_sphere.radius),
-                                      center=self.inner_sphere.center)
+            sphere_a = self.outer_sphere.draw(resolution)
+            sphere_b = self.inner_sphere.draw(resolution)
             sphere_b.flip_faces(inplace=True)
             shell = sphere_a.merge(sphere_b)
             return shell
         return None
+
+    def _mesh_key(self) -> Tuple:
+        """Returns values, beyond the attributes of the shield itself, that
+        determine its display mesh."""
+        # the spheres can be changed without changing the shell
+        return tuple(float(value) for sphere in (self.inner_sphere,
+                                                 self.outer_sphere)
+                     for value in (*sphere.center, sphere.radius))
+
+    def _bounds(self) -> Optional[Tuple[float, ...]]:
+        """Returns the extent of the shield.
+
+        Returns
+        -------
+            xmin, xmax, ymin, ymax, zmin, zmax.
+        """
+        return self.outer_sphere._bounds()
 # -----------------------------------------------------------
 
 
@@ -568,9 +1142,35 @@ class Box(Shield):
         distance = self._get_crossing_length(ray)
         return self.material.get_mfp(photon_energy, distance)
 
-    def draw(self) -> pyvista.PolyData | None:
+    def _is_mirror_symmetric(self, point: np.ndarray, normal: np.ndarray,
+                             tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a reflection across
+        a plane
+
+        Parameters
+        ----------
+        point
+            A point on the plane.
+        normal
+            Unit vector normal to the plane.
+        tolerance
+            Distance within which a point is taken to lie on the plane.
+        """
+        # the box is axis aligned, so only planes normal to an axis
+        # through the box center are planes of symmetry
+        if np.amax(np.abs(normal)) < 1 - Shield._PARALLEL_TOLERANCE:
+            return False
+        return Shield._on_plane(self.box_center, point, normal, tolerance)
+
+    def draw(self, resolution: Optional[int] = None) \
+            -> pyvista.PolyData | None:
         """Creates a display object
 
+        Parameters
+        ----------
+        resolution
+            The number of segments around curved surfaces.
+
         Returns
         -------
             A display object representing the shield.
@@ -585,6 +1185,17 @@ class Box(Shield):
             return pyvista.Box(bounds=(xmin, xmax, ymin, ymax, zmin, zmax))
         return None
 
+    def _bounds(self) -> Optional[Tuple[float, ...]]:
+        """Returns the extent of the shield.
+
+        Returns
+        -------
+            xmin, xmax, ymin, ymax, zmin, zmax.
+        """
+        return tuple(float(self.box_center[axis] +
+                           sign * self.box_dimensions[axis] / 2)
+                     for axis in range(3) for sign in (-1, 1))
+
     def _get_crossing_length(self, ray: ray.FiniteLengthRay) -> float:
         """Calculates the linear intersection length of a ray and the shield
 
@@ -618,6 +1229,41 @@ class Box(Shield):
         # let numpy do the heavy lifting
         return float(np.linalg.norm(crossings[0]-crossings[1]))
 
+    def _get_crossing_lengths(self, starts: np.ndarray,
+                              end: np.ndarray) -> np.ndarray:
+        """Calculates the intersection lengths of the shield and a set of
+        rays that share an end point
+
+        Parameters
+        ----------
+        starts
+            Ray starting points, indexed by ray and coordinate.
+        end
+            The end point shared by all rays.
+
+        Returns
+        -------
+            Crossing lengths, one per ray.
+        """
+        origins, units, lengths = self._ray_arrays(starts, end)
+        lower = np.asarray(self.box_center, dtype=float) - \
+            np.asarray(self.box_dimensions, dtype=float)/2
+        upper = np.asarray(self.box_center, dtype=float) + \
+            np.asarray(self.box_dimensions, dtype=float)/2
+        parallel = units == 0
+        safe_units = np.where(parallel, 1, units)
+        t_lower = (lower - origins)/safe_units
+        t_upper = (upper - origins)/safe_units
+        # rays parallel to a pair of faces either lie between the faces
+        # or miss the box
+        between = (origins >= lower) & (origins <= upper)
+        near = np.where(parallel, np.where(between, -np.inf, np.inf),
+                        np.minimum(t_lower, t_upper))
+        far = np.where(parallel, np.where(between, np.inf, -np.inf),
+                       np.maximum(t_lower, t_upper))
+        return np.clip(np.minimum(np.amin(far, axis=1), lengths) -
+                       np.maximum(np.amax(near, axis=1), 0), 0, None)
+
     def _contains(self, point: np.ndarray) -> bool:
         """Determines if the shield contains a point
 
@@ -807,6 +1453,26 @@ class InfiniteAnnulus(SemiInfiniteShield):
         # let numpy do the heavy lifting
         return (crossings[1]-crossings[0]) + (crossings[3] - crossings[2])
 
+    def _get_crossing_lengths(self, starts: np.ndarray,
+                              end: np.ndarray) -> np.ndarray:
+        """Calculates the intersection lengths of the shield and a set of
+        rays that share an end point
+
+        Parameters
+        ----------
+        starts
+            Ray starting points, indexed by ray and coordinate.
+        end
+            The end point shared by all rays.
+
+        Returns
+        -------
+            Crossing lengths, one per ray.
+        """
+        chords, _ = self._chord_lengths(
+            starts, end, np.array([self.inner_radius, self.outer_radius]))
+        return np.clip(chords[1] - chords[0], 0, None)
+
     def _contains(self, point: np.ndarray) -> bool:
         """Determines if the shield contains a point
 
@@ -872,9 +1538,156 @@ class InfiniteAnnulus(SemiInfiniteShield):
                                if t >= 0 and t <= ray._length)
         return results
 
-    def draw(self) -> pyvista.PolyData | None:
+    def _get_thickness_crossing_lengths(self, starts: np.ndarray,
+                                        end: np.ndarray,
+                                        thicknesses: np.ndarray,
+                                        derivatives: bool = False) \
+            -> np.ndarray | Tuple[np.ndarray, np.ndarray]:
+        """Calculates ray crossing lengths for a range of annulus thicknesses
+
+        The inner radius of the annulus is held fixed while the outer
+        radius is placed at each thickness from the inner radius.  The
+        crossing length of a ray is the chord of the ray through the outer
+        cylinder less the chord through the inner cylinder.
+
+        Parameters
+        ----------
+        starts
+            Ray starting points, indexed by ray and coordinate.
+        end
+            The end point shared by all rays.
+        thicknesses
+            The annulus thicknesses.
+        derivatives
+            If True, the derivatives of the crossing lengths with respect
+            to thickness are also returned.
+
+        Returns
+        -------
+            Crossing lengths, indexed by thickness and ray, and optionally
+            their derivatives with respect to thickness.
+        """
+        radii = self.inner_radius + np.asarray(thicknesses, dtype=float)
+        outer, slopes = self._chord_lengths(starts, end, radii)
+        inner, _ = self._chord_lengths(starts, end,
+                                       np.array([self.inner_radius]))
+        if not derivatives:
+            return outer - inner
+        return outer - inner, slopes
+
+    def _chord_lengths(self, starts: np.ndarray, end: np.ndarray,
+                       radii: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculates the length of each ray within a range of radii
+        of the annulus axis.
+
+        Parameters
+        ----------
+        starts
+            Ray starting points, indexed by ray and coordinate.
+        end
+            The end point shared by all rays.
+        radii
+            Distances from the annulus axis.
+
+        Returns
+        -------
+            Chord lengths and their derivatives with respect to radius,
+            indexed by radius and ray.
+        """
+        starts = np.asarray(starts, dtype=float)
+        delta = np.asarray(end, dtype=float) - starts
+        lengths = np.linalg.norm(delta, axis=1)
+        unit = delta / np.where(lengths > 0, lengths, 1)[:, np.newaxis]
+        deltap = starts - self.origin
+        radii = np.asarray(radii, dtype=float)[:, np.newaxis]
+        # components perpendicular to the annulus axis
+        part1 = unit - np.outer(unit @ self.dir, self.dir)
+        part2 = deltap - np.outer(deltap @ self.dir, self.dir)
+        a = np.sum(part1*part1, axis=1)
+        b = 2*np.sum(part1*part2, axis=1)
+        c = np.sum(part2*part2, axis=1) - radii**2
+        parallel = a < 1e-12
+        safe_a = np.where(parallel, 1, a)
+        discriminant = b**2 - 4*safe_a*c
+        crossing = ~parallel & (discriminant > 0)
+        root = np.sqrt(np.where(crossing, discriminant, 1))
+        t1 = (-b - root)/(2*safe_a)
+        t2 = (-b + root)/(2*safe_a)
+        chords = np.clip(np.minimum(t2, lengths) - np.maximum(t1, 0), 0, None)
+        # each intersection inside the ray moves by 2R/root per unit radius
+        slopes = 2*radii/root * (((t2 < lengths) & (t2 > 0)).astype(float) +
+                                 ((t1 > 0) & (t1 < lengths)).astype(float))
+        slopes = np.where(crossing & (chords > 0), slopes, 0)
+        # rays parallel to the axis are either entirely inside or
+        # entirely outside the radius
+        chords = np.where(crossing, chords,
+                          np.where(parallel & (c <= 0), lengths, 0))
+        return chords, slopes
+
+    def _is_mirror_symmetric(self, point: np.ndarray, normal: np.ndarray,
+                             tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a reflection across
+        a plane
+
+        Parameters
+        ----------
+        point
+            A point on the plane.
+        normal
+            Unit vector normal to the plane.
+        tolerance
+            Distance within which a point is taken to lie on the plane.
+        """
+        if abs(np.dot(self.dir, normal)) < Shield._PARALLEL_TOLERANCE:
+            # the axis lies in the plane
+            return Shield._on_plane(self.origin, point, normal, tolerance)
+        # an infinite annulus is unchanged by any plane normal to the axis
+        return abs(np.dot(self.dir, normal)) > \
+            1 - Shield._PARALLEL_TOLERANCE
+
+    def _mirror_normal(self, location: np.ndarray) -> Optional[np.ndarray]:
+        """Returns the normal of the plane containing the shield axis and
+        a location, or None if the location is on the axis
+
+        Parameters
+        ----------
+        location
+            The location, typically the detector.
+        """
+        return Shield._axis_plane_normal(self.origin, self.dir, location)
+
+    def _axis(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Returns a point on the shield axis and the unit vector along
+        the axis"""
+        return self.origin, self.dir
+
+    def _is_axisymmetric(self, origin: np.ndarray, axis: np.ndarray,
+                         tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a rotation about
+        an axis
+
+        Parameters
+        ----------
+        origin
+            A point on the axis.
+        axis
+            Unit vector along the axis.
+        tolerance
+            Distance within which a point is taken to lie on the axis.
+        """
+        return abs(np.dot(self.dir, axis)) > \
+            1 - Shield._PARALLEL_TOLERANCE and \
+            Shield._on_axis(self.origin, origin, axis, tolerance)
+
+    def draw(self, resolution: Optional[int] = None) \
+            -> pyvista.PolyData | None:
         """Creates a display object
 
+        Parameters
+        ----------
+        resolution
+            The number of segments around curved surfaces.
+
         Returns
         -------
             A display object representing the shield.
@@ -882,15 +1695,48 @@ class InfiniteAnnulus(SemiInfiniteShield):
         if pyvista_found:
             # define an imaginary bottom of the shield at a distance
             # of -2000 from the origin
-            bottom = self.dir*(-2000.)
+            bottom = self.origin + self.dir*(-2000.)
             disc = pyvista.Disc(center=(bottom[0], bottom[1], bottom[2]),
                                 normal=self.dir,
                                 inner=self.inner_radius,
-                                outer=self.outer_radius, c_res=50)
+                                outer=self.outer_radius,
+                                c_res=50 if resolution is None
+                                else resolution)
             cyl1 = disc.extrude(self.dir*4000, capping=True)
             return cyl1
         return None
 
+    def _draw_trimmed(self, bounds: Sequence[float],
+                      resolution: Optional[int]) -> pyvista.PolyData | None:
+        """Creates a display object trimmed to a bounding box.
+
+        The annulus is extruded only across the box, so that it needs to
+        be clipped only where it extends beyond the sides of the box.
+
+        Parameters
+        ----------
+        bounds
+            The bounding box: xmin, xmax, ymin, ymax, zmin, zmax.
+        resolution
+            The number of segments around curved surfaces.
+        """
+        if not pyvista_found:
+            return None
+        corners = np.array([[x, y, z] for x in bounds[0:2]
+                            for y in bounds[2:4] for z in bounds[4:6]])
+        heights = (corners - self.origin) @ self.dir
+        # the ends extend far enough past the box that the sides of the
+        # box never cut through them
+        margin = 2 * self.outer_radius + 0.01 * float(np.ptp(heights))
+        bottom = self.origin + self.dir * (heights.min() - margin)
+        disc = pyvista.Disc(center=tuple(bottom), normal=self.dir,
+                            inner=self.inner_radius,
+                            outer=self.outer_radius,
+                            c_res=50 if resolution is None else resolution)
+        mesh = disc.extrude(self.dir * (np.ptp(heights) + 2 * margin),
+                            capping=True)
+        return _clip_to_bounds(mesh, bounds)
+
     def _projection(self, x: float, y: float, z: float) -> \
             List[Tuple[float, float, float]]:
         # TODO: generalize this by using a degenerate cylinder
@@ -1187,6 +2033,56 @@ class CappedCylinder(Shield):
         # let numpy do the heavy lifting
         return float(np.linalg.norm(crossings[0]-crossings[1]))
 
+    def _get_crossing_lengths(self, starts: np.ndarray,
+                              end: np.ndarray) -> np.ndarray:
+        """Calculates the intersection lengths of the shield and a set of
+        rays that share an end point
+
+        Parameters
+        ----------
+        starts
+            Ray starting points, indexed by ray and coordinate.
+        end
+            The end point shared by all rays.
+
+        Returns
+        -------
+            Crossing lengths, one per ray.
+        """
+        origins, units, lengths = self._ray_arrays(starts, end)
+        offsets = origins - self.origin
+        axial_speed = units @ self.dir
+        axial_start = offsets @ self.dir
+        # distances along each ray bounded by the curved surface
+        part1 = units - np.outer(axial_speed, self.dir)
+        part2 = offsets - np.outer(axial_start, self.dir)
+        a = np.sum(part1*part1, axis=1)
+        b = 2*np.sum(part1*part2, axis=1)
+        c = np.sum(part2*part2, axis=1) - self.radius**2
+        parallel = a < 1e-12
+        safe_a = np.where(parallel, 1, a)
+        discriminant = b**2 - 4*safe_a*c
+        crossing = ~parallel & (discriminant > 0)
+        root = np.sqrt(np.where(crossing, discriminant, 0))
+        inside = parallel & (c <= 0)
+        radial_in = np.where(crossing, (-b - root)/(2*safe_a),
+                             np.where(inside, -np.inf, np.inf))
+        radial_out = np.where(crossing, (-b + root)/(2*safe_a),
+                              np.where(inside, np.inf, -np.inf))
+        # distances along each ray bounded by the end caps
+        moving = np.abs(axial_speed) >= 1e-12
+        safe_speed = np.where(moving, axial_speed, 1)
+        cap0 = -axial_start/safe_speed
+        cap1 = (self.length - axial_start)/safe_speed
+        between = (axial_start >= 0) & (axial_start <= self.length)
+        axial_in = np.where(moving, np.minimum(cap0, cap1),
+                            np.where(between, -np.inf, np.inf))
+        axial_out = np.where(moving, np.maximum(cap0, cap1),
+                             np.where(between, np.inf, -np.inf))
+        t_in = np.maximum(np.maximum(radial_in, axial_in), 0)
+        t_out = np.minimum(np.minimum(radial_out, axial_out), lengths)
+        return np.clip(t_out - t_in, 0, None)
+
     def _contains(self, point: np.ndarray) -> bool:
         """Determines if the shield contains a point
 
@@ -1267,20 +2163,104 @@ class CappedCylinder(Shield):
                     results.append(point)
         return results
 
-    def draw(self) -> pyvista.PolyData | None:
+    def _is_mirror_symmetric(self, point: np.ndarray, normal: np.ndarray,
+                             tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a reflection across
+        a plane
+
+        Parameters
+        ----------
+        point
+            A point on the plane.
+        normal
+            Unit vector normal to the plane.
+        tolerance
+            Distance within which a point is taken to lie on the plane.
+        """
+        middle = (self.origin + self.end) / 2
+        if abs(np.dot(self.dir, normal)) < Shield._PARALLEL_TOLERANCE:
+            # the axis lies in the plane
+            return Shield._on_plane(self.origin, point, normal, tolerance)
+        if abs(np.dot(self.dir, normal)) > 1 - Shield._PARALLEL_TOLERANCE:
+            # the plane cuts the cylinder in half
+            return Shield._on_plane(middle, point, normal, tolerance)
+        return False
+
+    def _mirror_normal(self, location: np.ndarray) -> Optional[np.ndarray]:
+        """Returns the normal of the plane containing the shield axis and
+        a location, or None if the location is on the axis
+
+        Parameters
+        ----------
+        location
+            The location, typically the detector.
+        """
+        return Shield._axis_plane_normal(self.origin, self.dir, location)
+
+    def _axis(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Returns a point on the shield axis and the unit vector along
+        the axis"""
+        return self.origin, self.dir
+
+    def _is_axisymmetric(self, origin: np.ndarray, axis: np.ndarray,
+                         tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a rotation about
+        an axis
+
+        Parameters
+        ----------
+        origin
+            A point on the axis.
+        axis
+            Unit vector along the axis.
+        tolerance
+            Distance within which a point is taken to lie on the axis.
+        """
+        return abs(np.dot(self.dir, axis)) > \
+            1 - Shield._PARALLEL_TOLERANCE and \
+            Shield._on_axis(self.origin, origin, axis, tolerance)
+
+    def draw(self, resolution: Optional[int] = None) \
+            -> pyvista.PolyData | None:
         """Creates a display object
 
+        Parameters
+        ----------
+        resolution
+            The number of segments around curved surfaces.
+
         Returns
         -------
             A display object representing the shield.
         """
         if pyvista_found:
             center = (self.origin + self.end) / 2
+            if resolution is None:
+                return pyvista.Cylinder(
+                    center=(center[0], center[1], center[2]),
+                    direction=self.dir, height=self.length,
+                    radius=self.radius)
             return pyvista.Cylinder(center=(center[0], center[1], center[2]),
                                     direction=self.dir, height=self.length,
-                                    radius=self.radius)
+                                    radius=self.radius,
+                                    resolution=resolution)
         return None
 
+    def _bounds(self) -> Optional[Tuple[float, ...]]:
+        """Returns the extent of the shield.
+
+        Returns
+        -------
+            xmin, xmax, ymin, ymax, zmin, zmax.
+        """
+        # the end caps extend from the axis by the radius times the sine
+        # of the angle between the axis and each coordinate direction
+        extent = self.radius * np.sqrt(np.clip(1 - self.dir**2, 0, 1))
+        lower = np.minimum(self.origin, self.end) - extent
+        upper = np.maximum(self.origin, self.end) + extent
+        return tuple(float(value) for pair in zip(lower, upper)
+                     for value in pair)
+
 # -----------------------------------------------------------
 
 
@@ -1427,3 +2407,31 @@ class ZAlignedCylinder(CappedCylinder):
                          cylinder_start=cylinder_start,
                          cylinder_end=cylinder_end,
                          cylinder_radius=cylinder_radius)
+
+
+def _clip_to_bounds(mesh: pyvista.PolyData,
+                    bounds: Sequence[float]) -> pyvista.PolyData:
+    """Clips a closed surface to a bounding box.
+
+    Only the faces of the box that cut the surface are used.
+
+    Parameters
+    ----------
+    mesh
+        The closed surface.
+    bounds
+        The bounding box: xmin, xmax, ymin, ymax, zmin, zmax.
+    """
+    for axis, name in enumerate('xyz'):
+        origin = [0.0, 0.0, 0.0]
+        if mesh.bounds[2 * axis] < bounds[2 * axis]:
+            origin[axis] = bounds[2 * axis]
+            mesh = mesh.clip_closed_surface(normal=name, origin=origin)
+        if mesh.n_points > 0 and \
+                mesh.bounds[2 * axis + 1] > bounds[2 * axis + 1]:
+            origin[axis] = bounds[2 * axis + 1]
+            mesh = mesh.clip_closed_surface(normal='-' + name,
+                                            origin=origin)
+        if mesh.n_points == 0:
+            break
+    return mesh
@@ -226,18 +226,10 @@ class Source(abc.ABC):
         for keyA, valueA in photon_dict.items():
             photon_list.append((keyA, valueA))
         photon_list = sorted(photon_list)
-        if self._grouping_option == GroupOption.GROUP or \
-                ((self._grouping_option == GroupOption.HYBRID) and
-                    (len(photon_list) > self._max_photon_energies)):
+        binBoundaries = self._group_boundaries(
+            [photon[0] for photon in photon_list])
+        if binBoundaries is not None:
             # group the photons
-            minEnergy: float = photon_list[0][0]
-            maxEnergy: float = photon_list[-1][0]
-            (groupEnergies, stepSize) = np.linspace(
-                minEnergy, maxEnergy, self._max_photon_energies, retstep=True)
-            binBoundaries = groupEnergies + (stepSize/2)
-            binBoundaries = \
-                np.concatenate([np.array([binBoundaries[0]-stepSize]),
-                                binBoundaries])
             # Returns the appropriate bin for each photon
             binplace = np.digitize(photon_list, binBoundaries)[:, 0]
             # convert the photon list to an array for further processing
@@ -258,6 +250,89 @@ class Source(abc.ABC):
                  returnValue.tolist()]
         return photon_list
 
+    def _group_boundaries(self, energies: List[float]) \
+            -> Optional[np.ndarray]:
+        """Returns the energy group boundaries, or None if the photons
+        are not grouped.
+
+        Parameters
+        ----------
+        energies
+            The sorted, ungrouped photon energies in MeV.
+        """
+        if len(energies) == 0:
+            return None
+        if self._grouping_option == GroupOption.GROUP or \
+                ((self._grouping_option == GroupOption.HYBRID) and
+                    (len(energies) > self._max_photon_energies)):
+            minEnergy: float = energies[0]
+            maxEnergy: float = energies[-1]
+            (groupEnergies, stepSize) = np.linspace(
+                minEnergy, maxEnergy, self._max_photon_energies, retstep=True)
+            binBoundaries = groupEnergies + (stepSize/2)
+            return np.concatenate([np.array([binBoundaries[0]-stepSize]),
+                                   binBoundaries])
+        return None
+
+    def _get_photon_contributions(self) \
+            -> Tuple[List[Union[str, float]], np.ndarray]:
+        """Returns the photon emission rate in each entry of the photon
+        source list per unit activity of each isotope and unique photon.
+
+        The energy groups are those of the current source, so that the
+        emission rates are the derivatives of
+        :meth:`get_photon_source_list` with respect to each activity
+        with the group energies held fixed.
+
+        Returns
+        -------
+            The isotope names followed by the unique photon energies, and
+            the emission rates in photons/sec per Bq, indexed by isotope
+            or unique photon and photon source list entry.
+        """
+        spectrum = self.get_photon_source_list()
+        energies = np.array([photon[0] for photon in spectrum], dtype=float)
+        keys: List[Union[str, float]] = []
+        lines: List[List[Tuple[float, float]]] = []
+        for next_isotope in self._isotope_list:
+            isotope_list = [(next_isotope[0], 1.0)]
+            if self._include_key_progeny is True:
+                isotope_detail = isotope.Isotope(next_isotope[0])
+                if isotope_detail.key_progeny is not None:
+                    isotope_list.extend(isotope_detail.key_progeny.items())
+            entry_lines = []
+            for name, fraction in isotope_list:
+                photons = isotope.Isotope(name).photons
+                if photons is not None:
+                    entry_lines.extend([(photon[0], photon[1]*fraction)
+                                        for photon in photons])
+            keys.append(next_isotope[0])
+            lines.append(entry_lines)
+        for photonA in self._unique_photons:
+            keys.append(photonA[0])
+            lines.append([(photonA[0], 1.0)])
+        binBoundaries = self._group_boundaries(sorted(
+            {line[0] for entry_lines in lines for line in entry_lines}))
+        contributions = np.zeros((len(keys), len(energies)))
+        if binBoundaries is not None:
+            # each group energy lies within its own bin
+            columns = dict(zip(np.digitize(energies, binBoundaries).tolist(),
+                               range(len(energies))))
+        else:
+            columns = {energy: index for index, energy in
+                       enumerate(energies.tolist())}
+        for row, entry_lines in enumerate(lines):
+            for energy, rate in entry_lines:
+                if binBoundaries is not None:
+                    column = columns.get(
+                        int(np.digitize(energy, binBoundaries)))
+                else:
+                    column = columns.get(energy)
+                # photons in a group with no emissions are not tracked
+                if column is not None:
+                    contributions[row, column] += rate
+        return keys, contributions
+
     @abc.abstractmethod
     def _get_source_points(self) -> List[Tuple[float, float, float]]:
         """Generates a list of point sources within the Source geometry.
@@ -385,6 +460,67 @@ class LineSource(shield.Shield, Source):
         """
         return 0
 
+    def _get_crossing_lengths(self, starts: np.ndarray,
+                              end: np.ndarray) -> np.ndarray:
+        """Calculates the intersection lengths of the shield and a set of
+        rays, which are always zero
+        """
+        return np.zeros(len(starts))
+
+    def _is_mirror_symmetric(self, point: np.ndarray, normal: np.ndarray,
+                             tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a reflection across
+        a plane
+
+        The source does not attenuate, so the reflection only needs to
+        map the source points onto each other, which is checked by the
+        model.
+
+        Parameters
+        ----------
+        point
+            A point on the plane.
+        normal
+            Unit vector normal to the plane.
+        tolerance
+            Distance within which a point is taken to lie on the plane.
+        """
+        return True
+
+    def _mirror_normal(self, location: np.ndarray) -> Optional[np.ndarray]:
+        """Returns the normal of the plane containing the line and a
+        location, or None if the location is on the line
+
+        Parameters
+        ----------
+        location
+            The location, typically the detector.
+        """
+        return shield.Shield._axis_plane_normal(self.origin, self._dir,
+                                                location)
+
+    def _axis(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Returns a point on the line and the unit vector along the line"""
+        return self.origin, self._dir
+
+    def _is_axisymmetric(self, origin: np.ndarray, axis: np.ndarray,
+                         tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a rotation about
+        an axis
+
+        Parameters
+        ----------
+        origin
+            A point on the axis.
+        axis
+            Unit vector along the axis.
+        tolerance
+            Distance within which a point is taken to lie on the axis.
+        """
+        return shield.Shield._on_axis(self.origin, origin, axis,
+                                      tolerance) and \
+            shield.Shield._on_axis(self.end, origin, axis, tolerance)
+
     def get_crossing_mfp(self, ray: ray.FiniteLengthRay,
                          photon_energy: float) -> int:
         """Calculates the mfp equivalent if a ray intersects the source
@@ -403,9 +539,15 @@ class LineSource(shield.Shield, Source):
         """
         return 0
 
-    def draw(self) -> pyvista.PolyData | None:
+    def draw(self, resolution: Optional[int] = None) \
+            -> pyvista.PolyData | None:
         """Creates a display object
 
+        Parameters
+        ----------
+        resolution
+            The number of segments around curved surfaces.
+
         Returns
         -------
             A display object representing the shield.
@@ -414,6 +556,18 @@ class LineSource(shield.Shield, Source):
             return pyvista.Line(pointa=self.origin, pointb=self.end)
         return None
 
+    def _bounds(self) -> Optional[Tuple[float, ...]]:
+        """Returns the extent of the source.
+
+        Returns
+        -------
+            xmin, xmax, ymin, ymax, zmin, zmax.
+        """
+        return tuple(float(value) for pair in
+                     zip(np.minimum(self.origin, self.end),
+                         np.maximum(self.origin, self.end))
+                     for value in pair)
+
 # -----------------------------------------------------------
 
 
@@ -491,6 +645,51 @@ class PointSource(shield.Shield, Source):
         """
         return 0
 
+    def _get_crossing_lengths(self, starts: np.ndarray,
+                              end: np.ndarray) -> np.ndarray:
+        """Calculates the intersection lengths of the shield and a set of
+        rays, which are always zero
+        """
+        return np.zeros(len(starts))
+
+    def _is_mirror_symmetric(self, point: np.ndarray, normal: np.ndarray,
+                             tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a reflection across
+        a plane
+
+        The source does not attenuate, so the reflection only needs to
+        map the source points onto each other, which is checked by the
+        model.
+
+        Parameters
+        ----------
+        point
+            A point on the plane.
+        normal
+            Unit vector normal to the plane.
+        tolerance
+            Distance within which a point is taken to lie on the plane.
+        """
+        return True
+
+    def _is_axisymmetric(self, origin: np.ndarray, axis: np.ndarray,
+                         tolerance: float) -> bool:
+        """Returns true if the shield is unchanged by a rotation about
+        an axis
+
+        Parameters
+        ----------
+        origin
+            A point on the axis.
+        axis
+            Unit vector along the axis.
+        tolerance
+            Distance within which a point is taken to lie on the axis.
+        """
+        return shield.Shield._on_axis(np.array([self._x, self._y, self._z],
+                                               dtype=float),
+                                      origin, axis, tolerance)
+
     def get_crossing_mfp(self, ray: ray.FiniteLengthRay,
                          photon_energy: float) -> int:
         """Calculates the mfp equivalent if a ray intersects the source
@@ -509,9 +708,15 @@ class PointSource(shield.Shield, Source):
         """
         return 0
 
-    def draw(self) -> pyvista.PolyData | None:
+    def draw(self, resolution: Optional[int] = None) \
+            -> pyvista.PolyData | None:
         """Creates a display object
 
+        Parameters
+        ----------
+        resolution
+            The number of segments around curved surfaces.
+
         Returns
         -------
             A display object representing the shield.
@@ -522,6 +727,16 @@ class PointSource(shield.Shield, Source):
                                 (self._x, self._y, self._z))
         return None
 
+    def _bounds(self) -> Optional[Tuple[float, ...]]:
+        """Returns the extent of the source.
+
+        Returns
+        -------
+            xmin, xmax, ymin, ymax, zmin, zmax.
+        """
+        return (float(self._x), float(self._x), float(self._y),
+                float(self._y), float(self._z), float(self._z))
+
 
 # -----------------------------------------------------------
 
@@ -0,0 +1,515 @@
+import os
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import scipy.interpolate
+import scipy.spatial
+import scipy.stats
+
+from . import model, cache
+''' '''
+'''
+ZapMeNot - a point kernel photon shielding library
+Copyright (C) 2019-2025  C. Alan Ford
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+# smallest exposure that is fitted, so that the logarithm is finite
+_FLOOR = 1E-300
+
+
+class Surrogate:
+    """A fast approximation of the exposure field of a model within a
+    box.
+
+    The logarithm of the exposure, with the inverse square falloff from
+    the center of the source removed, is fitted in two parts.  A linear
+    regression on the number of mean free paths of each shield along the
+    line to the source center accounts for the sharp changes of exposure
+    at shield faces and shadow edges.  The remainder, which varies
+    smoothly, is interpolated with radial basis functions.
+
+    A surrogate is created by :func:`build`.  It refers to the model for
+    the shield geometry, so the model must not be changed while the
+    surrogate is in use.
+
+    Parameters
+    ----------
+    base_model
+        The model.
+    bounds
+        The extent of the box: xmin, xmax, ymin, ymax, zmin, zmax.
+    points
+        The sampled detector locations, indexed by location and coordinate.
+    exposures
+        The exposure in mR/hr at each sampled location.
+    log_error
+        The error bound on the base 10 logarithm of the exposure.
+    residuals
+        The cross-validated error of the base 10 logarithm of the exposure
+        at each sampled location.
+    kernel
+        The radial basis function, as accepted by
+        scipy.interpolate.RBFInterpolator.
+    neighbors
+        The number of nearest samples used in each prediction.  If None,
+        all samples are used.
+    """
+
+    def __init__(self, base_model: model.Model, bounds: Sequence[float],
+                 points: np.ndarray, exposures: np.ndarray, log_error: float,
+                 residuals: np.ndarray, kernel: str = 'thin_plate_spline',
+                 neighbors: Optional[int] = None) -> None:
+        self.model: model.Model = base_model
+        self.bounds: np.ndarray = np.array(bounds, dtype=float)
+        self.points: np.ndarray = np.array(points, dtype=float)
+        self.exposures: np.ndarray = np.array(exposures, dtype=float)
+        self.log_error: float = float(log_error)
+        self.residuals: np.ndarray = np.array(residuals, dtype=float)
+        self.kernel: str = kernel
+        self.neighbors: Optional[int] = neighbors
+        # the hash of the model the surrogate was built from
+        self.key: str = cache.model_hash(base_model)
+        self._basis = _Basis(base_model, self.bounds)
+        self._interpolant = _Interpolant(
+            *self._basis.inputs(self.points),
+            self._basis.values(self.points, self.exposures), kernel,
+            neighbors)
+
+    @property
+    def relative_error(self) -> float:
+        """The error bound as a fraction of the exposure."""
+        return float(10**self.log_error - 1)
+
+    def predict(self, points: Sequence[Sequence[float]],
+                return_bounds: bool = False) \
+            -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Estimates the exposure at a set of detector locations.
+
+        Parameters
+        ----------
+        points
+            The X, Y, and Z cartesian coordinates of each detector location.
+        return_bounds
+            If True, the lower and upper bounds of the exposure are also
+            returned.
+
+        Raises
+        ------
+        ValueError
+            A location is outside the box of the surrogate
+
+        Returns
+        -------
+            The exposure in mR/hr, one per location, and if requested the
+            lower and upper bounds of the exposure.
+        """
+        locations = np.asarray(points, dtype=float).reshape(-1, 3)
+        margin = 1E-9 * np.maximum(np.ptp(self.bounds.reshape(3, 2),
+                                          axis=1), 1)
+        if np.any(locations < self.bounds[0::2] - margin) or \
+                np.any(locations > self.bounds[1::2] + margin):
+            raise ValueError("Location is outside the surrogate bounds")
+        logs = self._interpolant(*self._basis.inputs(locations)) - \
+            np.log10(self._basis.falloff(locations))
+        exposures = 10**logs
+        if return_bounds:
+            return (exposures, 10**(logs - self.log_error),
+                    10**(logs + self.log_error))
+        return exposures
+
+    def save(self, path: Union[str, os.PathLike]) -> None:
+        """Writes the samples and error bound of the surrogate to a file.
+
+        Parameters
+        ----------
+        path
+            The file, normally with the extension ``.npz``.
+        """
+        with open(path, 'wb') as stream:
+            np.savez(stream, bounds=self.bounds, points=self.points,
+                     exposures=self.exposures, log_error=self.log_error,
+                     residuals=self.residuals, key=self.key,
+                     kernel=self.kernel,
+                     neighbors=-1 if self.neighbors is None
+                     else self.neighbors)
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike],
+             base_model: model.Model) -> "Surrogate":
+        """Reads a surrogate written by :meth:`save`.
+
+        Parameters
+        ----------
+        path
+            The file.
+        base_model
+            The model the surrogate was built from, or a model with the
+            same input state.
+
+        Raises
+        ------
+        ValueError
+            The surrogate was built from a different model
+
+        Returns
+        -------
+            The surrogate.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if str(data['key']) != cache.model_hash(base_model):
+                raise ValueError(f"Surrogate {os.fspath(path)} was built "
+                                 "from a different model")
+            neighbors = int(data['neighbors'])
+            return cls(base_model, data['bounds'], data['points'],
+                       data['exposures'], float(data['log_error']),
+                       data['residuals'], str(data['kernel']),
+                       None if neighbors < 0 else neighbors)
+
+
+class _Basis:
+    """Converts detector locations to the inputs and fitted values of a
+    surrogate.
+
+    Parameters
+    ----------
+    base_model
+        The model.
+    bounds
+        The extent of the surrogate box.
+    """
+
+    def __init__(self, base_model: model.Model, bounds: np.ndarray) -> None:
+        self.model = base_model
+        self.bounds = bounds
+        extent = base_model.source._bounds()
+        if extent is None:
+            source_points = np.array(base_model._quadrature()[0],
+                                     dtype=float).reshape(-1, 3)
+            extent = [value for axis in range(3)
+                      for value in (source_points[:, axis].min(),
+                                    source_points[:, axis].max())]
+        extent = np.array(extent, dtype=float).reshape(3, 2)
+        self.center = extent.mean(axis=1)
+        self.size = float(np.max(np.ptp(extent, axis=1)) / 2)
+        # attenuation coefficients at the energy that contributes most
+        # to the unshielded exposure
+        energies, yields = base_model._spectrum()
+        coefficients = base_model._cross_sections(energies)
+        dominant = int(np.argmax(yields * energies *
+                                 coefficients.dose_coeffs))
+        self.attenuation = coefficients.mass_atten[dominant] * \
+            coefficients.densities
+
+    def inputs(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the locations scaled to the unit box, without any flat
+        direction, and the mean free paths of each shield along the line
+        from each location to the source center.
+
+        Parameters
+        ----------
+        points
+            The detector locations.
+        """
+        lower = self.bounds[0::2]
+        extent = self.bounds[1::2] - lower
+        keep = extent > 0
+        paths = np.zeros((len(points), len(self.model.shield_list)))
+        for index, body in enumerate(self.model.shield_list):
+            if self.attenuation[index] > 0:
+                paths[:, index] = self.attenuation[index] * \
+                    body._get_crossing_lengths(points, self.center)
+        return (points[:, keep] - lower[keep]) / extent[keep], paths
+
+    def falloff(self, points: np.ndarray) -> np.ndarray:
+        """Returns the inverse square falloff from the source, as the
+        squared distance from the source center plus the squared source
+        size.
+
+        Parameters
+        ----------
+        points
+            The detector locations.
+        """
+        return np.sum((points - self.center)**2, axis=1) + self.size**2
+
+    def values(self, points: np.ndarray,
+               exposures: np.ndarray) -> np.ndarray:
+        """Returns the fitted values at sampled locations.
+
+        Parameters
+        ----------
+        points
+            The sampled detector locations.
+        exposures
+            The exposure at each location.
+        """
+        return np.log10(np.maximum(exposures, _FLOOR) * self.falloff(points))
+
+
+class _Interpolant:
+    """A linear regression on the shield mean free paths, with the
+    remainder interpolated by radial basis functions.
+
+    Parameters
+    ----------
+    coordinates
+        The scaled sampled locations.
+    paths
+        The shield mean free paths at each location.
+    values
+        The fitted value at each location.
+    kernel
+        The radial basis function.
+    neighbors
+        The number of nearest samples used in each prediction.
+    """
+
+    def __init__(self, coordinates: np.ndarray, paths: np.ndarray,
+                 values: np.ndarray, kernel: str,
+                 neighbors: Optional[int]) -> None:
+        # least squares gives zero slopes for shields the samples miss
+        self.slopes = np.linalg.lstsq(
+            np.column_stack([np.ones(len(values)), paths]), values,
+            rcond=None)[0]
+        if neighbors is not None:
+            neighbors = min(neighbors, len(values))
+        self.rbf = scipy.interpolate.RBFInterpolator(
+            coordinates, values - self._trend(paths), kernel=kernel,
+            neighbors=neighbors)
+
+    def _trend(self, paths: np.ndarray) -> np.ndarray:
+        return self.slopes[0] + paths @ self.slopes[1:]
+
+    def __call__(self, coordinates: np.ndarray,
+                 paths: np.ndarray) -> np.ndarray:
+        return self.rbf(coordinates) + self._trend(paths)
+
+
+def _cross_validate(coordinates: np.ndarray, paths: np.ndarray,
+                    values: np.ndarray, folds: int, kernel: str,
+                    neighbors: Optional[int],
+                    rng: np.random.Generator) -> np.ndarray:
+    """Returns the out-of-fold error of the interpolant at each sample.
+
+    Parameters
+    ----------
+    coordinates
+        The scaled sampled locations.
+    paths
+        The shield mean free paths at each location.
+    values
+        The fitted value at each location.
+    folds
+        The number of folds.
+    kernel
+        The radial basis function.
+    neighbors
+        The number of nearest samples used in each prediction.
+    rng
+        The random number generator that assigns samples to folds.
+    """
+    groups = rng.permutation(len(values)) % folds
+    residuals = np.empty(len(values))
+    for fold in range(folds):
+        held = groups == fold
+        interpolant = _Interpolant(coordinates[~held], paths[~held],
+                                   values[~held], kernel, neighbors)
+        residuals[held] = interpolant(coordinates[held], paths[held]) - \
+            values[held]
+    return residuals
+
+
+def _body_boxes(base_model: model.Model,
+                bounds: np.ndarray) -> List[np.ndarray]:
+    """Returns the extents of the source and shields that lie within the
+    surrogate box, enlarged by a tenth of their size.
+
+    Parameters
+    ----------
+    base_model
+        The model.
+    bounds
+        The extent of the surrogate box.
+    """
+    boxes = []
+    for body in base_model.shield_list:
+        extent = body._bounds()
+        if extent is None:
+            continue
+        extent = np.array(extent, dtype=float).reshape(3, 2)
+        margin = 0.1 * np.max(np.ptp(extent, axis=1))
+        lower = np.maximum(extent[:, 0] - margin, bounds[0::2])
+        upper = np.minimum(extent[:, 1] + margin, bounds[1::2])
+        if np.all(upper >= lower) and np.any(upper > lower):
+            boxes.append(np.stack([lower, upper], axis=1).reshape(-1))
+    return boxes
+
+
+def _fill(box: np.ndarray, count: int, seed: int) -> np.ndarray:
+    """Places quasi-random locations in a box.
+
+    Parameters
+    ----------
+    box
+        The extent of the box.
+    count
+        The number of locations.
+    seed
+        The seed of the sequence.
+    """
+    sampler = scipy.stats.qmc.Halton(3, seed=seed)
+    return box[0::2] + sampler.random(count) * (box[1::2] - box[0::2])
+
+
+def _refinement(box: np.ndarray, points: np.ndarray, residuals: np.ndarray,
+                count: int, seed: int) -> np.ndarray:
+    """Chooses the locations added in a round of refinement.
+
+    Quasi-random candidate locations are scored by the cross-validated
+    error of their nearest samples multiplied by the distance to the
+    nearest sample, so that locations are added in poorly fitted regions
+    that are not yet densely sampled.  The score of the candidates near
+    each chosen location is reduced before the next is chosen.
+
+    Parameters
+    ----------
+    box
+        The extent of the surrogate box.
+    points
+        The sampled locations.
+    residuals
+        The cross-validated error at each sampled location.
+    count
+        The number of locations to be added.
+    seed
+        The seed of the candidate sequence.
+    """
+    candidates = _fill(box, 32 * count, seed)
+    scale = np.where(box[1::2] > box[0::2], box[1::2] - box[0::2], 1.0)
+    tree = scipy.spatial.cKDTree(points / scale)
+    distance, index = tree.query(candidates / scale,
+                                 k=min(4, len(points)))
+    distance = distance.reshape(len(candidates), -1)
+    index = index.reshape(len(candidates), -1)
+    score = np.max(np.abs(residuals[index]), axis=1) * distance[:, 0]
+    nearest = distance[:, 0].copy()
+    chosen: List[int] = []
+    for _ in range(count):
+        best = int(np.argmax(np.where(nearest > 0, score, -1)))
+        chosen.append(best)
+        separation = np.linalg.norm((candidates - candidates[best]) / scale,
+                                    axis=1)
+        closer = separation < nearest
+        score[closer] *= separation[closer] / nearest[closer]
+        nearest = np.minimum(nearest, separation)
+    return candidates[chosen]
+
+
+def build(base_model: model.Model, bounds: Sequence[float],
+          samples: int = 1000, initial: Optional[int] = None,
+          batch: Optional[int] = None, folds: int = 5,
+          kernel: str = 'thin_plate_spline',
+          neighbors: Optional[int] = None, threads: Optional[int] = None,
+          seed: int = 0) -> Surrogate:
+    """Builds a surrogate of the exposure field of a model within a box.
+
+    The box is first sampled quasi-randomly, with half of the initial
+    locations placed near the source and the shields of known extent.
+    The surrogate is then fitted and cross-validated, and further
+    locations are added where the cross-validated error is largest and
+    the samples are sparse, which is mostly near shield faces, shadow
+    edges, and the source.  Each round of locations is evaluated
+    together with :meth:`zapmenot.model.Model.calculate_exposure_map`.
+
+    The error bound of the surrogate is the largest cross-validated
+    error of the logarithm of the exposure over all of the samples.
+
+    Parameters
+    ----------
+    base_model
+        The model, which must have a source.
+    bounds
+        The extent of the box: xmin, xmax, ymin, ymax, zmin, zmax.  A
+        direction of zero extent gives a flat box.
+    samples
+        The total number of locations evaluated.
+    initial
+        The number of locations evaluated before refinement.  If None, a
+        quarter of the samples are used.
+    batch
+        The number of locations added in each round of refinement.  If
+        None, an eighth of the samples are used.
+    folds
+        The number of cross-validation folds.
+    kernel
+        The radial basis function, as accepted by
+        scipy.interpolate.RBFInterpolator.
+    neighbors
+        The number of nearest samples used in each prediction.  If None,
+        all samples are used.
+    threads
+        The number of threads used to evaluate the locations.
+    seed
+        The seed of the quasi-random sampling.
+
+    Raises
+    ------
+    ValueError
+        The model has no source, or the arguments are invalid
+
+    Returns
+    -------
+        The surrogate.
+    """
+    if base_model.source is None:
+        raise ValueError("Model is missing a source")
+    box = np.array(bounds, dtype=float)
+    if box.shape != (6,) or np.any(box[1::2] < box[0::2]) or \
+            np.all(box[1::2] == box[0::2]):
+        raise ValueError(f"Invalid surrogate bounds: {bounds}")
+    if initial is None:
+        initial = max(samples // 4, 1)
+    if batch is None:
+        batch = max(samples // 8, 1)
+    if folds < 2 or initial < 2 * folds or initial > samples or batch < 1:
+        raise ValueError("Invalid surrogate sample counts")
+    rng = np.random.default_rng(seed)
+    basis = _Basis(base_model, box)
+    boxes = _body_boxes(base_model, box)
+    uniform = initial - (initial // 2 if boxes else 0)
+    points = [_fill(box, uniform, seed)]
+    for index, body in enumerate(boxes):
+        count = (initial - uniform) // len(boxes) + \
+            (index < (initial - uniform) % len(boxes))
+        points.append(_fill(body, count, seed + index + 1))
+    points = np.concatenate(points)
+    exposures = base_model.calculate_exposure_map(points, threads)
+    residuals = _cross_validate(*basis.inputs(points),
+                                basis.values(points, exposures), folds,
+                                kernel, neighbors, rng)
+    while len(points) < samples:
+        count = min(batch, samples - len(points))
+        added = _refinement(box, points, residuals, count,
+                            seed + len(boxes) + len(points))
+        points = np.concatenate([points, added])
+        exposures = np.concatenate(
+            [exposures, base_model.calculate_exposure_map(added, threads)])
+        residuals = _cross_validate(*basis.inputs(points),
+                                    basis.values(points, exposures), folds,
+                                    kernel, neighbors, rng)
+    return Surrogate(base_model, box, points, exposures,
+                     float(np.max(np.abs(residuals))), residuals, kernel,
+                     neighbors)
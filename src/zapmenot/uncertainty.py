@@ -0,0 +1,553 @@
+import concurrent.futures
+import copy
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from . import model, shield, source, detector
+''' '''
+'''
+ZapMeNot - a point kernel photon shielding library
+Copyright (C) 2019-2025  C. Alan Ford
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+# the shield dimensions that can be sampled, for each kind of shield.  No
+# other attribute of the shield is derived from these.
+_DIMENSIONS = ((shield.SemiInfiniteXSlab, ('x_start', 'x_end')),
+               (shield.Sphere, ('radius',)),
+               (shield.InfiniteAnnulus, ('inner_radius', 'outer_radius')),
+               (shield.CappedCylinder, ('radius',)))
+
+
+def _dimensions(target: shield.Shield) -> List[str]:
+    """Returns the names of the dimensions of a shield that can be sampled.
+
+    Parameters
+    ----------
+    target
+        The shield.
+    """
+    return [name for kind, names in _DIMENSIONS
+            if isinstance(target, kind) for name in names]
+
+
+class _Parameter:
+    """An uncertain model input.
+
+    Parameters
+    ----------
+    kind
+        One of 'density', 'filler', 'activity', 'dimension', or 'detector'.
+    name
+        A label for the parameter.
+    distribution
+        The distribution of the parameter.
+    index
+        The shield index (density and dimension parameters) or the
+        detector coordinate index (detector parameters).
+    key
+        The isotope name or photon energy (activity parameters) or the
+        shield attribute name (dimension parameters).
+    """
+
+    def __init__(self, kind: str, name: str, distribution: Any,
+                 index: Optional[int] = None,
+                 key: Optional[Union[str, float]] = None) -> None:
+        if not hasattr(distribution, 'rvs'):
+            raise ValueError(f"Invalid distribution: {distribution}")
+        self.kind: str = kind
+        self.name: str = name
+        self.distribution: Any = distribution
+        self.index: Optional[int] = index
+        self.key: Optional[Union[str, float]] = key
+
+    @property
+    def is_geometric(self) -> bool:
+        return self.kind in ('dimension', 'detector')
+
+
+class UncertaintyAnalysis:
+    """Propagates uncertain model inputs to the exposure by Monte Carlo
+    sampling.
+
+    Distributions are frozen scipy.stats distributions, or any object
+    with an ``rvs(size, random_state)`` method.  Samples of densities and
+    activities share a single trace of the geometry and are evaluated as
+    a batch.  Samples of the detector location alone share the source
+    points and shields, and are traced and evaluated together.  Samples
+    that change a shield dimension are traced individually with the
+    vectorized ray engine.  The model itself is not modified.
+
+    Parameters
+    ----------
+    base_model
+        The model to be analyzed.
+    """
+
+    def __init__(self, base_model: model.Model) -> None:
+        self.model: model.Model = base_model
+        self.parameters: List[_Parameter] = []
+
+    def _shield_index(self, target: shield.Shield) -> int:
+        for index, item in enumerate(self.model.shield_list):
+            if item is target:
+                return index
+        raise ValueError(f"Shield is not in the model: {target}")
+
+    def add_density(self, target: Union[shield.Shield, str],
+                    distribution: Any) -> None:
+        r"""Adds an uncertain material density.
+
+        Parameters
+        ----------
+        target
+            A shield (or source) in the model, or the string 'filler'
+            for the filler material.
+        distribution
+            The distribution of the density in g/cm\ :sup:`3`.
+        """
+        if isinstance(target, str) and target == 'filler':
+            if self.model.filler_material is None:
+                raise ValueError("Model has no filler material")
+            self.parameters.append(
+                _Parameter('filler', 'filler density', distribution))
+            return
+        index = self._shield_index(target)
+        self.parameters.append(
+            _Parameter('density', f'shield {index} density', distribution,
+                       index=index))
+
+    def add_activity(self, key: Union[str, float],
+                     distribution: Any) -> None:
+        """Adds an uncertain source activity.
+
+        Parameters
+        ----------
+        key
+            The name of an isotope in the source, or the energy of a
+            photon added to the source.
+        distribution
+            The distribution of the activity in Bq (isotopes) or the
+            intensity in photons/sec (photons).
+        """
+        if self.model.source is None:
+            raise ValueError("Model is missing a source")
+        keys, _ = self.model.source._get_photon_contributions()
+        if key not in keys:
+            raise ValueError(f"Source does not include {key}")
+        self.parameters.append(
+            _Parameter('activity', f'{key} activity', distribution, key=key))
+
+    def add_dimension(self, target: shield.Shield, attribute: str,
+                      distribution: Any) -> None:
+        """Adds an uncertain shield dimension.
+
+        Parameters
+        ----------
+        target
+            A shield (or source) in the model.
+        attribute
+            The name of the dimension: 'x_start' or 'x_end' for a
+            SemiInfiniteXSlab, 'radius' for a Sphere or CappedCylinder, or
+            'inner_radius' or 'outer_radius' for an InfiniteAnnulus.
+            Attributes from which other parts of the geometry are derived,
+            such as the length of a cylinder, cannot be sampled.
+        distribution
+            The distribution of the dimension in cm.
+
+        Raises
+        ------
+        ValueError
+            The attribute is not a dimension of the shield that can be
+            sampled
+        """
+        index = self._shield_index(target)
+        if attribute not in _dimensions(target):
+            raise ValueError(f"Unsupported shield dimension: {attribute}")
+        self.parameters.append(
+            _Parameter('dimension', f'shield {index} {attribute}',
+                       distribution, index=index, key=attribute))
+
+    def add_detector_location(self, axis: str, distribution: Any) -> None:
+        """Adds an uncertain detector coordinate.
+
+        Parameters
+        ----------
+        axis
+            One of 'x', 'y', or 'z'.
+        distribution
+            The distribution of the coordinate in cm.
+        """
+        if axis not in ('x', 'y', 'z'):
+            raise ValueError(f"Invalid axis: {axis}")
+        self.parameters.append(
+            _Parameter('detector', f'detector {axis}', distribution,
+                       index='xyz'.index(axis)))
+
+    def sample(self, samples: int,
+               seed: Optional[Union[int, np.random.Generator]] = None) \
+            -> np.ndarray:
+        """Draws samples of the uncertain inputs.
+
+        Parameters
+        ----------
+        samples
+            The number of samples.
+        seed
+            Seed or generator for the random number generator.
+
+        Returns
+        -------
+            Input values, indexed by sample and parameter.
+        """
+        if not isinstance(samples, int) or samples < 1:
+            raise ValueError(f"Invalid number of samples: {samples}")
+        rng = np.random.default_rng(seed)
+        values = np.zeros((samples, len(self.parameters)))
+        for index, parameter in enumerate(self.parameters):
+            values[:, index] = parameter.distribution.rvs(
+                size=samples, random_state=rng)
+        return values
+
+    def run(self, samples: int = 1000,
+            seed: Optional[Union[int, np.random.Generator]] = None,
+            processes: Optional[int] = None) -> "UncertaintyResults":
+        """Samples the uncertain inputs and calculates the exposure for
+        each sample.
+
+        Parameters
+        ----------
+        samples
+            The number of samples.
+        seed
+            Seed or generator for the random number generator.
+        processes
+            If given, the samples are divided among this many worker
+            processes.
+
+        Returns
+        -------
+            The exposure samples and summary statistics.
+        """
+        if self.model.source is None:
+            raise ValueError("Model is missing a source")
+        if self.model.detector is None:
+            raise ValueError("Model is missing a detector")
+        values = self.sample(samples, seed)
+        if processes is None or processes <= 1:
+            exposures = _evaluate_samples(self.model, self.parameters,
+                                          values)
+        else:
+            chunks = np.array_split(values, processes)
+            with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+                futures = [pool.submit(_evaluate_samples, self.model,
+                                       self.parameters, chunk)
+                           for chunk in chunks if len(chunk) > 0]
+                exposures = np.concatenate(
+                    [future.result() for future in futures])
+        return UncertaintyResults(
+            [parameter.name for parameter in self.parameters], values,
+            exposures)
+
+
+def _evaluate_samples(base_model: model.Model,
+                      parameters: Sequence[_Parameter],
+                      values: np.ndarray) -> np.ndarray:
+    """Calculates the exposure for each sample of the uncertain inputs.
+
+    Parameters
+    ----------
+    base_model
+        The model to be analyzed.
+    parameters
+        The uncertain inputs.
+    values
+        Input values, indexed by sample and parameter.
+
+    Returns
+    -------
+        The exposure in mR/hr, one per sample.
+    """
+    energies, _ = base_model._spectrum()
+    coefficients = base_model._cross_sections(energies)
+    keys, contributions = base_model.source._get_photon_contributions()
+    activities = np.array(
+        [entry[1] for entry in base_model.source._isotope_list] +
+        [entry[1] for entry in base_model.source._unique_photons],
+        dtype=float)
+
+    n_samples = len(values)
+    shield_densities = np.tile(coefficients.densities, (n_samples, 1))
+    filler_densities = np.full(n_samples, coefficients.filler_density)
+    sample_activities = np.tile(activities, (n_samples, 1))
+    for column, parameter in enumerate(parameters):
+        if parameter.kind == 'density':
+            shield_densities[:, parameter.index] = values[:, column]
+        elif parameter.kind == 'filler':
+            filler_densities = values[:, column]
+        elif parameter.kind == 'activity':
+            # entries sharing a key are scaled together
+            entries = [index for index, key in enumerate(keys)
+                       if key == parameter.key]
+            total = np.sum(activities[entries])
+            for index in entries:
+                if total > 0:
+                    sample_activities[:, index] = \
+                        values[:, column] * activities[index] / total
+                else:
+                    sample_activities[:, index] = \
+                        values[:, column] / len(entries)
+    sample_yields = sample_activities @ contributions
+    unit_yields = np.ones(len(energies))
+
+    geometric = [column for column, parameter in enumerate(parameters)
+                 if parameter.is_geometric]
+    if len(geometric) == 0:
+        # all samples share a single trace of the geometry
+        trace = base_model._trace(base_model.detector.location)
+        unit_exposure, _ = base_model._evaluate_batch(
+            trace, energies, unit_yields, coefficients, shield_densities,
+            filler_densities)
+        return np.sum(unit_exposure * sample_yields, axis=1)
+
+    if all(parameters[column].kind == 'detector' for column in geometric):
+        # the samples share one geometry and differ only in the detector
+        # location, so they are traced and evaluated together
+        locations = np.tile(np.asarray(base_model.detector.location,
+                                       dtype=float), (n_samples, 1))
+        for column in geometric:
+            locations[:, parameters[column].index] = values[:, column]
+        unit_exposure = _detector_batch(base_model, locations, energies,
+                                        coefficients, shield_densities,
+                                        filler_densities)
+        return np.sum(unit_exposure * sample_yields, axis=1)
+
+    # each sample has its own geometry; the model is copied once and
+    # the copy is modified for each sample
+    sample_model = copy.deepcopy(base_model)
+    location = list(base_model.detector.location)
+    exposures = np.zeros(n_samples)
+    for sample in range(n_samples):
+        sample_location = list(location)
+        for column in geometric:
+            parameter = parameters[column]
+            if parameter.kind == 'dimension':
+                item = sample_model.shield_list[parameter.index]
+                setattr(item, parameter.key, float(values[sample, column]))
+                if isinstance(item, source.Source):
+                    # rebuild the source quadrature for the new size
+                    item.points_per_dimension = item.points_per_dimension
+            else:
+                sample_location[parameter.index] = \
+                    float(values[sample, column])
+        sample_model.detector = detector.Detector(*sample_location)
+        trace = sample_model._trace(sample_model.detector.location)
+        unit_exposure, _ = sample_model._evaluate_batch(
+            trace, energies, unit_yields, coefficients,
+            shield_densities[sample:sample+1],
+            filler_densities[sample:sample+1])
+        exposures[sample] = np.sum(unit_exposure[0] * sample_yields[sample])
+    return exposures
+
+
+def _detector_batch(base_model: model.Model, locations: np.ndarray,
+                    energies: np.ndarray, coefficients: model._Coefficients,
+                    shield_densities: np.ndarray,
+                    filler_densities: np.ndarray) -> np.ndarray:
+    """Calculates the exposure at a batch of detector locations for a
+    unit emission rate at each photon energy.
+
+    Parameters
+    ----------
+    base_model
+        The model to be analyzed.
+    locations
+        Detector locations, indexed by sample and coordinate.
+    energies
+        The photon energies in MeV.
+    coefficients
+        The material coefficients.
+    shield_densities
+        Shield densities, indexed by sample and shield.
+    filler_densities
+        Filler densities, one per sample.
+
+    Returns
+    -------
+        The exposure in mR/hr, indexed by sample and photon energy.
+    """
+    source_points, weights = base_model._quadrature()
+    points = np.array(source_points, dtype=float).reshape(-1, 3)
+    n_samples = len(locations)
+    n_shields = len(base_model.shield_list)
+    exposure = np.zeros((n_samples, len(energies)))
+    # limit the size of the (sample, source point, shield) working arrays
+    chunk = max(1, model.Model._BATCH_ELEMENTS //
+                max(len(points) * n_shields, 1))
+    for first in range(0, n_samples, chunk):
+        rows = slice(first, min(first + chunk, n_samples))
+        ends = locations[rows]
+        distances = np.linalg.norm(
+            ends[:, np.newaxis, :] - points[np.newaxis, :, :], axis=2)
+        if np.any(distances == 0.0):
+            raise ValueError("detector and source are coincident")
+        # a crossing length does not depend on the direction of the ray,
+        # so the shields are intersected along the longer of the two
+        # axes, either from each source point to every detector or from
+        # every source point to each detector
+        crossings = np.zeros((len(ends), len(points), n_shields))
+        for index, item in enumerate(base_model.shield_list):
+            if len(points) <= len(ends):
+                for point_index, point in enumerate(points):
+                    crossings[:, point_index, index] = \
+                        item._get_crossing_lengths(ends, point)
+            else:
+                for sample, end in enumerate(ends):
+                    crossings[sample, :, index] = \
+                        item._get_crossing_lengths(points, end)
+        gaps = distances - np.sum(crossings, axis=2)
+        # allow for roundoff where a ray ends on a shield surface
+        if np.amin(gaps) < -1e-9*np.amax(distances):
+            raise ValueError("Looks like shields and/or sources overlap")
+        gaps = np.clip(gaps, 0, None)
+        trace = model._Trace(source_points, weights, distances, crossings,
+                             gaps)
+        for energy_index in range(len(energies)):
+            attenuation = shield_densities[rows] * \
+                coefficients.mass_atten[energy_index]
+            total_mfp = np.einsum('sk,spk->sp', attenuation, crossings)
+            if coefficients.filler_mass_atten is not None:
+                total_mfp += (filler_densities[rows] *
+                              coefficients.filler_mass_atten[
+                                  energy_index])[:, np.newaxis] * gaps
+            _, _, collided_points = base_model._kernel(
+                trace, energies[energy_index], 1.0,
+                coefficients.dose_coeffs[energy_index], total_mfp)
+            exposure[rows, energy_index] = np.sum(collided_points, axis=1)
+    return exposure
+
+
+class UncertaintyResults:
+    """The exposure samples from an uncertainty analysis.
+
+    Parameters
+    ----------
+    names
+        The names of the uncertain inputs.
+    values
+        Input values, indexed by sample and parameter.
+    exposures
+        The exposure in mR/hr, one per sample.
+    """
+
+    def __init__(self, names: List[str], values: np.ndarray,
+                 exposures: np.ndarray) -> None:
+        self.names: List[str] = names
+        self.values: np.ndarray = values
+        self.exposures: np.ndarray = exposures
+
+    def __len__(self) -> int:
+        return len(self.exposures)
+
+    @property
+    def mean(self) -> float:
+        """The mean exposure in mR/hr."""
+        return float(np.mean(self.exposures))
+
+    @property
+    def std(self) -> float:
+        """The sample standard deviation of the exposure in mR/hr."""
+        if len(self.exposures) < 2:
+            return 0.0
+        return float(np.std(self.exposures, ddof=1))
+
+    @property
+    def relative_error(self) -> float:
+        """The standard error of the mean exposure divided by the mean."""
+        if self.mean == 0:
+            return 0.0
+        return self.std / np.sqrt(len(self.exposures)) / self.mean
+
+    def percentile(self, q: Union[float, Sequence[float]]) \
+            -> Union[float, np.ndarray]:
+        """Returns percentiles of the exposure.
+
+        Parameters
+        ----------
+        q
+            One or more percentiles between 0 and 100.
+
+        Returns
+        -------
+            The exposure percentiles in mR/hr.
+        """
+        answer = np.percentile(self.exposures, q)
+        if np.shape(answer) == ():
+            return float(answer)
+        return answer
+
+    def confidence_interval(self, level: float = 0.95) -> np.ndarray:
+        """Returns the central interval containing a fraction of the
+        exposure samples.
+
+        Parameters
+        ----------
+        level
+            The fraction of samples within the interval.
+
+        Returns
+        -------
+            The lower and upper exposure in mR/hr.
+        """
+        if level <= 0 or level >= 1:
+            raise ValueError(f"Invalid confidence level: {level}")
+        tail = 50 * (1 - level)
+        return np.percentile(self.exposures, [tail, 100 - tail])
+
+    def convergence(self, percentiles: Sequence[float] = (5, 50, 95),
+                    steps: int = 10) -> Dict[str, np.ndarray]:
+        """Returns running estimates of the mean and percentiles as the
+        number of samples increases.  Estimates that are still changing
+        at the full sample count indicate that more samples are needed.
+
+        Parameters
+        ----------
+        percentiles
+            The percentiles to be tracked.
+        steps
+            The number of sample counts at which the estimates are made.
+
+        Returns
+        -------
+            Dictionary of the sample counts ('samples'), the running mean
+            ('mean'), the relative standard error of the mean
+            ('relative_error'), and the running percentiles
+            ('percentiles', indexed by sample count and percentile).
+        """
+        total = len(self.exposures)
+        counts = np.unique(np.linspace(
+            max(total // steps, 1), total, steps).astype(int))
+        means = np.array([np.mean(self.exposures[:count])
+                          for count in counts])
+        errors = np.array([
+            np.std(self.exposures[:count], ddof=1) / np.sqrt(count) / mean
+            if count > 1 and mean != 0 else 0.0
+            for count, mean in zip(counts, means)])
+        running = np.array([np.percentile(self.exposures[:count],
+                                          percentiles)
+                            for count in counts])
+        return {'samples': counts, 'mean': means,
+                'relative_error': errors, 'percentiles': running}
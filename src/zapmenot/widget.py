@@ -0,0 +1,348 @@
+import time
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from . import model, shield, detector
+
+import importlib
+ipywidgets_spec = importlib.util.find_spec("ipywidgets")
+ipywidgets_found = ipywidgets_spec is not None
+if ipywidgets_found:
+    import ipywidgets
+pyvista_spec = importlib.util.find_spec("pyvista")
+pyvista_found = pyvista_spec is not None
+if pyvista_found:
+    import pyvista
+''' '''
+'''
+ZapMeNot - a point kernel photon shielding library
+Copyright (C) 2019-2025  C. Alan Ford
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+'''
+
+
+class IncrementalModel:
+    """Keeps the intermediate results of a calculation so that the
+    exposure can be updated quickly after small changes to a model.
+
+    Moving the detector traces the rays again but reuses the spectrum and
+    cross sections.  Changing a density or an activity reuses the traced
+    rays and repeats only the point kernel arithmetic.  The changes are
+    made to the model as well, so it always matches the exposure shown.
+    The exposure is evaluated from the source quadrature, as by
+    :meth:`zapmenot.model.Model.sweep`.
+
+    Parameters
+    ----------
+    base_model
+        The model, which must have a source and a detector.
+
+    Raises
+    ------
+    ValueError
+        The model is missing a source or detector
+    """
+
+    def __init__(self, base_model: model.Model) -> None:
+        if base_model.source is None:
+            raise ValueError("Model is missing a source")
+        if base_model.detector is None:
+            raise ValueError("Model is missing a detector")
+        self.model: model.Model = base_model
+        # wall time of the last update, in seconds
+        self.last_update: float = 0.0
+        started = time.perf_counter()
+        self._energies, self._yields = base_model._spectrum()
+        self._coefficients = base_model._cross_sections(self._energies)
+        self._densities: np.ndarray = self._coefficients.densities.copy()
+        self._filler_density: float = self._coefficients.filler_density
+        self._trace = base_model._trace(base_model.detector.location)
+        self._exposure: float = self._evaluate()
+        self.last_update = time.perf_counter() - started
+
+    @property
+    def exposure(self) -> float:
+        """The exposure at the detector in mR/hr."""
+        return self._exposure
+
+    def move_detector(self, x: float, y: float, z: float) -> float:
+        """Moves the detector and updates the exposure.
+
+        Parameters
+        ----------
+        x
+            The X coordinate of the detector.
+        y
+            The Y coordinate of the detector.
+        z
+            The Z coordinate of the detector.
+
+        Returns
+        -------
+            The exposure at the new location in mR/hr.
+        """
+        started = time.perf_counter()
+        self.model.add_detector(detector.Detector(x, y, z))
+        self._trace = self.model._trace(self.model.detector.location)
+        return self._update(started)
+
+    def set_density(self, target: Union[shield.Shield, str],
+                    density: float) -> float:
+        r"""Changes the density of a shield material or the filler and
+        updates the exposure.
+
+        Parameters
+        ----------
+        target
+            A shield (or the source) in the model, or the string 'filler'.
+        density
+            The new density in g/cm\ :sup:`3`.
+
+        Raises
+        ------
+        ValueError
+            The target is not a shield in the model or the filler
+
+        Returns
+        -------
+            The exposure in mR/hr.
+        """
+        started = time.perf_counter()
+        if isinstance(target, str) and target == 'filler':
+            if self.model.filler_material is None:
+                raise ValueError("Model has no filler material")
+            self.model.filler_material.density = density
+            self._filler_density = float(density)
+        else:
+            index = self._shield_index(target)
+            target.material.density = density
+            self._densities[index] = float(density)
+        return self._update(started)
+
+    def set_activity(self, isotope: str, becquerels: float) -> float:
+        """Changes the activity of a source isotope and updates the
+        exposure.
+
+        Only the spectrum is rebuilt; the cross sections are looked up
+        again only if the photon energies change.
+
+        Parameters
+        ----------
+        isotope
+            The name of an isotope in the source, such as 'Co-60'.
+        becquerels
+            The new activity in Bq.
+
+        Raises
+        ------
+        ValueError
+            The isotope is not in the source, or the activity is negative
+
+        Returns
+        -------
+            The exposure in mR/hr.
+        """
+        started = time.perf_counter()
+        if becquerels < 0:
+            raise ValueError(f"Invalid activity: {becquerels}")
+        isotopes = self.model.source._isotope_list
+        names = [name for name, _ in isotopes]
+        if isotope not in names:
+            raise ValueError(f"Isotope {isotope} is not in the source")
+        isotopes[names.index(isotope)] = (isotope, float(becquerels))
+        energies, self._yields = self.model._spectrum()
+        if not np.array_equal(energies, self._energies):
+            self._energies = energies
+            self._coefficients = self.model._cross_sections(energies)
+        return self._update(started)
+
+    @property
+    def activities(self) -> Dict[str, float]:
+        """The activity in Bq of each isotope in the source."""
+        return dict(self.model.source._isotope_list)
+
+    def _shield_index(self, target: Any) -> int:
+        """Returns the index of a shield in the model.
+
+        Parameters
+        ----------
+        target
+            The shield.
+        """
+        for index, item in enumerate(self.model.shield_list):
+            if item is target:
+                return index
+        raise ValueError(f"Invalid shield: {target}")
+
+    def _update(self, started: float) -> float:
+        """Evaluates the exposure and records the time of the update.
+
+        Parameters
+        ----------
+        started
+            The performance counter value when the update began.
+        """
+        self._exposure = self._evaluate()
+        self.last_update = time.perf_counter() - started
+        return self._exposure
+
+    def _evaluate(self) -> float:
+        """Evaluates the exposure from the traced rays."""
+        exposure, _ = self.model._evaluate_batch(
+            self._trace, self._energies, self._yields, self._coefficients,
+            self._densities[np.newaxis, :],
+            np.array([self._filler_density]))
+        return float(np.sum(exposure))
+
+
+class ModelWidget:
+    """An interactive Jupyter view of a model.
+
+    The view shows the model geometry with a sphere at the detector
+    location that can be dragged, along with sliders for the detector
+    coordinates and fields for the shield and filler densities and the
+    isotope activities.  Each change updates the displayed exposure
+    through an :class:`IncrementalModel`.
+
+    Parameters
+    ----------
+    base_model
+        The model, which must have a source and a detector.
+    extent
+        The range of each detector slider, as xmin, xmax, ymin, ymax,
+        zmin, zmax.  If None, the display bounds of the model are used.
+
+    Raises
+    ------
+    ImportError
+        ipywidgets or pyvista is not installed
+    """
+
+    def __init__(self, base_model: model.Model,
+                 extent: Optional[Sequence[float]] = None) -> None:
+        if not ipywidgets_found or not pyvista_found:
+            raise ImportError("ipywidgets and pyvista are required for "
+                              "the model widget")
+        self.incremental: IncrementalModel = IncrementalModel(base_model)
+        if extent is None:
+            extent = base_model._findBoundingBox()
+        location = base_model.detector.location
+        self._output = ipywidgets.HTML()
+        self._sliders: List[Any] = [
+            ipywidgets.FloatSlider(
+                value=location[axis], min=min(extent[2 * axis],
+                                              location[axis]),
+                max=max(extent[2 * axis + 1], location[axis]),
+                step=(extent[2 * axis + 1] - extent[2 * axis]) / 200 or 1.0,
+                description=f'detector {name}', continuous_update=True)
+            for axis, name in enumerate('xyz')]
+        for slider in self._sliders:
+            slider.observe(self._on_slider, names='value')
+        self._density_fields: List[Any] = []
+        for item in base_model.shield_list:
+            field = ipywidgets.BoundedFloatText(
+                value=item.material.density, min=0, max=1E3,
+                description=f'{item.material.name} g/cm3')
+            field.observe(lambda change, target=item:
+                          self._apply(self.incremental.set_density,
+                                      target, change['new']),
+                          names='value')
+            self._density_fields.append(field)
+        if base_model.filler_material is not None:
+            field = ipywidgets.BoundedFloatText(
+                value=base_model.filler_material.density, min=0, max=1E3,
+                description='filler g/cm3')
+            field.observe(lambda change:
+                          self._apply(self.incremental.set_density,
+                                      'filler', change['new']),
+                          names='value')
+            self._density_fields.append(field)
+        self._activity_fields: List[Any] = []
+        for name, activity in self.incremental.activities.items():
+            field = ipywidgets.FloatText(value=activity,
+                                         description=f'{name} Bq')
+            field.observe(lambda change, isotope=name:
+                          self._apply(self.incremental.set_activity,
+                                      isotope, change['new']),
+                          names='value')
+            self._activity_fields.append(field)
+        self.plotter: Any = base_model._plotter()
+        self._marker = self.plotter.add_sphere_widget(
+            self._on_drag, center=location, color='green',
+            radius=0.02 * max(extent[1] - extent[0],
+                              extent[3] - extent[2],
+                              extent[5] - extent[4]))
+        self._show()
+
+    def _apply(self, update: Any, *arguments: Any) -> None:
+        """Applies a change to the model, reporting any error."""
+        try:
+            update(*arguments)
+        except ValueError as error:
+            self._output.value = f'<b>{error}</b>'
+            return
+        self._show()
+
+    def _on_slider(self, change: Dict[str, Any]) -> None:
+        """Moves the detector to the slider coordinates."""
+        location = [slider.value for slider in self._sliders]
+        self._apply(self.incremental.move_detector, *location)
+        if self._marker is not None:
+            self._marker.GetRepresentation().SetCenter(location)
+
+    def _on_drag(self, center: Sequence[float]) -> None:
+        """Moves the detector to the dragged sphere."""
+        for slider, value in zip(self._sliders, center):
+            with slider.hold_trait_notifications():
+                slider.unobserve(self._on_slider, names='value')
+                slider.value = float(np.clip(value, slider.min, slider.max))
+                slider.observe(self._on_slider, names='value')
+        self._apply(self.incremental.move_detector, *center)
+
+    def _show(self) -> None:
+        """Displays the exposure and the time taken to update it."""
+        self._output.value = (
+            f'<b>{self.incremental.exposure:.4g} mR/hr</b> '
+            f'({1000 * self.incremental.last_update:.0f} ms)')
+
+    def show(self) -> Any:
+        """Returns the widget for display in a notebook.
+
+        Returns
+        -------
+            An ipywidgets box holding the view and the controls.
+        """
+        viewer = self.plotter.show(return_viewer=True)
+        controls = ipywidgets.VBox([self._output, *self._sliders,
+                                    *self._density_fields,
+                                    *self._activity_fields])
+        return ipywidgets.HBox([viewer, controls]) if viewer is not None \
+            else controls
+
+
+def interact(base_model: model.Model) -> Any:
+    """Shows an interactive view of a model in a Jupyter notebook.
+
+    Parameters
+    ----------
+    base_model
+        The model, which must have a source and a detector.
+
+    Returns
+    -------
+        The widget.
+    """
+    return ModelWidget(base_model).show()
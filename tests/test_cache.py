@@ -0,0 +1,87 @@
+import pytest
+import numpy as np
+
+from zapmenot import cache, model, source, shield, detector, material
+
+pytestmark = pytest.mark.basic
+
+
+# a point source (single photon) with a single infinite yz shield
+# Reference:
+# tests/reference_calculations/test_model/test_Case2.m (matlab script)
+def test_model_hash():
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_photon(1.0, 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    reference = cache.model_hash(myModel)
+    assert cache.model_hash(myModel, 'map') != reference
+    # equal inputs in different numeric types give the same hash
+    myModel.add_detector(detector.Detector(100.0, 0, 0))
+    assert cache.model_hash(myModel) == reference
+    myModel.add_detector(detector.Detector(101, 0, 0))
+    assert cache.model_hash(myModel) != reference
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.shield_list[-1].material.density = 7.8
+    assert cache.model_hash(myModel) != reference
+    myModel.shield_list[-1].material.density = 7.874
+    assert cache.model_hash(myModel) == reference
+    # options that do not change the results are ignored
+    myModel.collect_statistics = True
+    assert cache.model_hash(myModel) == reference
+    mySource.add_photon(0.5, 1e9)
+    assert cache.model_hash(myModel) != reference
+    with pytest.raises(TypeError):
+        cache.canonical(object())
+
+
+def test_eviction(tmp_path):
+    store = cache.ResultCache(tmp_path / 'cache.db', max_bytes=250)
+    store.put('a', b'a' * 100)
+    store.put('b', b'b' * 100)
+    # reading 'a' makes 'b' the least recently used result
+    assert store.get('a') == b'a' * 100
+    store.put('c', b'c' * 100)
+    assert store.get('b') is None
+    assert store.get('c') == b'c' * 100
+    assert len(store) == 2
+    assert store.size == 200
+    assert (store.hits, store.misses) == (2, 1)
+    store.clear()
+    assert len(store) == 0
+    with pytest.raises(ValueError):
+        cache.ResultCache(tmp_path / 'cache.db', max_bytes=0)
+
+
+# Reference:
+# tests/reference_calculations/test_model/test_Case2.m (matlab script)
+def test_model_cache(tmp_path):
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_photon(1.0, 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    myModel.result_cache = cache.ResultCache(tmp_path / 'cache.db')
+    first = myModel.calculate_results(include_mfp=True)
+    second = myModel.calculate_results(include_mfp=True)
+    assert myModel.result_cache.hits == 1
+    assert first.total_exposure == pytest.approx(
+        7.057332942044014e-06*1000*3600)  # convert from R/sec to mR/hr
+    assert np.array_equal(first.exposure, second.exposure)
+    assert np.array_equal(first.shield_mfp, second.shield_mfp)
+    # a different model is not found in the cache
+    myModel.shield_list[-1].material.density = 7.0
+    assert myModel.calculate_exposure() > first.total_exposure
+    assert myModel.result_cache.hits == 1
+    locations = [[100, 0, 0], [200, 0, 0]]
+    exposures = myModel.calculate_exposure_map(locations)
+    assert np.array_equal(myModel.calculate_exposure_map(locations),
+                          exposures)
+    assert myModel.result_cache.hits == 2
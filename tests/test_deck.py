@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+from zapmenot import deck, cli, model, source, shield, detector, material
+
+pytestmark = pytest.mark.basic
+
+_DECK = '''
+title: tank behind a concrete wall
+source:
+  type: ZAlignedCylinderSource
+  material_name: water
+  cylinder_center: [0, 0, 54.15]
+  cylinder_length: 108.3
+  cylinder_radius: 154
+  points_per_dimension: [4, 4, 4]
+  photons:
+    - [0.8, 5.6e13]
+    - [1.3, 2.2e13]
+  isotopes:
+    - {name: Co-60, curies: 2}
+shields:
+  - type: ZAlignedInfiniteAnnulus
+    material_name: iron
+    cylinder_center: [0, 0, 54.15]
+    cylinder_inner_radius: 154
+    cylinder_outer_radius: 156.54
+    density: 7.8
+  - type: SemiInfiniteXSlab
+    material_name: concrete
+    x_start: 220
+    x_end: 320
+filler: {material: air, density: 0.00122}
+buildup_material: concrete
+detectors:
+  - [350, 0, 54.15]
+  - [400, 20, 54.15]
+options:
+  use_symmetry: false
+'''
+
+
+def _reference(location):
+    myModel = model.Model()
+    mySource = source.ZAlignedCylinderSource(
+        material_name='water', cylinder_center=[0, 0, 54.15],
+        cylinder_length=108.3, cylinder_radius=154)
+    mySource.points_per_dimension = [4, 4, 4]
+    mySource.add_photon(0.8, 5.6e13)
+    mySource.add_photon(1.3, 2.2e13)
+    mySource.add_isotope_curies('Co-60', 2)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.ZAlignedInfiniteAnnulus(
+        'iron', cylinder_center=[0, 0, 54.15], cylinder_inner_radius=154,
+        cylinder_outer_radius=156.54, density=7.8))
+    myModel.add_shield(shield.SemiInfiniteXSlab('concrete', 220, 320))
+    myModel.set_filler_material('air', 0.00122)
+    myModel.set_buildup_factor_material(material.Material('concrete'))
+    myModel.add_detector(detector.Detector(*location))
+    return myModel.calculate_exposure()
+
+
+def test_load(tmp_path):
+    (tmp_path / 'tank.yml').write_text(_DECK)
+    case = deck.load(tmp_path / 'tank.yml')
+    assert case.name == 'tank'
+    assert case.title == 'tank behind a concrete wall'
+    assert not case.model.use_symmetry
+    exposures = case.run()
+    assert exposures == pytest.approx(
+        [_reference(location) for location in case.detectors])
+    # the same deck written as JSON gives the same model
+    data = deck.read(tmp_path / 'tank.yml')
+    (tmp_path / 'tank.json').write_text(json.dumps(data))
+    assert deck.load(tmp_path / 'tank.json').run() == \
+        pytest.approx(exposures)
+
+    # python tags are rejected rather than run
+    (tmp_path / 'unsafe.yml').write_text(
+        _DECK + 'extra: !!python/object/apply:os.getpid []\n')
+    with pytest.raises(ValueError):
+        deck.read(tmp_path / 'unsafe.yml')
+
+
+def test_nested_shield():
+    data = {'source': {'type': 'PointSource', 'x': 0, 'y': 0, 'z': 0,
+                       'photons': [[1.0, 1e10]]},
+            'shields': [{'type': 'Shell', 'material_name': 'lead',
+                         'thickness': 2,
+                         'sphere': {'type': 'Sphere', 'material_name': 'air',
+                                    'sphere_center': [0, 0, 0],
+                                    'sphere_radius': 10}}],
+            'detector': [100, 0, 0]}
+    case = deck.build(data)
+    assert isinstance(case.model.shield_list[-1], shield.Shell)
+    assert case.detectors.shape == (1, 3)
+
+
+@pytest.mark.parametrize('change', [
+    {'sources': {}},
+    {'source': {'type': 'Model'}},
+    {'source': {'type': 'Source'}},
+    {'source': {'type': 'PointSource', 'x': 0, 'y': 0}},
+    {'shields': [{'type': 'PointSource', 'x': 0, 'y': 0, 'z': 0}]},
+    {'shields': [{'material_name': 'lead'}]},
+    {'detectors': [[1, 2]]},
+    {'detector': [1, 2, 3], 'detectors': [[1, 2, 3]]},
+    {'options': {'collect_statistics': True}},
+    {'filler': {'density': 1}},
+    {'source': {'type': 'PointSource', 'x': 0, 'y': 0, 'z': 0,
+                'isotopes': [{'name': 'Co-60', 'mCi': 1}]}},
+])
+def test_invalid(change):
+    data = {'source': {'type': 'PointSource', 'x': 0, 'y': 0, 'z': 0},
+            'detector': [100, 0, 0]}
+    data.update(change)
+    with pytest.raises(ValueError):
+        deck.build(data)
+
+
+def test_cli(tmp_path, capsys):
+    decks = tmp_path / 'decks'
+    decks.mkdir()
+    (decks / 'a_tank.yml').write_text(_DECK)
+    (decks / 'b_point.json').write_text(json.dumps(
+        {'source': {'type': 'PointSource', 'x': 0, 'y': 0, 'z': 0,
+                    'photons': [[1.0, 3e10]]},
+         'detector': [100, 0, 0]}))
+    (decks / 'c_broken.yml').write_text('source: {type: Nothing}\n')
+    (decks / 'notes.txt').write_text('not a deck')
+    output = tmp_path / 'results.csv'
+    status = cli.main([str(decks), '--jobs', '2', '-o', str(output)])
+    assert status == 1
+    assert 'c_broken' in capsys.readouterr().err
+    lines = output.read_text().splitlines()
+    assert lines[0] == ','.join(cli.COLUMNS)
+    rows = [line.split(',') for line in lines[1:]]
+    assert [row[0] for row in rows] == ['a_tank', 'a_tank', 'b_point',
+                                       'c_broken']
+    assert float(rows[0][5]) == pytest.approx(_reference([350, 0, 54.15]))
+    assert float(rows[2][5]) > 0
+    assert rows[3][6].startswith('ValueError')
+    assert cli.main([str(decks / 'b_point.json'), '-o', str(output)]) == 0
+    with pytest.raises(SystemExit):
+        cli.main([str(tmp_path / 'missing')])
@@ -248,3 +248,25 @@ class TestDisplay():
             myModel.display()
 
 
+
+
+def test_level_of_detail(monkeypatch):
+    # large models are drawn with fewer segments, and the bounding box is
+    # found without building meshes
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_photon(1.0, 3E10)
+    myModel.add_source(mySource)
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    for index in range(60):
+        myModel.add_shield(shield.Sphere("iron", [20 + index, 0, 0], 0.4))
+    resolution = myModel._display_resolution()
+    assert resolution is not None and resolution < 48
+
+    def no_draw(self, resolution=None):
+        raise AssertionError("mesh built")
+    monkeypatch.setattr(shield.Sphere, 'draw', no_draw)
+    bounds = myModel._findBoundingBox()
+    assert bounds[1] == pytest.approx(101)
+    with pytest.raises(ValueError):
+        myModel.display(resolution=2)
@@ -0,0 +1,142 @@
+import pytest
+import numpy as np
+import pyvista
+
+from zapmenot import dosegrid, model, source, shield, detector, material
+
+pytestmark = pytest.mark.basic
+
+
+def test_image_grid():
+    grid = dosegrid.image_grid([50, 150, -50, 50, 0, 0], [5, 3, 1])
+    assert grid.n_points == 15
+    assert grid.bounds == pytest.approx((50, 150, -50, 50, 0, 0))
+    with pytest.raises(ValueError):
+        dosegrid.image_grid([50, 150, -50, 50, 0, 0], [5, 0, 1])
+    with pytest.raises(ValueError):
+        dosegrid.image_grid([150, 50, -50, 50, 0, 0], [5, 3, 1])
+
+
+# a point source (single photon) with a single infinite yz shield
+# Reference:
+# tests/reference_calculations/test_model/test_Case2.m (matlab script)
+def test_calculate():
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_photon(1.0, 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    grid = dosegrid.image_grid([60, 140, -50, 50, -10, 10], [5, 5, 3])
+    doses = dosegrid.calculate(myModel, grid)
+    # the grid includes the reference detector location
+    index = grid.find_closest_point([100, 0, 0])
+    assert grid.points[index] == pytest.approx([100, 0, 0])
+    assert doses.point_data['exposure'][index] == pytest.approx(
+        7.057332942044014e-06*1000*3600)  # convert from R/sec to mR/hr
+    assert dosegrid.SCALARS not in grid.point_data
+    assert doses.point_data['exposure'] == pytest.approx(
+        myModel.calculate_exposure_map(grid.points))
+    # a structured grid is handled the same way
+    structured = grid.cast_to_structured_grid()
+    assert dosegrid.calculate(myModel, structured).point_data['exposure'] \
+        == pytest.approx(doses.point_data['exposure'])
+    level = float(np.median(doses.point_data['exposure']))
+    surface = dosegrid.contours(doses, [level])
+    assert surface.n_points > 0
+    assert surface.point_data['exposure'] == pytest.approx(level)
+    with pytest.raises(ValueError):
+        dosegrid.contours(grid, [level])
+    with pytest.raises(ValueError):
+        dosegrid.attach(grid, np.ones(3))
+
+
+@pytest.mark.graphics
+def test_render(tmp_path):
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_photon(1.0, 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    grid = dosegrid.image_grid([50, 150, -50, 50, -10, 10], [6, 5, 3])
+    doses = dosegrid.render(myModel, tmp_path / 'case.png', grid,
+                            levels=[5, 10], save_grid=True)
+    assert (tmp_path / 'case.png').stat().st_size > 0
+    saved = pyvista.read(tmp_path / 'case.vti')
+    assert saved.point_data['exposure'] == \
+        pytest.approx(doses.point_data['exposure'])
+
+
+@pytest.mark.graphics
+def test_render_batch(tmp_path):
+    models = []
+    for _ in range(3):
+        myModel = model.Model()
+        mySource = source.PointSource(0, 0, 0)
+        mySource.add_photon(1.0, 3e10)
+        myModel.add_source(mySource)
+        myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                           x_start=10, x_end=20))
+        myModel.add_detector(detector.Detector(100, 0, 0))
+        myModel.set_buildup_factor_material(material.Material('iron'))
+        models.append(myModel)
+    models[1].shield_list[-1].x_end = 30
+    models[2].detector = None
+    models[2].source = None
+    models[2].shield_list = []
+    paths = [tmp_path / f'case{index}.png' for index in range(3)]
+    grid = dosegrid.image_grid([50, 150, -50, 50, 0, 0], [6, 5, 1])
+    errors = dosegrid.render_batch(models, paths, grid, processes=2)
+    assert errors[:2] == ['', '']
+    assert errors[2] != ''
+    assert paths[0].exists() and paths[1].exists()
+
+
+def test_adaptive_grid(monkeypatch):
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_photon(1.0, 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.Box('iron', [60, 0, 0], [10, 40, 40]))
+    bounds = [20, 340, -160, 160, 0, 0]
+    # one batch of evaluations per refinement level
+    batches = []
+    original = model.Model.calculate_exposure_map
+    monkeypatch.setattr(model.Model, 'calculate_exposure_map',
+                        lambda self, locations, threads=None:
+                        batches.append(len(locations)) or
+                        original(self, locations, threads))
+    doses = dosegrid.adaptive_grid(myModel, bounds, [9, 9, 1], levels=3)
+    assert len(batches) <= 4
+    assert sum(batches) == doses.n_points
+    assert doses.celltypes[0] == pyvista.CellType.QUAD
+    assert doses.point_data['exposure'] == pytest.approx(
+        original(myModel, doses.points))
+    # the finest cells lie along the shadow of the box
+    finest = doses.extract_cells(doses.cell_data['level'] == 3)
+    assert finest.n_cells > 0
+    assert np.all(np.abs(finest.bounds[2:4]) < 160)
+    # about as accurate as a regular grid of the finest spacing, with
+    # far fewer points
+    fine = dosegrid.calculate(myModel,
+                              dosegrid.image_grid(bounds, [65, 65, 1]))
+    assert doses.n_points < 0.3 * fine.n_points
+    rng = np.random.default_rng(1)
+    points = np.column_stack([rng.uniform(20, 340, 1000),
+                              rng.uniform(-160, 160, 1000), np.zeros(1000)])
+    expected = original(myModel, points)
+    cloud = pyvista.PolyData(points)
+
+    def error(dose_grid):
+        sampled = cloud.sample(dose_grid).point_data['exposure']
+        return np.percentile(np.abs(np.log10(sampled / expected)), 90)
+    assert error(doses) < 2 * error(fine) + 0.01
+    with pytest.raises(ValueError):
+        dosegrid.adaptive_grid(myModel, bounds, [9, 9, 1], levels=-1)
+    with pytest.raises(ValueError):
+        dosegrid.adaptive_grid(myModel, bounds, [9, 9, 1], threshold=0)
@@ -0,0 +1,147 @@
+import math
+
+import pytest
+import numpy as np
+
+from zapmenot import isodose, model, source, shield, material
+
+pytestmark = pytest.mark.basic
+
+
+# a point source (single photon) with a single infinite yz shield
+# Reference:
+# tests/reference_calculations/test_model/test_Case2.m (matlab script)
+def test_crossings():
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_photon(1.0, 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    assert myModel.calculate_exposure_map([[100, 0, 0]])[0] == \
+        pytest.approx(7.057332942044014e-06*1000*3600)  # mR/hr
+    directions = [[1, 0, 0], [0, 1, 0], [-1, -1, 0]]
+    levels = [5, 100, 1000]
+    distances = isodose.crossings(myModel, levels, directions, 2000)
+    assert distances.shape == (3, 3)
+    for level, row in zip(levels, distances):
+        for direction, distance in zip(directions, row):
+            location = distance * np.array(direction) / \
+                np.linalg.norm(direction)
+            assert myModel.calculate_exposure_map([location])[0] == \
+                pytest.approx(level, rel=1E-3)
+    # without the shield the exposure falls as the inverse square
+    # Reference: dose calculated from Principles of Radiation Shielding,
+    #     A. B. Chilton, J. K. Shultis, R. E. Faw
+    unshielded = model.Model()
+    unshieldedSource = source.PointSource(0, 0, 0)
+    unshieldedSource.add_photon(1.0, 3e10)
+    unshielded.add_source(unshieldedSource)
+    photonFlux = 3E10/(4*math.pi*100**2)  # photons/sec/cm2
+    reference = photonFlux*1.835E-8*1.0*2.787E-02*1000*3600  # mR/hr
+    distances = isodose.crossings(unshielded, levels, [[0, 0, 1]], 2000)
+    assert distances[:, 0] == pytest.approx(
+        100 * np.sqrt(reference / np.array(levels)), rel=1E-3)
+    # a level that is not reached, or is still exceeded at the end of
+    # the ray, has no crossing
+    assert np.isnan(isodose.crossings(unshielded, [1E12], [[0, 0, 1]],
+                                      2000)[0, 0])
+    assert np.isnan(isodose.crossings(unshielded, [5], [[0, 0, 1]],
+                                      10)[0, 0])
+    with pytest.raises(ValueError):
+        isodose.crossings(myModel, [0], directions, 2000)
+    with pytest.raises(ValueError):
+        isodose.crossings(myModel, levels, [[0, 0, 0]], 2000)
+    with pytest.raises(ValueError):
+        isodose.crossings(myModel, levels, directions, -1)
+
+
+def test_crossings_far_field():
+    myModel = model.Model()
+    mySource = source.SphereSource('water', [0, 0, 0], 10)
+    mySource.add_isotope_curies('Co-60', 1)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.Box('iron', [60, 0, 0], [10, 40, 40]))
+    myModel.far_field_tolerance = 0.2
+    angles = np.linspace(0, math.pi, 5)
+    directions = np.column_stack([np.cos(angles), np.sin(angles),
+                                  np.zeros(5)])
+    levels = [5, 100, 1000]
+    distances = isodose.crossings(myModel, levels, directions, 20000,
+                                  samples=12)
+    assert np.all(np.isfinite(distances))
+    # the crossings agree with the exposure map, far-field approximation
+    # included
+    for level, row in zip(levels, distances):
+        locations = row[:, np.newaxis] * directions
+        assert myModel.calculate_exposure_map(locations) == \
+            pytest.approx(level, rel=1E-3)
+
+
+def test_isodose_lines(monkeypatch):
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_photon(1.0, 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    batches = []
+    original = model.Model._location_evaluator
+
+    def evaluator(self, setup):
+        exposure = original(self, setup)
+        return lambda locations: batches.append(len(locations)) or \
+            exposure(locations)
+
+    monkeypatch.setattr(model.Model, '_location_evaluator', evaluator)
+    lines = isodose.isodose_lines(myModel, [5, 1000], 2000, resolution=36,
+                                  samples=16)
+    # the brackets are found from a single batch of evaluations, and
+    # each refinement step evaluates one location
+    assert batches[0] == 36 * 16
+    assert set(batches[1:]) == {1}
+    assert lines.n_points == 72
+    assert lines.n_lines == 2
+    assert myModel.calculate_exposure_map(lines.points) == \
+        pytest.approx(lines.point_data['exposure'], rel=1E-3)
+    assert np.all(lines.points[:, 2] == 0)
+    # a line is broken where a ray has no crossing; only the rays
+    # through the slab fall below the level within 500 cm
+    partial = isodose.isodose_lines(myModel, [5], 500, resolution=36)
+    assert 1 < partial.n_points < 36
+    assert partial.n_lines == 1
+    assert np.all(partial.points[:, 0] > 0)
+    assert partial.lines[0] == partial.n_points
+    with pytest.raises(ValueError):
+        isodose.isodose_lines(myModel, [5], 2000, normal=(0, 0, 0))
+
+
+def test_isodose_surfaces():
+    unshielded = model.Model()
+    unshieldedSource = source.PointSource(0, 0, 0)
+    unshieldedSource.add_photon(1.0, 3e10)
+    unshielded.add_source(unshieldedSource)
+    surface = isodose.isodose_surfaces(unshielded, [100], 2000,
+                                       resolution=16)
+    radius = np.linalg.norm(surface.points, axis=1)
+    assert radius == pytest.approx(radius[0], rel=1E-3)
+    assert surface.is_manifold
+    assert surface.area == pytest.approx(4 * math.pi * radius[0]**2,
+                                         rel=0.02)
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_photon(1.0, 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    zones = isodose.radiation_zones(myModel, 2000, resolution=8)
+    assert list(zones) == [5.0, 100.0, 1000.0]
+    for level, boundary in zones.items():
+        assert boundary.n_cells > 0
+        assert boundary.point_data['exposure'] == pytest.approx(level)
+    zones = isodose.radiation_zones(myModel, 2000, levels=[1E12],
+                                    normal=(0, 0, 1), resolution=8)
+    assert zones[1E12].n_points == 0
@@ -90,3 +90,11 @@ def test_progeny_readAndStore():
 def test_blank_progeny():
     a = isotope.Isotope("O-19")
     assert a.key_progeny is None
+
+
+def test_library_unchanged():
+    # changing the returned photons does not change the library
+    a = isotope.Isotope("co-60")
+    photons = a.photons
+    photons.clear()
+    assert len(isotope.Isotope("co-60").photons) > 0
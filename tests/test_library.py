@@ -0,0 +1,36 @@
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+from zapmenot import library
+
+pytestmark = pytest.mark.basic
+
+
+def test_freeze():
+    frozen = library.freeze({'a': [1, [2, 3]], 'b': {'c': 4}})
+    assert frozen['a'] == (1, (2, 3))
+    with pytest.raises(TypeError):
+        frozen['b']['c'] = 5
+
+
+def test_single_flight():
+    # many threads asking for an unloaded library read it only once
+    shared = library.SharedLibrary('materialLibrary.yml')
+    reads = []
+    read = shared._read
+
+    def slow_read():
+        reads.append(threading.get_ident())
+        time.sleep(0.05)
+        return read()
+    shared._read = slow_read
+    assert not shared.loaded
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        answers = list(executor.map(lambda _: shared.get(), range(16)))
+    assert len(reads) == 1
+    assert shared.loaded
+    assert all(answer is answers[0] for answer in answers)
+    assert 'iron' in answers[0]
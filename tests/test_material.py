@@ -201,3 +201,31 @@ def test_getBuildupFactor3():
     assert b[0] == 1
     assert b[1] == pytest.approx(43.082281)
     assert len(b) == 2
+
+
+# test the buildup factor derivative against central differences,
+# both within the GP fit and in the extrapolated range
+def test_getBuildupDerivative():
+    a = material.Material("concrete")
+    mfp_array = np.array([0.5, 10, 39, 45, 70])
+    step = 1e-5 * mfp_array
+    numeric = (a.get_buildup_factor(0.66, mfp_array + step) -
+               a.get_buildup_factor(0.66, mfp_array - step)) / (2 * step)
+    derivative = a.get_buildup_derivative(0.66, mfp_array)
+    assert derivative == pytest.approx(numeric, rel=1e-5)
+    assert a.get_buildup_derivative(0.66, 10) == pytest.approx(numeric[1],
+                                                                rel=1e-5)
+    with pytest.raises(ValueError):
+        a.get_buildup_derivative(0.66, -1)
+
+
+# materials of the same name share read-only library arrays
+def test_shared_data():
+    a = material.Material('iron')
+    b = material.Material('Iron')
+    assert a._mass_atten_coff is b._mass_atten_coff
+    with pytest.raises(ValueError):
+        a._mass_atten_coff[0] = 1.0
+    # the density belongs to each material object
+    a.density = 1.0
+    assert b.density == pytest.approx(7.874)
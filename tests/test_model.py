@@ -1,4 +1,5 @@
 import math
+import os
 
 import pytest
 import numpy as np
@@ -418,3 +419,495 @@ def test_replaceable_detector():
     myModel.add_detector(detector.Detector(4, 5, 26))
     result = myModel.calculate_exposure()
     assert result == pytest.approx(3.868745387518610e-07)
+
+
+def test_statistics():
+    # statistics are only collected on request
+    myModel = model.Model()
+    mySource = source.BoxSource("water", box_center=[0, 0, 0],
+                                box_dimensions=[10, 10, 10])
+    mySource.points_per_dimension = [2, 3, 4]
+    mySource.add_photon(1.0, 3e10)
+    mySource.add_photon(2.0, 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=30, x_end=40))
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    # count the rays from every source point
+    myModel.use_symmetry = False
+    result = myModel.calculate_exposure()
+    assert myModel.statistics is None
+    myModel.collect_statistics = True
+    assert myModel.calculate_exposure() == pytest.approx(result)
+    stats = myModel.statistics
+    assert stats.rays == 24
+    # three shields: the source body and two slabs
+    assert stats.intersection_tests == 72
+    # every ray starts in the source body and crosses both slabs
+    assert stats.hits == 72
+    # two photon energies, with the two iron slabs sharing lookups
+    assert stats.cache_misses == 4
+    assert stats.cache_hits == 2
+    assert stats.array_sizes['crossing_distances'] == (24, 3)
+    assert stats.total_time > 0
+    assert set(stats.timings) == set(stats.PHASES)
+    assert stats.as_dict()['rays'] == 24
+
+
+def _sweep_model():
+    myModel = model.Model()
+    mySource = source.ZAlignedCylinderSource(
+        "water", cylinder_center=[0, 0, 0], cylinder_length=50,
+        cylinder_radius=20)
+    mySource.points_per_dimension = [3, 4, 5]
+    mySource.add_isotope_curies('Co-60', 1)
+    myModel.add_source(mySource)
+    wall = shield.SemiInfiniteXSlab("concrete", x_start=50, x_end=80,
+                                    density=2.3)
+    myModel.add_shield(wall)
+    myModel.set_filler_material('air')
+    myModel.set_buildup_factor_material(material.Material('concrete'))
+    myModel.add_detector(detector.Detector(150, 10, 5))
+    return myModel, mySource, wall
+
+
+def test_sweep_density():
+    myModel, mySource, wall = _sweep_model()
+    densities = [2.2, 2.3, 2.4]
+    swept = myModel.sweep(wall, densities)
+    for density, result in zip(densities, swept):
+        wall.material.density = density
+        assert result == pytest.approx(myModel.calculate_exposure())
+    # the source material is a shield too
+    swept = myModel.sweep(mySource, [0.5, 1.0])
+    mySource.material.density = 0.5
+    assert swept[0] == pytest.approx(myModel.calculate_exposure())
+    # filler density
+    swept = myModel.sweep('filler', [0.0, 0.01])
+    myModel.set_filler_material('air', 0.01)
+    assert swept[1] == pytest.approx(myModel.calculate_exposure())
+    with pytest.raises(ValueError):
+        myModel.sweep('smush', [1.0])
+    with pytest.raises(ValueError):
+        myModel.sweep(shield.SemiInfiniteXSlab("iron", 1, 2), [1.0])
+    with pytest.raises(ValueError):
+        myModel.sweep(wall, [-1.0])
+
+
+def test_sweep_thickness():
+    myModel, mySource, wall = _sweep_model()
+    thicknesses = [0, 10, 30, 60]
+    swept = myModel.sweep_thickness(wall, thicknesses)
+    for thickness, result in zip(thicknesses, swept):
+        wall.x_end = 50 + thickness
+        assert result == pytest.approx(myModel.calculate_exposure())
+    # annulus around the source, inner radius held fixed
+    wall.x_end = 80
+    annulus = shield.ZAlignedInfiniteAnnulus(
+        "iron", cylinder_inner_radius=25, cylinder_outer_radius=27,
+        cylinder_center=[0, 0, 0])
+    myModel.add_shield(annulus)
+    thicknesses = [0.5, 2, 5]
+    swept = myModel.sweep_thickness(annulus, thicknesses)
+    for thickness, result in zip(thicknesses, swept):
+        annulus.outer_radius = 25 + thickness
+        assert result == pytest.approx(myModel.calculate_exposure())
+    with pytest.raises(ValueError):
+        # annulus would overlap the slab
+        myModel.sweep_thickness(annulus, [120])
+    with pytest.raises(ValueError):
+        myModel.sweep_thickness(annulus, [-1])
+    with pytest.raises(ValueError):
+        myModel.sweep_thickness(mySource, [1])
+
+
+def test_solve_thickness():
+    myModel, mySource, wall = _sweep_model()
+    thickness = myModel.solve_thickness(wall, 0.1)
+    wall.x_end = 50 + thickness
+    assert myModel.calculate_exposure() == pytest.approx(0.1, rel=1e-5)
+    with pytest.raises(ValueError):
+        # the slab cannot extend past the detector
+        myModel.solve_thickness(wall, 0.01)
+    wall.x_end = 80
+    annulus = shield.ZAlignedInfiniteAnnulus(
+        "iron", cylinder_inner_radius=25, cylinder_outer_radius=27,
+        cylinder_center=[0, 0, 0])
+    myModel.add_shield(annulus)
+    thickness = myModel.solve_thickness(annulus, 0.05, upper=20)
+    annulus.outer_radius = 25 + thickness
+    assert myModel.calculate_exposure() == pytest.approx(0.05, rel=1e-5)
+    with pytest.raises(ValueError):
+        # more than the unshielded dose
+        myModel.solve_thickness(annulus, 1E6)
+    with pytest.raises(ValueError):
+        myModel.solve_thickness(mySource, 0.01)
+
+
+def test_solve_distance():
+    myModel, mySource, wall = _sweep_model()
+    distance = myModel.solve_distance(0.01, direction=[1, 0, 0])
+    myModel.add_detector(detector.Detector(150 + distance, 10, 5))
+    assert myModel.calculate_exposure() == pytest.approx(0.01, rel=1e-5)
+
+
+def test_gradient():
+    myModel, mySource, wall = _sweep_model()
+    mySource.add_photon(0.5, 1E9)
+    gradient = myModel.calculate_gradient()
+    base = myModel.calculate_exposure()
+    assert gradient.exposure == pytest.approx(base)
+
+    def difference(change, step):
+        change(step)
+        upper = myModel.calculate_exposure()
+        change(-2*step)
+        lower = myModel.calculate_exposure()
+        change(step)
+        return (upper - lower) / (2*step)
+
+    def change_wall(step):
+        wall.material.density += step
+    assert gradient.shield_densities[1] == pytest.approx(
+        difference(change_wall, 1E-4), rel=1E-4)
+
+    def change_source(step):
+        mySource.material.density += step
+    assert gradient.shield_densities[0] == pytest.approx(
+        difference(change_source, 1E-4), rel=1E-4)
+
+    def change_filler(step):
+        myModel.set_filler_material(
+            'air', myModel.filler_material.density + step)
+    assert gradient.filler_density == pytest.approx(
+        difference(change_filler, 1E-5), rel=1E-4)
+
+    # exposure is linear in activity
+    activity = mySource._isotope_list[0][1]
+    assert gradient.activities['Co-60'] * activity + \
+        gradient.activities[0.5] * 1E9 == pytest.approx(base)
+
+    location = list(myModel.detector.location)
+    for axis in range(3):
+        def change_location(step):
+            location[axis] += step
+            myModel.add_detector(detector.Detector(*location))
+        assert gradient.detector_location[axis] == pytest.approx(
+            difference(change_location, 1E-3), rel=1E-4)
+
+
+def _far_field_model():
+    myModel = model.Model()
+    mySource = source.BoxSource("water", box_center=[0, 0, 0],
+                                box_dimensions=[100, 100, 100])
+    mySource.points_per_dimension = [10, 10, 10]
+    mySource.add_isotope_curies('Co-60', 1)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab("concrete", 100, 120))
+    myModel.set_filler_material('air')
+    myModel.set_buildup_factor_material(material.Material('concrete'))
+    return myModel
+
+
+def test_exposure_map():
+    myModel = _far_field_model()
+    locations = [[150, 0, 0], [700, 0, 0], [3000, 500, 300],
+                 [30000, 0, 0], [700, -400, 200]]
+    exposures = myModel.calculate_exposure_map(locations)
+    for location, result in zip(locations, exposures):
+        myModel.add_detector(detector.Detector(*location))
+        assert result == pytest.approx(myModel.calculate_exposure())
+    myModel.far_field_tolerance = 0.05
+    lumped = myModel.calculate_exposure_map(locations)
+    # the nearest location is not in the far field
+    assert lumped[0] == pytest.approx(exposures[0])
+    assert lumped == pytest.approx(exposures, rel=0.05)
+    with pytest.raises(ValueError):
+        myModel.calculate_exposure_map([1, 2, 3])
+
+
+def test_far_field_bundle():
+    myModel = _far_field_model()
+    myModel.far_field_tolerance = 0.05
+    locations = np.array([[700, 0, 0], [3000, 500, 300], [30000, 0, 0]])
+    energies, yields = myModel._spectrum()
+    coefficients = myModel._cross_sections(energies)
+    full = (myModel.source._get_source_points(),
+            np.asarray(myModel.source._get_source_point_weights()))
+    assert np.all(myModel._far_field(locations, full))
+    edges = myModel._source_edges(full)
+    bundle = myModel._far_field_bundle(locations, full, energies, yields,
+                                       coefficients, edges)
+    # far fewer rays are traced through the external shields
+    assert bundle is not None
+    assert len(bundle[0]) < len(full[0]) / 10
+    myModel.far_field_tolerance = 1E-6
+    assert myModel._far_field_bundle(locations, full, energies, yields,
+                                     coefficients, edges) is None
+
+
+def test_far_field_shadow():
+    myModel = model.Model()
+    mySource = source.BoxSource("water", box_center=[0, 0, 0],
+                                box_dimensions=[40, 40, 40])
+    mySource.points_per_dimension = [10, 10, 10]
+    mySource.add_isotope_curies('Co-60', 1)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.Box("iron", [300, 0, 0], [20, 400, 400]))
+    # the bundle is checked at the clear locations; the last location
+    # sees the source partly through the edge of the shield
+    locations = np.array([[0, 400, 0], [0, -600, 0], [0, 0, 600],
+                          [0, 0, -600], [-600, 0, 0], [978, -635, 37]])
+    exposures = myModel.calculate_exposure_map(locations)
+    myModel.far_field_tolerance = 0.05
+    assert myModel.calculate_exposure_map(locations) == \
+        pytest.approx(exposures, rel=0.05)
+    energies, _ = myModel._spectrum()
+    full = myModel._quadrature()
+    assert list(myModel._uniform_shadow(
+        locations, myModel._source_edges(full),
+        myModel._cross_sections(energies))) == [True] * 5 + [False]
+
+
+def test_analytic_line_source():
+    myModel = model.Model()
+    mySource = source.LineSource([0, -200, 10], [0, 300, 10])
+    mySource.add_isotope_curies('Co-60', 1)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab("concrete", 20, 50))
+    myModel.add_shield(shield.SemiInfiniteXSlab("iron", 60, 65))
+    myModel.set_filler_material('air')
+    myModel.set_buildup_factor_material(material.Material('concrete'))
+    myModel.add_detector(detector.Detector(100, 40, 30))
+    assert myModel._sievert_geometry() is not None
+    analytic = myModel.calculate_results()
+    # a fine quadrature converges to the Sievert integral
+    myModel.analytic_line_source = False
+    mySource.points_per_dimension = [20000]
+    quadrature = myModel.calculate_results()
+    assert analytic.exposure == pytest.approx(quadrature.exposure, rel=1E-6)
+    assert analytic.uncollided_flux == pytest.approx(
+        quadrature.uncollided_flux, rel=1E-6)
+    # per-point results require the quadrature
+    myModel.analytic_line_source = True
+    points = myModel.calculate_results(include_points=True)
+    assert len(points.point_exposure[0]) == 20000
+    # a line that is not parallel to the slabs
+    myModel.add_source(source.LineSource([0, -200, 10], [10, 300, 10]))
+    assert myModel._sievert_geometry() is None
+
+
+def test_mirror_symmetry():
+    myModel = model.Model()
+    mySource = source.BoxSource("water", box_center=[0, 0, 0],
+                                box_dimensions=[10, 10, 10])
+    mySource.points_per_dimension = [2, 3, 4]
+    mySource.add_photon(1.0, 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab("iron", 10, 20))
+    myModel.set_filler_material('air')
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.collect_statistics = True
+    result = myModel.calculate_exposure()
+    # symmetric about the y = 0 and z = 0 planes
+    assert myModel.statistics.rays == 8
+    myModel.use_symmetry = False
+    assert myModel.calculate_exposure() == pytest.approx(result, rel=1E-12)
+    assert myModel.statistics.rays == 24
+    # per-point results use every source point
+    myModel.use_symmetry = True
+    points = myModel.calculate_results(include_points=True)
+    assert len(points.source_points) == 24
+    # off the z = 0 plane only one plane of symmetry remains
+    myModel.add_detector(detector.Detector(100, 0, 3))
+    result = myModel.calculate_exposure()
+    assert myModel.statistics.rays == 16
+    myModel.use_symmetry = False
+    assert myModel.calculate_exposure() == pytest.approx(result, rel=1E-12)
+
+
+def test_axial_symmetry():
+    myModel = model.Model()
+    mySource = source.ZAlignedCylinderSource(
+        "water", cylinder_center=[1, 2, 0], cylinder_length=50,
+        cylinder_radius=20)
+    mySource.points_per_dimension = [3, 8, 5]
+    mySource.add_photon(1.0, 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.ZAlignedInfiniteAnnulus(
+        "iron", cylinder_inner_radius=25, cylinder_outer_radius=30,
+        cylinder_center=[1, 2, 0]))
+    myModel.add_shield(shield.Shell(
+        "lead", shield.Sphere("lead", [1, 2, 0], 100), 2))
+    myModel.set_filler_material('air')
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    myModel.collect_statistics = True
+    myModel.add_detector(detector.Detector(151, 2, 0))
+    result = myModel.calculate_exposure()
+    # the plane through the axis and detector, and the midplane
+    assert myModel.statistics.rays == 3 * 4 * 3
+    myModel.use_symmetry = False
+    assert myModel.calculate_exposure() == pytest.approx(result, rel=1E-12)
+    # a detector that is not in a plane of the angular quadrature
+    myModel.use_symmetry = True
+    myModel.add_detector(detector.Detector(100, 100, 10))
+    myModel.calculate_exposure()
+    assert myModel.statistics.rays == 3 * 8 * 5
+    # a box breaks the symmetry
+    myModel.add_detector(detector.Detector(151, 2, 0))
+    myModel.add_shield(shield.Box("iron", [120, 10, 5], [5, 5, 5]))
+    myModel.calculate_exposure()
+    assert myModel.statistics.rays == 3 * 8 * 5
+
+
+def test_exposure_map_rings():
+    myModel = model.Model()
+    mySource = source.ZAlignedCylinderSource(
+        "water", cylinder_center=[1, 2, 0], cylinder_length=50,
+        cylinder_radius=20)
+    mySource.points_per_dimension = [5, 16, 10]
+    mySource.add_isotope_curies('Co-60', 1)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.ZAlignedInfiniteAnnulus(
+        "iron", cylinder_inner_radius=25, cylinder_outer_radius=30,
+        cylinder_center=[1, 2, 0]))
+    myModel.set_filler_material('air')
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    axis = myModel._symmetry_axis()
+    assert axis is not None
+    # a polar grid of two radii, two heights and 36 angles
+    angles = np.radians(np.arange(0, 360, 10))
+    locations = [[1 + radius*np.cos(angle), 2 + radius*np.sin(angle), z]
+                 for radius in [50, 100] for z in [0, 30]
+                 for angle in angles]
+    rings, inverse = myModel._rings(np.array(locations), axis)
+    assert len(rings) == 4
+    exposures = myModel.calculate_exposure_map(locations)
+    for index in [0, 36, 72, 108]:
+        assert np.all(exposures[index:index+36] == exposures[index])
+        # the ring is evaluated in the +X direction from the axis
+        myModel.add_detector(detector.Detector(*locations[index]))
+        assert exposures[index] == pytest.approx(
+            myModel.calculate_exposure())
+        # elsewhere the rings agree to within the quadrature error
+        myModel.add_detector(detector.Detector(*locations[index + 5]))
+        assert exposures[index] == pytest.approx(
+            myModel.calculate_exposure(), rel=1E-2)
+    # a slab breaks the symmetry
+    myModel.add_shield(shield.SemiInfiniteXSlab("concrete", 60, 70))
+    assert myModel._symmetry_axis() is None
+    exposures = myModel.calculate_exposure_map(locations[:3])
+    myModel.add_detector(detector.Detector(*locations[2]))
+    assert exposures[2] == pytest.approx(myModel.calculate_exposure())
+
+
+def test_exposure_map_threads():
+    myModel, mySource, wall = _sweep_model()
+    locations = [[150, y, z] for y in [-50, 0, 20, 70] for z in [-10, 5]]
+    serial = myModel.calculate_exposure_map(locations)
+    threaded = myModel.calculate_exposure_map(locations, threads=3)
+    assert np.array_equal(serial, threaded)
+    with pytest.raises(ValueError):
+        myModel.calculate_exposure_map(locations, threads=0)
+    with pytest.raises(ValueError):
+        myModel.calculate_exposure_map(locations, threads=1.5)
+
+
+def test_iter_exposure_map(tmp_path, monkeypatch):
+    myModel, mySource, wall = _sweep_model()
+    locations = [[150, y, z] for y in [-50, 0, 20, 70] for z in [-10, 5]]
+    expected = myModel.calculate_exposure_map(locations)
+    reports = []
+    blocks = list(myModel.iter_exposure_map(
+        locations, chunk=3, progress=lambda done, total:
+        reports.append((done, total))))
+    assert [len(indices) for indices, _ in blocks] == [3, 3, 2]
+    assert np.array_equal(np.concatenate([doses for _, doses in blocks]),
+                          expected)
+    assert reports == [(3, 8), (6, 8), (8, 8)]
+    # an interrupted run resumes from its checkpoint
+    checkpoint = tmp_path / 'map.npz'
+    iterator = myModel.iter_exposure_map(locations, chunk=3,
+                                         checkpoint=checkpoint)
+    next(iterator)
+    next(iterator)
+    iterator.close()
+    evaluated = []
+    full_exposure = model.Model._full_exposure
+
+    def counted(self, location, *args):
+        evaluated.append(location)
+        return full_exposure(self, location, *args)
+    monkeypatch.setattr(model.Model, '_full_exposure', counted)
+    resumed = list(myModel.iter_exposure_map(locations, chunk=4,
+                                             checkpoint=checkpoint))
+    assert len(evaluated) == 2
+    assert np.array_equal(np.concatenate([doses for _, doses in resumed]),
+                          expected)
+    # a block cut short by an interruption is discarded
+    size = os.path.getsize(checkpoint)
+    with open(checkpoint, 'ab') as stream:
+        stream.write(np.lib.format.MAGIC_PREFIX + b'\x01\x00')
+    resumed = list(myModel.iter_exposure_map(locations,
+                                             checkpoint=checkpoint))
+    assert os.path.getsize(checkpoint) == size
+    assert len(evaluated) == 2
+    assert np.array_equal(resumed[0][1], expected)
+    other = tmp_path / 'other.txt'
+    other.write_text('not a checkpoint')
+    with pytest.raises(ValueError):
+        myModel.iter_exposure_map(locations, checkpoint=other)
+    assert other.read_text() == 'not a checkpoint'
+    other = tmp_path / 'other.npy'
+    np.save(other, np.array([{}]), allow_pickle=True)
+    contents = other.read_bytes()
+    with pytest.raises(ValueError):
+        myModel.iter_exposure_map(locations, checkpoint=other)
+    assert other.read_bytes() == contents
+    # a header cut short by an interruption is discarded
+    header = checkpoint.read_bytes()[:20]
+    checkpoint.write_bytes(header)
+    resumed = list(myModel.iter_exposure_map(locations,
+                                             checkpoint=checkpoint))
+    assert np.array_equal(resumed[0][1], expected)
+    # a checkpoint for other locations is rejected
+    with pytest.raises(ValueError):
+        myModel.iter_exposure_map(locations[1:], checkpoint=checkpoint)
+    with pytest.raises(ValueError):
+        myModel.iter_exposure_map(locations, chunk=0)
+
+
+def test_write_exposure_map(tmp_path):
+    myModel, mySource, wall = _sweep_model()
+    locations = np.array([[150, y, z] for y in [-50, 0, 20, 70]
+                          for z in [-10, 5]], dtype=float)
+    expected = myModel.calculate_exposure_map(locations)
+    written = myModel.write_exposure_map(locations, tmp_path / 'map.npy',
+                                         chunk=3)
+    assert isinstance(written, np.memmap)
+    assert np.allclose(written, expected, rtol=1e-12)
+    # one layer per photon energy, summing to the total
+    layers = myModel.write_exposure_map(locations, tmp_path / 'layers.npy',
+                                        by_energy=True, chunk=3,
+                                        processes=2)
+    energies = myModel.calculate_results().energies
+    assert layers.shape == (len(energies), len(locations))
+    assert np.allclose(np.sum(layers, axis=0), expected, rtol=1e-12)
+    # the far-field bundle does not depend on the blocks
+    farModel = _far_field_model()
+    farModel.far_field_tolerance = 0.05
+    far = np.array([[700, 0, 0], [3000, 500, 300], [700, -400, 200],
+                    [-2000, 100, 0]], dtype=float)
+    written = farModel.write_exposure_map(far, tmp_path / 'far.npy',
+                                          chunk=1, processes=2)
+    assert np.allclose(written, farModel.calculate_exposure_map(far),
+                       rtol=1e-12)
+    with pytest.raises(ValueError):
+        myModel.write_exposure_map(locations, tmp_path / 'bad.npy', chunk=0)
+    with pytest.raises(ValueError):
+        myModel.write_exposure_map(locations, tmp_path / 'bad.npy',
+                                   processes=0)
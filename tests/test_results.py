@@ -0,0 +1,111 @@
+import pytest
+import numpy as np
+
+from zapmenot import model, source, shield, detector, material, results
+
+pytestmark = pytest.mark.basic
+
+
+@pytest.fixture(scope="module")
+def ar41_model():
+    # a point source (multiple photons) with two separate infinite yz shields
+    # Reference:
+    # tests/reference_calculations/test_model/test_Case3.m (matlab script)
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_isotope_bq('Ar-41', 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="concrete",
+                       x_start=30, x_end=40))
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    return myModel
+
+
+def test_results_arrays(ar41_model):
+    result = ar41_model.calculate_results()
+    assert len(result) == 2
+    np.testing.assert_allclose(result.energies, [1.29364, 1.677])
+    np.testing.assert_allclose(result.yields, [29748000000, 15468960])
+    np.testing.assert_allclose(result.uncollided_flux,
+                               [1371.11990617, 1.76805726932])
+    np.testing.assert_allclose(result.exposure,
+                               [4.41321334734e-06*1000*3600,
+                                4.2363679878e-09*1000*3600])
+    assert result.total_exposure == pytest.approx(
+        4.417449715326903e-06*1000*3600)
+    assert result.total_uncollided_exposure == pytest.approx(
+        (6.61910474907e-07 + 7.99508312077e-10)*1000*3600)
+    np.testing.assert_allclose(result.to_list(),
+                               ar41_model.generate_summary())
+    # mfp arrays are only included on request
+    assert result.point_mfp is None
+    assert result.shield_mfp is None
+
+
+def test_results_mfp(ar41_model):
+    result = ar41_model.calculate_results(include_mfp=True)
+    # one source point, three shields (source body and two slabs)
+    assert result.point_mfp.shape == (2, 1)
+    assert result.crossing_distances.shape == (1, 3)
+    np.testing.assert_allclose(result.crossing_distances, [[0, 10, 10]])
+    iron = material.Material('iron')
+    concrete = material.Material('concrete')
+    expected = 10*(iron.density*iron.get_mass_atten_coeff(1.677) +
+                   concrete.density*concrete.get_mass_atten_coeff(1.677))
+    assert result.point_mfp[1, 0] == pytest.approx(expected)
+    shield_mfp = result.shield_mfp
+    assert shield_mfp.shape == (2, 1, 3)
+    np.testing.assert_allclose(np.sum(shield_mfp, axis=2), result.point_mfp)
+
+
+def test_results_dataframe(ar41_model):
+    result = ar41_model.calculate_results()
+    df = result.to_dataframe()
+    assert list(df.columns) == results.Results.COLUMNS
+    np.testing.assert_allclose(df['Collided mR/hr'], result.exposure)
+
+
+def test_results_save_and_load(ar41_model, tmp_path):
+    result = ar41_model.calculate_results(include_mfp=True)
+    file = tmp_path / "results.npz"
+    result.save(file)
+    loaded = results.Results.load(file)
+    np.testing.assert_array_equal(loaded.exposure, result.exposure)
+    np.testing.assert_array_equal(loaded.point_mfp, result.point_mfp)
+    assert loaded.total_exposure == result.total_exposure
+
+
+def test_results_point_contributions():
+    myModel = model.Model()
+    mySource = source.BoxSource("water", box_center=[0, 0, 0],
+                                box_dimensions=[20, 20, 20])
+    mySource.points_per_dimension = [4, 4, 4]
+    mySource.add_photon(1.0, 1e10)
+    mySource.add_photon(0.5, 1e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=20, x_end=25))
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    result = myModel.calculate_results()
+    with pytest.raises(ValueError):
+        result.point_contributions()
+    result = myModel.calculate_results(include_mfp=True, include_points=True)
+    contributions = result.point_contributions()
+    assert contributions.shape == (64,)
+    assert np.sum(contributions) == pytest.approx(result.total_exposure)
+    # source points nearest the detector dominate the exposure
+    near = result.source_points[:, 0] > 0
+    assert np.sum(contributions[near]) > np.sum(contributions[~near])
+    assert 1 < result.effective_point_count < 64
+    # the iron slab removes more exposure than the water source body
+    mean_mfp = result.shield_contributions()
+    assert mean_mfp.shape == (2,)
+    assert mean_mfp[1] > mean_mfp[0] > 0
+    cloud = result.to_point_cloud()
+    assert cloud.n_points == 64
+    np.testing.assert_allclose(cloud.point_data['exposure'], contributions)
+    assert 'shield_1_mfp' in cloud.point_data.keys()
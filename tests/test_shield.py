@@ -651,3 +651,45 @@ class TestZAlignedCylinder():
         length = create_shield._get_crossing_length(
             ray.FiniteLengthRay([2, 2, -60], [2, 2, 60]))
         assert length == 100
+
+
+# display meshes are reused until the shield changes
+def test_mesh_cache():
+    import copy
+    sphere = shield.Sphere('iron', [0, 0, 0], 10)
+    mesh = sphere._mesh()
+    assert sphere._mesh() is mesh
+    assert sphere._mesh(8) is not mesh
+    sphere.radius = 20
+    assert sphere._mesh() is not mesh
+    assert sphere._mesh().bounds[1] == pytest.approx(20, rel=0.01)
+    # a shell is redrawn when the sphere inside it changes
+    shell = shield.Shell('lead', sphere, 2)
+    mesh = shell._mesh()
+    shell.inner_sphere.radius = 15
+    assert shell._mesh() is not mesh
+    # meshes are not copied with the shield
+    assert '_meshes' not in vars(copy.deepcopy(sphere))
+    # only the latest trimmed mesh is kept as the display bounds change
+    slab = shield.SemiInfiniteXSlab('iron', 20, 10)
+    for offset in range(5):
+        trimmed = slab._trimmed_mesh([offset, 100, -50, 50, -50, 50])
+    assert len(vars(slab)['_meshes']) == 1
+    assert trimmed.bounds[0] == pytest.approx(10)
+    assert trimmed.bounds[1] == pytest.approx(20)
+    assert slab._trimmed_mesh([30, 100, -50, 50, -50, 50]) is None
+
+
+@pytest.mark.parametrize('item', [
+    shield.Sphere('iron', [1, 2, 3], 10),
+    shield.Box('iron', [1, 2, 3], [4, 5, 6]),
+    shield.CappedCylinder('iron', [0, 0, 0], [10, 20, 5], 3),
+    shield.ZAlignedCylinder('iron', [0, 0, 5], 20, 3),
+    source.LineSource([0, 1, 2], [5, -1, 7]),
+    source.PointSource(1, 2, 3),
+])
+def test_bounds(item):
+    # analytic bounds enclose the display mesh and agree with it
+    bounds = item._bounds()
+    mesh_bounds = item.draw(resolution=200).bounds
+    assert bounds == pytest.approx(mesh_bounds, abs=0.01)
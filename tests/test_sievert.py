@@ -0,0 +1,48 @@
+import math
+
+import pytest
+import numpy as np
+
+from zapmenot import sievert
+
+pytestmark = pytest.mark.basic
+
+
+def test_sievert_unattenuated():
+    assert sievert.sievert(0.7, 0) == pytest.approx(0.7)
+    assert sievert.sievert(-0.7, 0) == pytest.approx(-0.7)
+
+
+def test_sievert_values():
+    # compare with a fine midpoint rule
+    for theta, b in [(1.5, 0.5), (1.2, 10), (0.4, 3)]:
+        steps = 200000
+        angles = (np.arange(steps) + 0.5) * theta / steps
+        expected = np.sum(np.exp(-b / np.cos(angles))) * theta / steps
+        assert sievert.sievert(theta, b) == pytest.approx(expected, rel=1E-8)
+
+
+def test_sievert_vectorized():
+    angles = np.array([[0.2], [0.9]])
+    mfps = np.array([0.0, 1.0, 5.0])
+    values = sievert.sievert(angles, mfps)
+    assert values.shape == (2, 3)
+    assert values[1, 2] == pytest.approx(sievert.sievert(0.9, 5.0))
+
+
+def test_sievert_buildup():
+    # a buildup factor of 1 + mfp
+    theta, b = 1.1, 2.0
+    steps = 200000
+    angles = (np.arange(steps) + 0.5) * theta / steps
+    slant = b / np.cos(angles)
+    expected = np.sum(np.exp(-slant) * (1 + slant)) * theta / steps
+    assert sievert.sievert(theta, b, lambda mfp: 1 + mfp) == \
+        pytest.approx(expected, rel=1E-8)
+
+
+def test_sievert_bad_input():
+    with pytest.raises(ValueError):
+        sievert.sievert(math.pi / 2, 1)
+    with pytest.raises(ValueError):
+        sievert.sievert(0.5, -1)
@@ -0,0 +1,73 @@
+import pytest
+import numpy as np
+
+from zapmenot import surrogate, model, source, shield, detector, material
+
+pytestmark = pytest.mark.basic
+
+
+# spherical source with no shielding, to which a box shield is added
+# Reference: TestSphericalSource.test_Case0 in test_model.py
+# (see testSphereDose1.m).
+def test_build(tmp_path):
+    myModel = model.Model()
+    mySource = source.SphereSource("air", sphere_radius=10,
+                                   sphere_center=[4, 5, 6], density=0)
+    mySource.points_per_dimension = [10, 10, 10]
+    mySource.add_photon(1.0, 1)
+    myModel.add_source(mySource)
+    myModel.add_detector(detector.Detector(4, 5, 26))
+    assert myModel.calculate_exposure() == \
+        pytest.approx(3.868745387518610e-07)
+    myModel.add_shield(shield.Box('iron', [60, 0, 0], [10, 40, 40]))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    bounds = [20, 150, -60, 60, -60, 60]
+    emulator = surrogate.build(myModel, bounds, samples=300)
+    assert len(emulator.points) == 300
+    # the initial samples are concentrated around the box shield
+    near = np.all(np.abs(emulator.points - [60, 0, 0]) <= [9, 24, 24],
+                  axis=1)
+    assert np.mean(near) > 0.1
+    assert emulator.log_error == pytest.approx(
+        np.max(np.abs(emulator.residuals)))
+    rng = np.random.default_rng(1)
+    points = rng.uniform(bounds[0::2], bounds[1::2], (200, 3))
+    expected = myModel.calculate_exposure_map(points)
+    exposures, lower, upper = emulator.predict(points, return_bounds=True)
+    assert np.mean((lower <= expected) & (expected <= upper)) > 0.95
+    assert np.median(np.abs(np.log10(exposures / expected))) < 0.05
+    # the samples themselves are interpolated exactly
+    assert emulator.predict(emulator.points) == \
+        pytest.approx(emulator.exposures, rel=1e-6)
+    with pytest.raises(ValueError):
+        emulator.predict([[0, 0, 0]])
+    emulator.save(tmp_path / 'surrogate.npz')
+    loaded = surrogate.Surrogate.load(tmp_path / 'surrogate.npz', myModel)
+    assert loaded.predict(points) == pytest.approx(exposures)
+    assert loaded.log_error == emulator.log_error
+    myModel.shield_list[-1].material.density = 5.0
+    with pytest.raises(ValueError):
+        surrogate.Surrogate.load(tmp_path / 'surrogate.npz', myModel)
+
+
+def test_build_flat():
+    myModel = model.Model()
+    mySource = source.SphereSource("air", sphere_radius=10,
+                                   sphere_center=[4, 5, 6], density=0)
+    mySource.points_per_dimension = [10, 10, 10]
+    mySource.add_photon(1.0, 1)
+    myModel.add_source(mySource)
+    myModel.add_detector(detector.Detector(4, 5, 26))
+    myModel.add_shield(shield.Box('iron', [60, 0, 0], [10, 40, 40]))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    emulator = surrogate.build(myModel, [20, 150, -60, 60, 0, 0],
+                               samples=100)
+    assert np.all(emulator.points[:, 2] == 0)
+    expected = myModel.calculate_exposure_map([[100, 10, 0]])
+    assert emulator.predict([[100, 10, 0]]) == pytest.approx(expected,
+                                                             rel=0.2)
+    with pytest.raises(ValueError):
+        surrogate.build(myModel, [20, 150, -60, 60, 0, 0], samples=100,
+                        initial=200)
+    with pytest.raises(ValueError):
+        surrogate.build(myModel, [20, 20, 0, 0, 0, 0])
@@ -0,0 +1,183 @@
+import pytest
+from scipy import stats
+
+from zapmenot import model, source, shield, detector, material, uncertainty
+
+pytestmark = pytest.mark.basic
+
+
+# a point source (multiple photons) with two separate infinite yz shields,
+#   on-axis source/detector
+# Reference:
+# tests/reference_calculations/test_model/test_Case3.m (matlab script)
+def test_density_and_activity_samples():
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_isotope_bq('Ar-41', 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    wall = shield.SemiInfiniteXSlab(material_name="concrete",
+                                    x_start=30, x_end=40)
+    myModel.add_shield(wall)
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    # a filler of zero density does not change the reference exposure
+    myModel.set_filler_material('air', 0)
+    assert myModel.calculate_exposure() == pytest.approx(
+        4.417449715326903e-06*1000*3600)  # convert from R/sec to mR/hr
+    mySource.add_photon(0.5, 1E9)
+    analysis = uncertainty.UncertaintyAnalysis(myModel)
+    analysis.add_density(wall, stats.norm(2.3, 0.05))
+    analysis.add_density('filler', stats.uniform(0.0011, 0.0002))
+    analysis.add_activity('Ar-41', stats.norm(3E10, 1E9))
+    analysis.add_activity(0.5, stats.uniform(5E8, 1E9))
+    result = analysis.run(samples=20, seed=1)
+    assert len(result) == 20
+    # check individual samples against a full calculation
+    for sample in [0, 7]:
+        density, filler, activity, photons = result.values[sample]
+        wall.material.density = density
+        myModel.set_filler_material('air', filler)
+        mySource._isotope_list[0] = ('Ar-41', activity)
+        mySource._unique_photons[0] = (0.5, photons)
+        assert result.exposures[sample] == \
+            pytest.approx(myModel.calculate_exposure())
+    low, high = result.confidence_interval(0.9)
+    assert low <= result.percentile(50) <= high
+    diagnostics = result.convergence(steps=4)
+    assert diagnostics['samples'][-1] == 20
+    assert diagnostics['mean'][-1] == pytest.approx(result.mean)
+    assert diagnostics['percentiles'].shape == (4, 3)
+
+
+# Reference:
+# tests/reference_calculations/test_model/test_Case3.m (matlab script)
+def test_geometric_samples():
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_isotope_bq('Ar-41', 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    wall = shield.SemiInfiniteXSlab(material_name="concrete",
+                                    x_start=30, x_end=40)
+    myModel.add_shield(wall)
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    analysis = uncertainty.UncertaintyAnalysis(myModel)
+    analysis.add_dimension(wall, 'x_end', stats.norm(40, 2))
+    analysis.add_detector_location('y', stats.uniform(-10, 20))
+    analysis.add_density(wall, stats.norm(2.3, 0.05))
+    result = analysis.run(samples=8, seed=3)
+    # the model is not modified
+    assert wall.x_end == 40
+    assert myModel.detector.location == (100, 0, 0)
+    assert myModel.calculate_exposure() == pytest.approx(
+        4.417449715326903e-06*1000*3600)  # convert from R/sec to mR/hr
+    x_end, y, density = result.values[5]
+    wall.x_end = x_end
+    wall.material.density = density
+    myModel.add_detector(detector.Detector(100, y, 0))
+    assert result.exposures[5] == pytest.approx(myModel.calculate_exposure())
+
+
+def test_detector_samples():
+    # detector samples alone are evaluated as one batch
+    myModel = model.Model()
+    mySource = source.BoxSource("water", box_center=[0, 0, 0],
+                                box_dimensions=[20, 20, 20])
+    mySource.points_per_dimension = [3, 3, 3]
+    mySource.add_isotope_curies('Co-60', 1)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab("concrete", x_start=50,
+                                                x_end=80))
+    myModel.add_shield(shield.Box("iron", [100, 0, 0], [10, 30, 30]))
+    myModel.set_filler_material('air')
+    myModel.set_buildup_factor_material(material.Material('concrete'))
+    myModel.add_detector(detector.Detector(150, 10, 5))
+    analysis = uncertainty.UncertaintyAnalysis(myModel)
+    analysis.add_detector_location('x', stats.uniform(120, 60))
+    analysis.add_detector_location('z', stats.uniform(-40, 80))
+    # fewer samples than source points, and more
+    few = analysis.run(samples=8, seed=4)
+    many = analysis.run(samples=40, seed=4)
+    assert myModel.detector.location == (150, 10, 5)
+    for result, sample in [(few, 0), (few, 7), (many, 0), (many, 39)]:
+        x, z = result.values[sample]
+        myModel.add_detector(detector.Detector(x, 10, z))
+        assert result.exposures[sample] == \
+            pytest.approx(myModel.calculate_exposure())
+
+
+def test_source_dimension_samples():
+    myModel = model.Model()
+    mySource = source.SphereSource("water", [0, 0, 0], 10)
+    mySource.points_per_dimension = [3, 3, 3]
+    mySource.add_isotope_curies('Co-60', 1)
+    myModel.add_source(mySource)
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    analysis = uncertainty.UncertaintyAnalysis(myModel)
+    analysis.add_dimension(mySource, 'radius', stats.uniform(20, 10))
+    result = analysis.run(samples=4, seed=2)
+    assert mySource.radius == 10
+    # the source quadrature follows the sampled radius
+    resized = source.SphereSource("water", [0, 0, 0], result.values[1, 0])
+    resized.points_per_dimension = [3, 3, 3]
+    resized.add_isotope_curies('Co-60', 1)
+    myModel.add_source(resized)
+    assert result.exposures[1] == pytest.approx(myModel.calculate_exposure())
+
+
+def test_processes():
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_isotope_bq('Ar-41', 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    wall = shield.SemiInfiniteXSlab(material_name="concrete",
+                                    x_start=30, x_end=40)
+    myModel.add_shield(wall)
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    analysis = uncertainty.UncertaintyAnalysis(myModel)
+    analysis.add_density(wall, stats.norm(2.3, 0.05))
+    serial = analysis.run(samples=10, seed=5)
+    parallel = analysis.run(samples=10, seed=5, processes=2)
+    assert parallel.exposures == pytest.approx(serial.exposures)
+
+
+def test_invalid_parameters():
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_isotope_bq('Ar-41', 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    wall = shield.SemiInfiniteXSlab(material_name="concrete",
+                                    x_start=30, x_end=40)
+    myModel.add_shield(wall)
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    analysis = uncertainty.UncertaintyAnalysis(myModel)
+    with pytest.raises(ValueError):
+        analysis.add_density(shield.SemiInfiniteXSlab("iron", 1, 2),
+                             stats.norm(1, 0.1))
+    with pytest.raises(ValueError):
+        analysis.add_activity('Cs-137', stats.norm(1, 0.1))
+    with pytest.raises(ValueError):
+        analysis.add_dimension(wall, 'smush', stats.norm(1, 0.1))
+    # attributes from which the rest of the geometry is derived
+    cylinder = shield.ZAlignedCylinder("iron", [0, 0, 0], 10, 5)
+    myModel.add_shield(cylinder)
+    with pytest.raises(ValueError):
+        analysis.add_dimension(cylinder, 'length', stats.norm(10, 1))
+    box = shield.Box("iron", [0, 0, 200], [10, 10, 10])
+    myModel.add_shield(box)
+    with pytest.raises(ValueError):
+        analysis.add_dimension(box, 'box_dimensions', stats.norm(10, 1))
+    with pytest.raises(ValueError):
+        analysis.add_detector_location('w', stats.norm(1, 0.1))
+    with pytest.raises(ValueError):
+        analysis.add_density(wall, 2.3)
@@ -0,0 +1,73 @@
+import pytest
+
+from zapmenot import widget, model, source, shield, detector, material
+
+pytestmark = pytest.mark.basic
+
+
+# a point source (multiple photons) with two separate infinite yz shields,
+#   on-axis source/detector
+# Reference:
+# tests/reference_calculations/test_model/test_Case3.m (matlab script)
+def test_incremental_model(monkeypatch):
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_isotope_bq('Ar-41', 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="concrete",
+                       x_start=30, x_end=40))
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    # a filler of zero density does not change the reference exposure
+    myModel.set_filler_material('air', 0)
+    incremental = widget.IncrementalModel(myModel)
+    assert incremental.exposure == pytest.approx(
+        4.417449715326903e-06*1000*3600)  # convert from R/sec to mR/hr
+    assert incremental.last_update > 0
+    # moving the detector traces the rays again
+    exposure = incremental.move_detector(120, 10, 0)
+    assert myModel.detector.location == pytest.approx((120, 10, 0))
+    assert exposure == pytest.approx(myModel.calculate_exposure())
+    # density and activity changes reuse the traced rays
+    traces = []
+    original = model.Model._trace
+    monkeypatch.setattr(model.Model, '_trace',
+                        lambda *args, **kwargs:
+                        traces.append(1) or original(*args, **kwargs))
+    slab = myModel.shield_list[-1]
+    incremental.set_density(slab, 1.5)
+    incremental.set_density('filler', 0.01)
+    incremental.set_activity('Ar-41', 5E10)
+    assert traces == []
+    assert slab.material.density == 1.5
+    assert incremental.activities['Ar-41'] == 5E10
+    assert incremental.exposure == pytest.approx(
+        myModel.calculate_exposure())
+    assert len(traces) == 1
+    with pytest.raises(ValueError):
+        incremental.set_density(shield.SemiInfiniteXSlab('iron', 0, 1), 7)
+    with pytest.raises(ValueError):
+        incremental.set_activity('I-131', 1E10)
+    with pytest.raises(ValueError):
+        incremental.set_activity('Ar-41', -1)
+    with pytest.raises(ValueError):
+        widget.IncrementalModel(model.Model())
+
+
+@pytest.mark.skipif(widget.ipywidgets_found,
+                    reason="ipywidgets is installed")
+def test_widget_requires_ipywidgets():
+    myModel = model.Model()
+    mySource = source.PointSource(0, 0, 0)
+    mySource.add_isotope_bq('Ar-41', 3e10)
+    myModel.add_source(mySource)
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="iron",
+                       x_start=10, x_end=20))
+    myModel.add_shield(shield.SemiInfiniteXSlab(material_name="concrete",
+                       x_start=30, x_end=40))
+    myModel.add_detector(detector.Detector(100, 0, 0))
+    myModel.set_buildup_factor_material(material.Material('iron'))
+    with pytest.raises(ImportError):
+        widget.ModelWidget(myModel)